@@ -0,0 +1,64 @@
+# benchmarks/async_throughput.py
+# Compara el motor síncrono con AsyncFlowRunner sobre un flujo Inicio -> LLM
+# usando el servidor LLM de prueba (requiere la librería ollama).
+# Uso: python -m benchmarks.async_throughput --runs 500 --delay 0.05
+import argparse
+import os
+import time
+from benchmarks.stub_llm_server import start_stub_server
+
+def llm_flow():
+    return {
+        "nodes": [
+            {"id": "inicio", "x": 0, "y": 0, "node_type": "inicio", "text": "Inicio",
+             "config": {}, "connected_to": "llm"},
+            {"id": "llm", "x": 0, "y": 0, "node_type": "llm", "text": "LLM",
+             "config": {
+                 "model": {"type": "free", "value": "stub"},
+                 "personality": {"type": "free", "value": "Eres un asistente."},
+                 "instructions": {"type": "free", "value": "Responde en una línea."},
+                 "context": {"type": "free", "value": ""},
+                 "prompt": {"type": "free", "value": "Hola ${cliente}"},
+                 "variable_name": "respuesta"},
+             "connected_to": None},
+        ],
+        "variables": [],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--sync-runs", type=int, default=20, help="Ejecuciones del motor síncrono (es lento)")
+    parser.add_argument("--delay", type=float, default=0.05)
+    parser.add_argument("--max-llm", type=int, default=128, help="Llamadas simultáneas al LLM")
+    parser.add_argument("--in-flight", type=int, default=256, help="Ejecuciones simultáneas")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(delay=args.delay)
+    # Debe definirse antes de importar ollama (el cliente por defecto lo lee al importarse)
+    os.environ["OLLAMA_HOST"] = url
+    import contextlib
+    from engine.flow_runner import FlowRunner
+    from engine.async_runner import AsyncFlowRunner
+
+    contexts = [{"cliente": f"cliente-{i}"} for i in range(args.runs)]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        runner = FlowRunner.from_dict(llm_flow())
+        t0 = time.perf_counter()
+        for ctx in contexts[:args.sync_runs]:
+            runner.run(ctx)
+        sync_rate = args.sync_runs / (time.perf_counter() - t0)
+
+        async_runner = AsyncFlowRunner.from_dict(llm_flow(), max_llm_concurrency=args.max_llm)
+        results, async_rate = async_runner.benchmark(contexts, args.in_flight)
+        async_runner.close()
+    server.shutdown()
+
+    errors = sum(1 for r in results if isinstance(r, Exception))
+    print(f"Retardo del LLM: {args.delay * 1000:.0f} ms")
+    print(f"Síncrono:   {sync_rate:8.1f} ejecuciones/s ({args.sync_runs} ejecuciones)")
+    print(f"Asíncrono:  {async_rate:8.1f} ejecuciones/s ({args.runs} ejecuciones, "
+          f"{args.in_flight} en vuelo, {args.max_llm} llamadas LLM simultáneas, {errors} errores)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/condition_batch.py
+# Compara la ejecución registro por registro (FlowRunner.run) con la ejecución
+# por lotes (FlowRunner.run_batch), en la que todos los registros que llegan al
+# nodo Condicional se evalúan juntos y se reparten entre sus salidas.
+# Uso: python -m benchmarks.condition_batch --records 100000 --batch-size 4096
+import argparse
+import contextlib
+import os
+import random
+import time
+from engine.flow_runner import FlowRunner
+
+CONDITIONS = [
+    {"variable": "edad", "operator": ">=", "value": "18"},
+    {"variable": "pais", "operator": "in", "value": "AR, CL, UY"},
+    {"variable": "plan", "operator": "!=", "value": "gratis"},
+]
+
+def condition_flow():
+    # Inicio -> Condicional -> (Acción "aprobado" | Acción "rechazado")
+    return {
+        "nodes": [
+            {"id": "inicio", "x": 0, "y": 0, "node_type": "inicio", "text": "Inicio",
+             "config": {}, "connected_to": "cond"},
+            {"id": "cond", "x": 0, "y": 0, "node_type": "condicional", "text": "Condicional",
+             "config": {"conditions": CONDITIONS, "logical_operator": "AND"},
+             "connected_to": None, "true_connection": "si", "false_connection": "no"},
+            {"id": "si", "x": 0, "y": 0, "node_type": "accion", "text": "Aprobado",
+             "config": {"action_type": "imprimir", "print_text": "aprobado"}, "connected_to": None},
+            {"id": "no", "x": 0, "y": 0, "node_type": "accion", "text": "Rechazado",
+             "config": {"action_type": "imprimir", "print_text": "rechazado"}, "connected_to": None},
+        ],
+        "variables": [],
+    }
+
+def make_records(count):
+    rng = random.Random(1)
+    return [{"edad": str(rng.randint(10, 80)), "pais": rng.choice(["AR", "CL", "UY", "MX", "ES"]),
+             "plan": rng.choice(["gratis", "pro", "empresa"])} for _ in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    runner = FlowRunner.from_dict(condition_flow())
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        t0 = time.perf_counter()
+        for record in records:
+            runner.run(record)
+        per_record = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for start in range(0, len(records), args.batch_size):
+            runner.run_batch(records[start:start + args.batch_size])
+        batched = time.perf_counter() - t0
+    print(f"{args.records} registros | por registro: {args.records / per_record:10,.0f} registros/s | "
+          f"lotes de {args.batch_size}: {args.records / batched:10,.0f} registros/s | x{per_record / batched:5.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/condition_eval.py
+# Evaluaciones por segundo del nodo Condicional: evaluación anterior (compara el
+# operador como texto y convierte ambos lados con float() en cada ejecución)
+# frente al predicado compilado de models.conditions.
+# Uso: python -m benchmarks.condition_eval --conditions 5 --runs 200000
+import argparse
+import timeit
+from models.conditions import compile_conditions
+
+def legacy_evaluate(conditions, logical_operator, context):
+    # Implementación anterior de CondicionalNode.execute (sin los print)
+    logical_op = logical_operator.upper()
+    result = None
+    for cond in conditions:
+        operator = cond.get("operator")
+        value = cond.get("value")
+        var_val = context.get(cond.get("variable"))
+        cond_result = False
+        if operator == "==":
+            cond_result = str(var_val) == value
+        elif operator == "!=":
+            cond_result = str(var_val) != value
+        elif operator == ">":
+            try:
+                cond_result = float(var_val) > float(value)
+            except Exception:
+                cond_result = False
+        elif operator == "<":
+            try:
+                cond_result = float(var_val) < float(value)
+            except Exception:
+                cond_result = False
+        if result is None:
+            result = cond_result
+        elif logical_op == "AND":
+            result = result and cond_result
+        elif logical_op == "OR":
+            result = result or cond_result
+        else:
+            result = cond_result
+    return bool(result)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conditions", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=200000)
+    args = parser.parse_args()
+
+    operators = ("==", ">", "!=", "<")
+    conditions = [{"variable": f"v{i}", "operator": operators[i % 4], "value": str(i)}
+                  for i in range(args.conditions)]
+    # El primer caso falla en la primera condición (AND corta ahí); el segundo las cumple todas
+    cases = {"AND, falla la primera": {f"v{i}": "x" for i in range(args.conditions)},
+             "AND, se cumplen todas": {f"v{i}": str(i) if i % 4 == 0 else
+                                       (i + 1 if i % 4 == 1 else (i - 1 if i % 4 == 3 else "x"))
+                                       for i in range(args.conditions)}}
+    predicate = compile_conditions(conditions, "AND")
+    for name, context in cases.items():
+        assert predicate(context) == legacy_evaluate(conditions, "AND", context)
+        legacy = timeit.timeit(lambda: legacy_evaluate(conditions, "AND", context), number=args.runs)
+        compiled = timeit.timeit(lambda: predicate(context), number=args.runs)
+        print(f"{name:24s} ({args.conditions} condiciones): anterior {args.runs / legacy:12,.0f} eval/s | "
+              f"compilada {args.runs / compiled:12,.0f} eval/s | x{legacy / compiled:4.1f}")
+
+if __name__ == "__main__":
+    main()
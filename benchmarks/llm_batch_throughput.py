@@ -0,0 +1,39 @@
+# benchmarks/llm_batch_throughput.py
+# Mide el rendimiento del modo por lotes del LLM (AsyncBatchRunner + LLMBatchDispatcher)
+# contra el servidor LLM de prueba, para distintos tamaños de lote (requiere la librería ollama).
+# Uso: python -m benchmarks.llm_batch_throughput --records 512 --delay 0.05
+import argparse
+import contextlib
+import io
+import os
+from benchmarks.async_throughput import llm_flow
+from benchmarks.stub_llm_server import start_stub_server
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=512)
+    parser.add_argument("--delay", type=float, default=0.05)
+    parser.add_argument("--sizes", default="1,8,32,128", help="Tamaños de lote separados por coma")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(delay=args.delay)
+    os.environ["OLLAMA_HOST"] = url
+    from engine.async_runner import AsyncFlowRunner
+    from engine.batch import AsyncBatchRunner
+
+    print(f"Retardo del LLM: {args.delay * 1000:.0f} ms | {args.records} registros")
+    for size in (int(s) for s in args.sizes.split(",")):
+        # Con lotes de 1 se envían los prompts de a uno: se limitan los registros para no esperar demasiado
+        records = [{"cliente": f"cliente-{i}"} for i in range(args.records if size > 1 else min(args.records, 64))]
+        runner = AsyncFlowRunner.from_dict(llm_flow(), llm_batch_size=size)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = AsyncBatchRunner(runner, max_in_flight=max(256, size * 2)).run(records, output)
+        dispatcher = runner._llm_dispatcher
+        runner.close()
+        print(f"Lote {size:4d}: {stats.records_per_second:8.1f} registros/s | "
+              f"lote promedio {dispatcher.average_batch_size:6.1f} | fallidos {stats.failed}")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# benchmarks/python_pool_overhead.py
+# Mide el costo por llamada de un nodo Python ejecutado en el proceso del motor
+# y en el pool de procesos aislados (PythonWorkerPool), para elegir el modo de cada nodo.
+# Uso: python -m benchmarks.python_pool_overhead --runs 2000
+import argparse
+import contextlib
+import io
+import time
+from models.python_node import PythonNode
+from models.python_pool import PythonWorkerPool
+
+CODE = "def func(a, b):\n    return {'suma': int(a) + int(b), 'texto': str(a) * 10}"
+
+def time_node(isolated, runs, pool):
+    node = PythonNode(0, 0)
+    node.config.update(code=CODE, params=["a", "b"], variable_name="r", isolated=isolated)
+    step = node.compile()
+    with contextlib.redirect_stdout(io.StringIO()):
+        step({"a": 1, "b": 2, "python_pool": pool})  # Primera llamada: compila y calienta el proceso
+        t0 = time.perf_counter()
+        for i in range(runs):
+            step({"a": i, "b": 2, "python_pool": pool})
+    return (time.perf_counter() - t0) / runs * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    pool = PythonWorkerPool(workers=args.workers)
+    t0 = time.perf_counter()
+    pool.start()
+    pool.call(CODE, "warmup", {"a": 1, "b": 1})
+    print(f"Inicio del pool ({args.workers} procesos): {(time.perf_counter() - t0) * 1000:.1f} ms")
+    in_process = time_node(False, args.runs, pool)
+    isolated = time_node(True, args.runs, pool)
+    print(f"En proceso: {in_process * 1000:8.1f} µs/llamada")
+    print(f"Aislado:    {isolated * 1000:8.1f} µs/llamada (costo medido por el pool: "
+          f"{pool.stats['overhead_ms'] * 1000:.1f} µs)")
+    pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/run_memory_writes.py
+# Escrituras por segundo de cada formato de la memoria de ejecuciones, en un
+# directorio temporal. "archivos" es el formato original (un JSON por ejecución).
+# La segunda parte compara la escritura directa con fsync por ejecución contra
+# BackgroundRunWriter (un fsync por grupo): latencia de save() y throughput total.
+# Uso: python -m benchmarks.run_memory_writes --runs 20000
+import argparse
+import os
+import tempfile
+import time
+from models.run_memory import BackgroundRunWriter, create_run_memory
+
+def sample_context(i):
+    return {"nombre": f"cliente-{i}", "edad": 20 + i % 50, "respuesta": "Hola, " * 20, "aprobado": i % 3 == 0}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20000)
+    parser.add_argument("--flush-every", type=int, default=100)
+    parser.add_argument("--durable-runs", type=int, default=2000, help="Ejecuciones de la comparación con fsync")
+    args = parser.parse_args()
+
+    contexts = [sample_context(i) for i in range(args.runs)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend, flush_every in (("archivos", 1), ("jsonl", 1), ("jsonl", args.flush_every),
+                                     ("binario", args.flush_every), ("sqlite", 1), ("sqlite", args.flush_every)):
+            # El formato original es lento: se mide con menos ejecuciones
+            runs = contexts if backend != "archivos" and (backend, flush_every) != ("sqlite", 1) else contexts[:2000]
+            path = os.path.join(tmp, f"{backend}-{flush_every}" + (".db" if backend == "sqlite" else ""))
+            store = create_run_memory(backend, path, flush_every)
+            t0 = time.perf_counter()
+            for context in runs:
+                store.save(context, "benchmark.json")
+            store.close()
+            elapsed = time.perf_counter() - t0
+            files = 1 if backend == "sqlite" else len(os.listdir(path))
+            t0 = time.perf_counter()
+            found = sum(1 for _ in create_run_memory(backend, path).query(flow="benchmark.json" if backend != "archivos"
+                                                                          else None))
+            query_ms = (time.perf_counter() - t0) * 1000
+            print(f"{backend:9s} (escritura cada {flush_every:3d}): {len(runs) / elapsed:10,.0f} escrituras/s | "
+                  f"{files:5d} archivos | consulta por flujo: {found} en {query_ms:.0f} ms")
+
+        print()
+        runs = contexts[:args.durable_runs]
+        for backend in ("jsonl", "sqlite"):
+            for durability in (None, "ninguna", "lote", "completa"):
+                path = os.path.join(tmp, f"durable-{backend}-{durability}" + (".db" if backend == "sqlite" else ""))
+                store = create_run_memory(backend, path)
+                if durability is None:
+                    # Escritura directa en el hilo de la ejecución, con fsync por ejecución
+                    save = lambda context: (store.save(context, "benchmark.json"), store.sync())
+                    label = "directa + fsync"
+                else:
+                    store = BackgroundRunWriter(store, durability=durability)
+                    save = lambda context: store.save(context, "benchmark.json")
+                    label = f"fondo, {durability}"
+                latencies = []
+                t0 = time.perf_counter()
+                for context in runs:
+                    t1 = time.perf_counter()
+                    save(context)
+                    latencies.append((time.perf_counter() - t1) * 1000)
+                store.close()
+                elapsed = time.perf_counter() - t0
+                latencies.sort()
+                p99 = latencies[int(len(latencies) * 0.99)]
+                groups = f" | {store.average_batch_size:.0f} por grupo" if durability is not None else ""
+                print(f"{backend:6s} {label:16s}: {len(runs) / elapsed:9,.0f} escrituras/s | save() p50 "
+                      f"{latencies[len(latencies) // 2]:.3f} ms, p99 {p99:.3f} ms{groups}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/server_load.py
+# Prueba de carga del servidor de flujos (engine/server.py): varios clientes
+# con conexión keep-alive envían ejecuciones en paralelo y se informa el
+# throughput y la latencia p50/p90/p99 de las respuestas.
+# Sin --url levanta un servidor en este proceso con un flujo de ejemplo
+# (Inicio -> Python -> Condicional -> Acción) o con --flow-file; con --llm-delay
+# el flujo de ejemplo incluye un nodo LLM contra el servidor LLM de prueba.
+# Uso: python -m benchmarks.server_load --requests 5000 --concurrency 16
+#      python -m benchmarks.server_load --url http://127.0.0.1:8080 --flow saludo --context '{"nombre": "Ana"}'
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+def sample_flow(with_llm=False):
+    nodes = [
+        {"id": "inicio", "x": 0, "y": 0, "node_type": "inicio", "text": "Inicio", "config": {}, "connected_to": "py"},
+        {"id": "py", "x": 0, "y": 0, "node_type": "python", "text": "Doble",
+         "config": {"code": "def func(edad):\n    return int(edad) * 2", "params": ["edad"], "variable_name": "doble"},
+         "connected_to": "cond"},
+        {"id": "cond", "x": 0, "y": 0, "node_type": "condicional", "text": "Mayor",
+         "config": {"conditions": [{"variable": "doble", "operator": ">", "value": "40"}], "logical_operator": "AND"},
+         "true_connection": "mayor", "false_connection": "menor"},
+        {"id": "mayor", "x": 0, "y": 0, "node_type": "accion", "text": "Mayor",
+         "config": {"action_type": "imprimir", "print_text": "mayor"}, "connected_to": "llm" if with_llm else None},
+        {"id": "menor", "x": 0, "y": 0, "node_type": "accion", "text": "Menor",
+         "config": {"action_type": "imprimir", "print_text": "menor"}, "connected_to": "llm" if with_llm else None},
+    ]
+    if with_llm:
+        nodes.append({"id": "llm", "x": 0, "y": 0, "node_type": "llm", "text": "LLM",
+                      "config": {"model": {"type": "free", "value": "stub"},
+                                 "personality": {"type": "free", "value": "Eres un asistente."},
+                                 "instructions": {"type": "free", "value": "Responde en una línea."},
+                                 "context": {"type": "free", "value": ""},
+                                 "prompt": {"type": "free", "value": "Edad ${edad}"},
+                                 "variable_name": "respuesta"},
+                      "connected_to": None})
+    return {"nodes": nodes, "variables": [{"name": "edad", "var_type": "integer", "value": "30"}]}
+
+def percentile(samples, fraction):
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+def load(url, flow, requests, concurrency, context):
+    """Envía 'requests' ejecuciones con 'concurrency' clientes. Retorna (latencias ordenadas en ms, errores, segundos)."""
+    parts = urlsplit(url)
+    path = f"{parts.path.rstrip('/')}/flows/{flow}/run"
+    latencies = []
+    errors = []
+    remaining = iter(range(requests))
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        own = []
+        while True:
+            with lock:
+                i = next(remaining, None)
+            if i is None:
+                break
+            body = json.dumps({"context": {**context, "edad": i % 50}}).encode("utf-8")
+            t0 = time.perf_counter()
+            try:
+                conn.request("POST", path, body, {"Content-Type": "application/json"})
+                response = conn.getresponse()
+                payload = response.read()
+                if response.status != 200:
+                    errors.append(f"{response.status}: {payload[:200]!r}")
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+                continue
+            own.append((time.perf_counter() - t0) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), errors, time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Servidor ya en marcha (por defecto se levanta uno en este proceso)")
+    parser.add_argument("--flow", help="Nombre del flujo a ejecutar (con --url)")
+    parser.add_argument("--flow-file", help="Flujo a servir cuando no se indica --url (por defecto uno de ejemplo)")
+    parser.add_argument("--context", default="{}", help="Contexto inicial de cada ejecución en JSON")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes simultáneos")
+    parser.add_argument("--max-concurrent", type=int, default=32, help="Ejecuciones simultáneas del servidor local")
+    parser.add_argument("--llm-delay", type=float,
+                        help="Agregar un nodo LLM al flujo de ejemplo, contra el servidor LLM de prueba con este retardo")
+    args = parser.parse_args()
+    context = json.loads(args.context)
+
+    if args.url:
+        if not args.flow:
+            parser.error("--url requiere --flow")
+        latencies, errors, elapsed = load(args.url, args.flow, args.requests, args.concurrency, context)
+    else:
+        stub = None
+        if args.llm_delay is not None:
+            from benchmarks.stub_llm_server import start_stub_server
+            stub, llm_url = start_stub_server(delay=args.llm_delay)
+            # Debe definirse antes de importar ollama (el cliente por defecto lo lee al importarse)
+            os.environ["OLLAMA_HOST"] = llm_url
+        from engine.server import FlowRegistry, FlowServer
+        with tempfile.TemporaryDirectory() as tmp:
+            flow_file = args.flow_file
+            if flow_file is None:
+                flow_file = os.path.join(tmp, "ejemplo.json")
+                with open(flow_file, "w", encoding="utf-8") as f:
+                    json.dump(sample_flow(args.llm_delay is not None), f)
+            registry = FlowRegistry([flow_file], reload_interval=0)
+            server = FlowServer(registry, port=0, max_concurrent=args.max_concurrent).start()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                latencies, errors, elapsed = load(server.address, FlowRegistry.flow_name(flow_file), args.requests,
+                                                  args.concurrency, context)
+            server.close()
+        if stub is not None:
+            stub.shutdown()
+
+    if not latencies:
+        print(f"Ninguna respuesta correcta ({len(errors)} errores); primer error: {errors[0] if errors else '-'}")
+        return
+    print(f"Peticiones: {len(latencies)} correctas, {len(errors)} errores | {args.concurrency} clientes | "
+          f"{len(latencies) / elapsed:,.0f} ejecuciones/s")
+    print(f"Latencia: p50 {percentile(latencies, 0.5):.2f} ms, p90 {percentile(latencies, 0.9):.2f} ms, "
+          f"p99 {percentile(latencies, 0.99):.2f} ms, máx {latencies[-1]:.2f} ms")
+    if errors:
+        print(f"Primer error: {errors[0]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/smtp_throughput.py
+# Compara el envío de correos del nodo SMTP con una conexión por correo, con el
+# pool de sesiones (SmtpConnectionPool) y con la cola de envío (SmtpSendQueue),
+# contra el servidor SMTP de prueba (sin TLS).
+# Uso: python -m benchmarks.smtp_throughput --records 200 --handshake-delay 0.1
+import argparse
+import contextlib
+import io
+import time
+from benchmarks.stub_smtp_server import start_stub_smtp_server
+from engine.batch import BatchRunner
+from engine.flow_runner import FlowRunner
+from models.smtp_transport import SmtpConnectionPool, SmtpSendQueue
+
+def smtp_flow(port):
+    return {
+        "nodes": [
+            {"id": "inicio", "x": 0, "y": 0, "node_type": "inicio", "text": "Inicio",
+             "config": {}, "connected_to": "smtp"},
+            {"id": "smtp", "x": 0, "y": 0, "node_type": "smtp", "text": "SMTP",
+             "config": {
+                 "smtp_server": "127.0.0.1", "smtp_port": str(port), "user": "bench", "password": "bench",
+                 "from": "bench@example.com", "to": "cliente@example.com",
+                 "subject": "Hola ${cliente}", "body": "Mensaje para ${cliente}",
+                 "is_html": False, "use_tls": False, "variable_name": "estado_envio"},
+             "connected_to": None},
+        ],
+        "variables": [],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--handshake-delay", type=float, default=0.1, help="Segundos por conexión nueva")
+    parser.add_argument("--message-delay", type=float, default=0.002, help="Segundos por correo")
+    args = parser.parse_args()
+
+    server, port = start_stub_smtp_server(handshake_delay=args.handshake_delay, message_delay=args.message_delay)
+    records = [{"cliente": f"cliente-{i}"} for i in range(args.records)]
+    print(f"Conexión nueva: {args.handshake_delay * 1000:.0f} ms | {args.records} correos")
+    for name, transport in (("Una conexión por correo", None),
+                            ("Pool de sesiones", SmtpConnectionPool()),
+                            ("Cola de envío", SmtpSendQueue())):
+        runner = FlowRunner.from_dict(smtp_flow(port), smtp_transport=transport)
+        connections = server.connections
+        output = io.StringIO()
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = BatchRunner(runner).run(records, output)
+            if transport is not None:
+                transport.close()
+        elapsed = time.perf_counter() - t0
+        print(f"{name:24s}: {args.records / elapsed:8.1f} correos/s | "
+              f"conexiones {server.connections - connections:4d} | fallidos {stats.failed}")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
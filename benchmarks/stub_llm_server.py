@@ -0,0 +1,90 @@
+# benchmarks/stub_llm_server.py
+# Servidor HTTP mínimo que imita el endpoint /api/chat de Ollama, para medir el
+# motor sin depender de un modelo real. Responde tras 'delay' segundos.
+# Uso: python -m benchmarks.stub_llm_server --port 11435 --delay 0.05
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Mantiene la conexión abierta (keep-alive)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.server.delay)
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        if request.get("stream", True):
+            self._stream_response(request, f"eco: {prompt}")
+            return
+        body = json.dumps({
+            "model": request.get("model", ""),
+            "created_at": "2024-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": f"eco: {prompt}"},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": len(prompt.split()),
+            "eval_count": len(prompt.split()) + 1,
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_response(self, request, content):
+        # Igual que Ollama: NDJSON con un fragmento por línea, usando transferencia "chunked"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.token_delay)
+            self._write_chunk({"model": request.get("model", ""), "created_at": "2024-01-01T00:00:00Z",
+                               "message": {"role": "assistant", "content": word + (" " if i < len(words) - 1 else "")},
+                               "done": False})
+        self._write_chunk({"model": request.get("model", ""), "created_at": "2024-01-01T00:00:00Z",
+                           "message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop",
+                           "eval_count": len(words)})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data):
+        line = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+class StubLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # Cientos de conexiones simultáneas
+
+def start_stub_server(host="127.0.0.1", port=0, delay=0.05, token_delay=0.005):
+    """
+    Inicia el servidor en un hilo y retorna (server, url). 'delay' es la espera
+    antes de la respuesta (o del primer token) y 'token_delay' la espera entre tokens.
+    """
+    server = StubLLMServer((host, port), StubLLMHandler)
+    server.delay = delay
+    server.token_delay = token_delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor LLM de prueba compatible con /api/chat de Ollama")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--delay", type=float, default=0.05, help="Segundos de 'inferencia' por respuesta")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Segundos entre tokens en modo streaming")
+    args = parser.parse_args()
+    server, url = start_stub_server(args.host, args.port, args.delay, args.token_delay)
+    print(f"Servidor LLM de prueba en {url} (OLLAMA_HOST={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,81 @@
+# benchmarks/stub_smtp_server.py
+# Servidor SMTP mínimo (sin TLS) que acepta y descarta los correos, para medir
+# el envío sin depender de un servidor real. Cada conexión nueva espera
+# 'handshake_delay' segundos, en lugar de la negociación TLS y el login.
+# Uso: python -m benchmarks.stub_smtp_server --port 8025 --handshake-delay 0.1
+import argparse
+import socketserver
+import threading
+import time
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode("ascii"))
+        self.wfile.flush()
+
+    def handle(self):
+        time.sleep(self.server.handshake_delay)
+        self.server.count("connections")
+        self.reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-stub")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif verb == "AUTH":
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                time.sleep(self.server.message_delay)
+                self.server.count("messages")
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+    def __init__(self, address, handshake_delay=0.1, message_delay=0.0):
+        super().__init__(address, StubSMTPHandler)
+        self.handshake_delay = handshake_delay
+        self.message_delay = message_delay
+        self.connections = 0
+        self.messages = 0
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+def start_stub_smtp_server(host="127.0.0.1", port=0, handshake_delay=0.1, message_delay=0.0):
+    """Inicia el servidor en un hilo y retorna (server, puerto)."""
+    server = StubSMTPServer((host, port), handshake_delay, message_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor SMTP de prueba que descarta los correos")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--handshake-delay", type=float, default=0.1, help="Segundos de espera por conexión nueva")
+    parser.add_argument("--message-delay", type=float, default=0.0, help="Segundos de espera por correo")
+    args = parser.parse_args()
+    server, port = start_stub_smtp_server(args.host, args.port, args.handshake_delay, args.message_delay)
+    print(f"Servidor SMTP de prueba en {args.host}:{port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,33 @@
+# benchmarks/template_render.py
+# Compara la interpolación ${var} anterior (re.findall + str.replace por variable
+# en cada ejecución) con las plantillas compiladas de models.template.
+# Uso: python -m benchmarks.template_render --placeholders 1,10,50 --runs 20000
+import argparse
+import re
+import timeit
+from models.template import compile_template
+
+def legacy_render(text, context):
+    # Implementación anterior de los nodos LLM y SMTP
+    for var in re.findall(r'\$\{([^}]+)\}', text):
+        text = text.replace(f"${{{var}}}", str(context.get(var, "")))
+    return text
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--placeholders", default="1,10,50", help="Cantidades de variables separadas por coma")
+    parser.add_argument("--runs", type=int, default=20000)
+    args = parser.parse_args()
+
+    for count in (int(c) for c in args.placeholders.split(",")):
+        text = " ".join(f"campo {i}: ${{var{i}}}." for i in range(count))
+        context = {f"var{i}": f"valor {i}" for i in range(count)}
+        template = compile_template(text)
+        assert template.render(context) == legacy_render(text, context)
+        legacy = timeit.timeit(lambda: legacy_render(text, context), number=args.runs)
+        compiled = timeit.timeit(lambda: template.render(context), number=args.runs)
+        print(f"{count:4d} variables: anterior {legacy / args.runs * 1e6:8.2f} µs | "
+              f"compilada {compiled / args.runs * 1e6:8.2f} µs | x{legacy / compiled:5.1f}")
+
+if __name__ == "__main__":
+    main()
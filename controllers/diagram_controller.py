@@ -2,7 +2,12 @@
 from models.node_factory import NodeFactory
 from models.graph_manager import GraphManager
 from models.variable_manager import VariableManager
+from models.flow_serializer import FlowSerializer
+from models.input_provider import TkInputProvider
+from engine.flow_runner import FlowRunner
 from models.ollama_client import OllamaClient
+from models.run_memory import BackgroundRunWriter, SegmentRunStore
+from models.node_memo import NodeMemo, describe_report
 import os, json, uuid, re
 import tkinter as tk
 from tkinter import simpledialog, messagebox, Toplevel, filedialog
@@ -22,6 +27,21 @@ class DiagramController:
         self.deleting_connection = False
         self.start_x = None
         self.start_y = None
+        self.flow_name = None   # Archivo del flujo abierto o guardado (se registra con cada ejecución)
+        # Ejecuciones anexadas a segmentos JSONL desde un hilo en segundo plano (no demoran la interfaz)
+        self.run_memory = BackgroundRunWriter(SegmentRunStore("memoria"))
+        # Resultados de los nodos LLM y Python marcados para reutilizar su resultado (config["memo"]): al
+        # editar un nodo y volver a ejecutar solo se recalcula ese nodo y los que dependen de él
+        self.node_memo = NodeMemo()
+        # Métricas de las ejecuciones (formato Prometheus): solo si la variable de entorno FLOW_METRICS_FILE
+        # indica el archivo donde escribirlas cada 10 segundos
+        self.metrics = None
+        self.metrics_dump = None
+        metrics_path = os.environ.get("FLOW_METRICS_FILE")
+        if metrics_path:
+            from engine.metrics import MetricsFileDumper, MetricsRegistry
+            self.metrics = MetricsRegistry()
+            self.metrics_dump = MetricsFileDumper(self.metrics, metrics_path)
         self.load_default_variables()
 
     def load_default_variables(self):
@@ -38,41 +58,13 @@ class DiagramController:
 
     def save_flow(self):
         # Serializar nodos y variables a un diccionario
-        flow_data = {}
-        nodes_list = []
-        for node in self.nodes.values():
-            node_dict = {
-                "id": node.id,
-                "x": node.x,
-                "y": node.y,
-                "node_type": node.node_type,
-                "text": node.text,
-                "title": node.title,
-                "config": node.config,
-                # Para conexiones, almacenamos el id del nodo conectado (si existe)
-                "connected_to": node.connected_to.id if node.connected_to else None,
-                # Para nodos condicionales (si aplicable)
-                "true_connection": getattr(node, "true_connection", None).id if getattr(node, "true_connection", None) else None,
-                "false_connection": getattr(node, "false_connection", None).id if getattr(node, "false_connection", None) else None
-            }
-            nodes_list.append(node_dict)
-        flow_data["nodes"] = nodes_list
-
-        # Serializar variables
-        vars_list = []
-        for var in self.variable_manager.get_all_variables():
-            vars_list.append({
-                "name": var.name,
-                "var_type": var.var_type,
-                "value": var.value
-            })
-        flow_data["variables"] = vars_list
+        flow_data = FlowSerializer.to_dict(self.nodes.values(), self.variable_manager.get_all_variables())
 
         file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON Files", "*.json")])
         if file_path:
             try:
-                with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump(flow_data, f, indent=4)
+                FlowSerializer.save(flow_data, file_path)
+                self.flow_name = os.path.basename(file_path)
                 messagebox.showinfo("Guardar Flujo", f"Flujo guardado en: {file_path}")
             except Exception as e:
                 messagebox.showwarning("Guardar Flujo", f"No se pudo guardar el archivo: {str(e)}")
@@ -82,8 +74,8 @@ class DiagramController:
         if not file_path:
             return
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                flow_data = json.load(f)
+            flow_data = FlowSerializer.load(file_path)
+            self.flow_name = os.path.basename(file_path)
         except Exception as e:
             messagebox.showwarning("Cargar Flujo", f"Error al leer el archivo: {str(e)}")
             return
@@ -99,37 +91,14 @@ class DiagramController:
             self.variable_manager.load_variables(flow_data["variables"])
             self.view.update_variables_panel(self.variable_manager.get_all_variables())
 
-        # Crear nodos usando la factoría (se espera que cada nodo se configure de forma propia)
-        for nd in flow_data.get("nodes", []):
-            node = NodeFactory.create_node(nd["node_type"], nd["x"], nd["y"])
-            node.id = nd["id"]  # Restaurar el id original
-            node.text = nd["text"]
-            node.title = nd.get("title", "")
-            node.config = nd.get("config", {})
-            self.nodes[node.id] = node
+        # Crear nodos y conexiones lógicas usando el serializador (que a su vez usa la factoría)
+        self.nodes = FlowSerializer.nodes_from_dict(flow_data)
 
         # Crear vistas para cada nodo
         for node in self.nodes.values():
             node_view = self.view.create_node_view(node)
             self.node_views[node.id] = node_view
 
-        # Establecer conexiones lógicas
-        for nd in flow_data.get("nodes", []):
-            node = self.nodes[nd["id"]]
-            if nd.get("connected_to"):
-                target = self.nodes.get(nd["connected_to"])
-                if target:
-                    node.connected_to = target
-            if node.node_type == "condicional":
-                if nd.get("true_connection"):
-                    target = self.nodes.get(nd["true_connection"])
-                    if target:
-                        node.true_connection = target
-                if nd.get("false_connection"):
-                    target = self.nodes.get(nd["false_connection"])
-                    if target:
-                        node.false_connection = target
-
         # Dibujar conexiones en el canvas
         for node in self.nodes.values():
             if node.node_type == "condicional":
@@ -139,6 +108,11 @@ class DiagramController:
                 if node.false_connection:
                     line_id = self.view.create_connection_view(node, node.false_connection, branch="false")
                     setattr(node, "false_connection_id", line_id)
+            elif node.node_type == "paralelo":
+                # Una línea por rama: id del nodo inicial de la rama -> id de la línea
+                setattr(node, "branch_connection_ids", {
+                    target.id: self.view.create_connection_view(node, target) for target in node.branches
+                })
             else:
                 if node.connected_to:
                     line_id = self.view.create_connection_view(node, node.connected_to)
@@ -252,6 +226,17 @@ class DiagramController:
                         self.view.delete_connection_view(conn_id)
                     node.connected_to.connected_from = None
 
+                # Ramas de nodos Paralelo que salen de este nodo o llegan a él
+                for other in self.nodes.values():
+                    if other.node_type != "paralelo":
+                        continue
+                    branch_ids = getattr(other, "branch_connection_ids", {})
+                    for target_id in list(branch_ids):
+                        if other is node or target_id == node.id:
+                            self.view.delete_connection_view(branch_ids.pop(target_id))
+                    if other is not node:
+                        other.branches = [target for target in other.branches if target is not node]
+
                 self.view.delete_node_view(self.node_views[node.id])
                 self.graph_manager.remove_node(node.id)
                 del self.nodes[node.id]
@@ -335,6 +320,18 @@ class DiagramController:
                         else:
                             start_node.false_connection = target_node
                             setattr(start_node, "false_connection_id", connection_id)
+                    elif start_node.node_type == "paralelo":
+                        # Cada conexión de salida agrega una rama
+                        if target_node in start_node.branches:
+                            self.view.show_warning("La rama ya existe")
+                            self.view.canvas.itemconfig(self.node_views[self.connection_start_id].ids["output"], fill="black")
+                            self.connection_start_id = None
+                            return
+                        connection_id = self.view.create_connection_view(start_node, target_node)
+                        start_node.branches.append(target_node)
+                        if not hasattr(start_node, "branch_connection_ids"):
+                            setattr(start_node, "branch_connection_ids", {})
+                        start_node.branch_connection_ids[target_node.id] = connection_id
                     else:
                         if start_node.connected_to:
                             self.view.show_warning("El nodo ya tiene conexión establecida")
@@ -399,6 +396,9 @@ class DiagramController:
                 self.view.update_node_view(self.node_views[node.id])
                 if node.connected_to and hasattr(node, "outgoing_connection_id"):
                     self.view.update_connection_view(node.outgoing_connection_id, node, node.connected_to)
+                for target in getattr(node, "branches", []):
+                    if target.id in getattr(node, "branch_connection_ids", {}):
+                        self.view.update_connection_view(node.branch_connection_ids[target.id], node, target)
                 for other in self.nodes.values():
                     if other == node:
                         continue
@@ -409,6 +409,8 @@ class DiagramController:
                             self.view.update_connection_view(other.true_connection_id, other, node, branch="true")
                         if other.false_connection == node and hasattr(other, "false_connection_id"):
                             self.view.update_connection_view(other.false_connection_id, other, node, branch="false")
+                    if other.node_type == "paralelo" and node.id in getattr(other, "branch_connection_ids", {}):
+                        self.view.update_connection_view(other.branch_connection_ids[node.id], other, node)
                 self.start_x = event.x
                 self.start_y = event.y
         except Exception as e:
@@ -454,6 +456,14 @@ class DiagramController:
                         delattr(node, "false_connection_id")
                         self.selected_connection_id = None
                         return
+                if node.node_type == "paralelo":
+                    for target_id, line_id in getattr(node, "branch_connection_ids", {}).items():
+                        if line_id == self.selected_connection_id:
+                            self.view.delete_connection_view(line_id)
+                            node.branches = [target for target in node.branches if target.id != target_id]
+                            del node.branch_connection_ids[target_id]
+                            self.selected_connection_id = None
+                            return
         except Exception as e:
             messagebox.showerror("Error", f"Ocurrió un problema al eliminar la conexión: {str(e)}")
         finally:
@@ -473,32 +483,22 @@ class DiagramController:
 
     # --- Ejecución del flujo ---
     def handle_execute_flow(self):
-        start_node = None
-        for node in self.nodes.values():
-            if node.node_type == "inicio":
-                start_node = node
-                break
-        if not start_node:
-            self.view.show_warning("Debe existir un nodo de inicio")
+        # Sin nodos marcados para memoizar no se usa la memoización (ni se envuelven los pasos)
+        memo = self.node_memo if any(node.memo_signature() is not None for node in self.nodes.values()) else None
+        try:
+            runner = FlowRunner(self.nodes, input_provider=TkInputProvider(self.view.root),
+                                run_memory=self.run_memory, flow_name=self.flow_name, memo=memo,
+                                metrics=self.metrics)
+        except ValueError as e:
+            self.view.show_warning(str(e))
             return
 
-        context = {"root": self.view.root}
-        current_node = start_node
         print("Ejecución del Flujo:")
-
-        while current_node:
-            # Cada nodo se encarga de ejecutar su acción y retornar el siguiente
-            current_node = current_node.execute(context)
-
-        memory_folder = "memoria"
-        if not os.path.exists(memory_folder):
-            os.makedirs(memory_folder)
-        mem_id = str(uuid.uuid4())
-        filename = os.path.join(memory_folder, f"{mem_id}.json")
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(context, f, indent=4)
+        context = runner.run({"root": self.view.root})
         print("Flujo completado exitosamente")
-        print("Memoria guardada en:", filename)
+        if context.get("memo_report"):
+            print("Nodos memoizados:", describe_report(context["memo_report"], self.nodes))
+        print("Memoria guardada en:", self.run_memory.location)
 
     def show_multiples_response_dialog(self, question, responses):
         dialog = Toplevel(self.view.root)
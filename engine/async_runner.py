@@ -0,0 +1,98 @@
+# engine/async_runner.py
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from engine.flow_runner import FlowRunner
+from engine.plan import ExecutionPlan
+from engine.llm_dispatch import LLMBatchDispatcher
+
+class AsyncFlowRunner(FlowRunner):
+    """
+    Motor asíncrono: compila el flujo con FlowNode.compile_async, de modo que
+    cientos de ejecuciones pueden estar en curso en un mismo event loop.
+    - Las llamadas al LLM son asíncronas y se limitan con 'llm_semaphore'.
+    - Los nodos que bloquean (Python, SMTP, preguntas) se ejecutan en un pool de hilos.
+    - Con 'llm_batch_size', los prompts pendientes de un mismo nodo y modelo se
+      agrupan y envían en lotes (ver LLMBatchDispatcher) en lugar de usar el semáforo.
+    """
+    def __init__(self, nodes, variables=None, input_provider=None, llm_cache=None, llm_clients=None,
+                 llm_stream=None, max_llm_concurrency=8, max_workers=None, llm_batch_size=None,
+                 llm_batch_wait_ms=5.0, smtp_transport=None, python_pool=None, run_memory=None,
+                 flow_name=None, metrics=None):
+        self.max_llm_concurrency = max_llm_concurrency
+        self.llm_batch_size = llm_batch_size
+        self.llm_batch_wait_ms = llm_batch_wait_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="flow-blocking")
+        self._llm_semaphore = None
+        self._llm_dispatcher = None
+        self._loop = None
+        super().__init__(nodes, variables, input_provider, llm_cache, llm_clients, llm_stream, smtp_transport,
+                         python_pool, run_memory, flow_name, metrics=metrics)
+        if metrics is not None:
+            self.async_plan = ExecutionPlan.compile(
+                nodes, lambda node: metrics.wrap_async(node, node.compile_async(self)))
+        else:
+            self.async_plan = ExecutionPlan.compile(nodes, lambda node: node.compile_async(self))
+
+    def _bind_loop(self):
+        # El semáforo y el despachador pertenecen al event loop en el que se usan por primera vez
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._llm_dispatcher is not None:
+                self._llm_dispatcher.close()
+            self._llm_semaphore = asyncio.Semaphore(self.max_llm_concurrency)
+            self._llm_dispatcher = (LLMBatchDispatcher(self.llm_batch_size, self.llm_batch_wait_ms)
+                                    if self.llm_batch_size else None)
+            self._loop = loop
+
+    @property
+    def llm_semaphore(self):
+        self._bind_loop()
+        return self._llm_semaphore
+
+    @property
+    def llm_dispatcher(self):
+        self._bind_loop()
+        return self._llm_dispatcher
+
+    async def run_blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def run_async(self, context=None):
+        with self._measure():
+            ctx = await self.async_plan.run_async(self.initial_context(context))
+            # Los envíos encolados se esperan sin bloquear el event loop
+            for var_name, future in ctx.pop("deferred_results", ()):
+                result = await asyncio.wrap_future(future)
+                if var_name:
+                    ctx[var_name] = result
+        self.remember(ctx)
+        return ctx
+
+    async def run_many(self, contexts, max_in_flight=256):
+        """
+        Ejecuta el flujo para cada contexto con hasta 'max_in_flight' ejecuciones
+        simultáneas. Retorna los resultados en el mismo orden; si una ejecución
+        falla, su posición contiene la excepción.
+        """
+        limit = asyncio.Semaphore(max_in_flight)
+
+        async def run_one(context):
+            async with limit:
+                return await self.run_async(context)
+
+        return await asyncio.gather(*(run_one(ctx) for ctx in contexts), return_exceptions=True)
+
+    def benchmark(self, contexts, max_in_flight=256):
+        """Ejecuta run_many en un event loop nuevo y retorna (resultados, ejecuciones por segundo)."""
+        contexts = list(contexts)
+        t0 = time.perf_counter()
+        results = asyncio.run(self.run_many(contexts, max_in_flight))
+        elapsed = time.perf_counter() - t0
+        return results, (len(contexts) / elapsed if elapsed > 0 else 0.0)
+
+    def close(self):
+        if self._llm_dispatcher is not None:
+            self._llm_dispatcher.close()
+        self.executor.shutdown(wait=True)
+        super().close()
@@ -0,0 +1,252 @@
+# engine/batch.py
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing.util import Finalize
+from engine.flow_runner import FlowRunner, clean_context
+
+def read_records(file_path):
+    """
+    Lee registros de entrada uno a uno (sin cargar el archivo completo en memoria).
+    Soporta CSV (con encabezados) y JSONL (un objeto JSON por línea). "-" lee JSONL de stdin.
+    """
+    if file_path == "-":
+        yield from _read_jsonl(sys.stdin)
+        return
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        if file_path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield dict(row)
+        else:
+            yield from _read_jsonl(f)
+
+def _read_jsonl(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def format_result(index, context=None, error=None):
+    # Una línea JSONL por registro procesado
+    if error is not None:
+        return json.dumps({"index": index, "error": error}, ensure_ascii=False) + "\n"
+    return json.dumps({"index": index, "context": clean_context(context)}, ensure_ascii=False, default=str) + "\n"
+
+class BatchStats:
+    def __init__(self):
+        self.total = 0
+        self.failed = 0
+        self.elapsed_s = 0.0
+
+    @property
+    def records_per_second(self):
+        return self.total / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def summary(self):
+        return (f"Registros: {self.total} (fallidos: {self.failed}) | "
+                f"{self.elapsed_s:.3f} s | {self.records_per_second:.1f} registros/s")
+
+class BatchRunner:
+    """
+    Ejecuta un mismo flujo (ya compilado en el FlowRunner) sobre un flujo de
+    registros de entrada, escribiendo un resultado por registro en 'output'.
+    La memoria usada no depende del tamaño de la entrada: cada registro se
+    lee, ejecuta y escribe antes de pasar al siguiente.
+    Con 'batch_size' > 1 los registros se leen en bloques de ese tamaño que
+    avanzan juntos por el flujo (ver FlowRunner.run_batch), de modo que los
+    nodos con versión por lotes, como el Condicional, los procesan por columnas.
+    """
+    def __init__(self, runner, batch_size=1):
+        self.runner = runner
+        self.batch_size = max(batch_size, 1)
+        self.stats = BatchStats()
+
+    def run(self, records, output):
+        stats = self.stats = BatchStats()
+        t0 = time.perf_counter()
+        if self.batch_size > 1:
+            records = iter(records)
+            index = 0
+            while True:
+                chunk = list(islice(records, self.batch_size))
+                if not chunk:
+                    break
+                lines, total, failed = run_records_batch(self.runner, index, chunk)
+                output.write(lines)
+                stats.total += total
+                stats.failed += failed
+                index += total
+            stats.elapsed_s = time.perf_counter() - t0
+            return stats
+        run = self.runner.run
+        for index, record in enumerate(records):
+            try:
+                line = format_result(index, run(record))
+            except Exception as e:
+                stats.failed += 1
+                line = format_result(index, error=f"{type(e).__name__}: {e}")
+            output.write(line)
+            stats.total += 1
+        stats.elapsed_s = time.perf_counter() - t0
+        return stats
+
+def run_records_batch(runner, start_index, records):
+    """Ejecuta un bloque con runner.run_batch y retorna (líneas JSONL, registros, fallidos)."""
+    lines = []
+    failed = 0
+    for offset, result in enumerate(runner.run_batch(records)):
+        if isinstance(result, Exception):
+            failed += 1
+            lines.append(format_result(start_index + offset, error=f"{type(result).__name__}: {result}"))
+        else:
+            lines.append(format_result(start_index + offset, result))
+    return "".join(lines), len(records), failed
+
+
+# --- Ejecución en paralelo (un FlowRunner por proceso) ---
+_worker_runner = None
+
+def _init_worker(flow_data, input_provider, quiet, runner_kwargs):
+    # Se ejecuta una sola vez por proceso: carga y compila el flujo
+    global _worker_runner
+    _worker_runner = FlowRunner.from_dict(flow_data, input_provider, **runner_kwargs)
+    Finalize(_worker_runner, _worker_runner.close, exitpriority=10)
+    if _worker_runner.smtp_transport is not None:
+        # Al terminar el proceso se envían los correos que sigan en cola y se cierran las conexiones
+        Finalize(_worker_runner, _worker_runner.smtp_transport.close, exitpriority=10)
+    if _worker_runner.python_pool is not None:
+        Finalize(_worker_runner, _worker_runner.python_pool.close, exitpriority=10)
+    if _worker_runner.run_memory is not None:
+        Finalize(_worker_runner, _worker_runner.run_memory.close, exitpriority=10)
+    if _worker_runner.tracer is not None:
+        Finalize(_worker_runner, _worker_runner.tracer.close, exitpriority=10)
+    # Los mensajes de los nodos nunca deben mezclarse con los resultados
+    sys.stdout = open(os.devnull, "w") if quiet else sys.stderr
+
+def _run_chunk(start_index, records, by_batch=False):
+    if by_batch:
+        lines, total, failed = run_records_batch(_worker_runner, start_index, records)
+    else:
+        lines = []
+        failed = 0
+        run = _worker_runner.run
+        for offset, record in enumerate(records):
+            try:
+                lines.append(format_result(start_index + offset, run(record)))
+            except Exception as e:
+                failed += 1
+                lines.append(format_result(start_index + offset, error=f"{type(e).__name__}: {e}"))
+        lines, total = "".join(lines), len(records)
+    # Las métricas del proceso viajan con cada bloque (acumuladas) y el proceso principal las suma
+    metrics = _worker_runner.metrics
+    snapshot = (os.getpid(), metrics.snapshot(include_remote=False)) if metrics is not None else None
+    return lines, total, failed, snapshot
+
+class ParallelBatchRunner:
+    """
+    Igual que BatchRunner pero reparte los registros en bloques entre un
+    ProcessPoolExecutor. Cada proceso carga el flujo una sola vez (en el
+    initializer). Los resultados se escriben en el mismo orden que la entrada
+    y solo se mantienen en vuelo unos pocos bloques por proceso, por lo que la
+    memoria sigue acotada. Con 'by_batch', cada bloque avanza junto por el
+    flujo (FlowRunner.run_batch) en lugar de ejecutarse registro por registro.
+    """
+    def __init__(self, flow_data, input_provider=None, workers=None, chunk_size=64, quiet=False, runner_kwargs=None,
+                 by_batch=False, metrics=None):
+        self.flow_data = flow_data
+        self.input_provider = input_provider
+        self.runner_kwargs = runner_kwargs or {}  # Argumentos extra del FlowRunner de cada proceso (p. ej. llm_cache)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(chunk_size, 1)
+        self.quiet = quiet
+        self.by_batch = by_batch
+        self.metrics = metrics    # MetricsRegistry del proceso principal, donde se suman las de cada proceso
+        self.stats = BatchStats()
+
+    def _chunks(self, records):
+        records = iter(records)
+        start = 0
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                return
+            yield start, chunk
+            start += len(chunk)
+
+    def run(self, records, output):
+        stats = self.stats = BatchStats()
+        t0 = time.perf_counter()
+        max_pending = self.workers * 2
+        pending = deque()
+
+        def write_next():
+            lines, total, failed, snapshot = pending.popleft().result()
+            if snapshot is not None and self.metrics is not None:
+                self.metrics.set_remote(*snapshot)
+            output.write(lines)
+            stats.total += total
+            stats.failed += failed
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.flow_data, self.input_provider, self.quiet,
+                                           self.runner_kwargs)) as pool:
+            for start, chunk in self._chunks(records):
+                pending.append(pool.submit(_run_chunk, start, chunk, self.by_batch))
+                if len(pending) >= max_pending:
+                    write_next()
+            while pending:
+                write_next()
+        stats.elapsed_s = time.perf_counter() - t0
+        return stats
+
+
+class AsyncBatchRunner:
+    """
+    Ejecuta los registros sobre un AsyncFlowRunner con hasta 'max_in_flight'
+    ejecuciones simultáneas. Pensado para flujos con nodos LLM: si el runner
+    tiene 'llm_batch_size', los prompts de los registros que llegan al mismo
+    nodo se envían en lotes. Los resultados se escriben en el orden de entrada.
+    """
+    def __init__(self, runner, max_in_flight=256):
+        self.runner = runner
+        self.max_in_flight = max(max_in_flight, 1)
+        self.stats = BatchStats()
+
+    def run(self, records, output):
+        return asyncio.run(self.run_async(records, output))
+
+    async def run_async(self, records, output):
+        stats = self.stats = BatchStats()
+        t0 = time.perf_counter()
+        pending = deque()
+
+        async def run_one(record):
+            return await self.runner.run_async(record)
+
+        def write_next():
+            index, task = pending.popleft()
+            try:
+                line = format_result(index, task.result())
+            except Exception as e:
+                stats.failed += 1
+                line = format_result(index, error=f"{type(e).__name__}: {e}")
+            output.write(line)
+            stats.total += 1
+
+        for index, record in enumerate(records):
+            pending.append((index, asyncio.ensure_future(run_one(record))))
+            if len(pending) >= self.max_in_flight:
+                await asyncio.wait([pending[0][1]])
+                while pending and pending[0][1].done():
+                    write_next()
+        while pending:
+            await asyncio.wait([pending[0][1]])
+            write_next()
+        stats.elapsed_s = time.perf_counter() - t0
+        return stats
@@ -0,0 +1,358 @@
+# engine/cli.py
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import uuid
+from engine.flow_runner import FlowRunner, clean_context
+from models.input_provider import ConsoleInputProvider, StaticInputProvider
+from models.ollama_client import OllamaClientRegistry
+from models.run_memory import RUN_MEMORY_BACKENDS, BackgroundRunWriter, create_run_memory
+# Los servicios opcionales (caché, SMTP, procesos aislados, memoización, perfil, trazas, métricas,
+# lotes) se importan en main() solo si se piden: así el inicio de una ejecución simple es rápido
+
+def parse_json_arg(value):
+    # Acepta JSON en línea o "@archivo.json"
+    if value.startswith("@"):
+        with open(value[1:], "r", encoding="utf-8") as f:
+            return json.load(f)
+    return json.loads(value)
+
+def parse_vars(pairs):
+    result = {}
+    for pair in pairs or []:
+        if "=" not in pair:
+            raise ValueError(f"Variable inválida '{pair}', use nombre=valor")
+        name, value = pair.split("=", 1)
+        result[name.strip()] = value
+    return result
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Ejecuta un flujo guardado sin interfaz gráfica.")
+    parser.add_argument("flow", help="Archivo JSON del flujo")
+    parser.add_argument("--context", help="Contexto inicial en JSON (o @archivo.json)")
+    parser.add_argument("--var", action="append", metavar="NOMBRE=VALOR", help="Variable inicial (repetible)")
+    parser.add_argument("--answers", help="Respuestas a preguntas en JSON {variable: valor} (o @archivo.json)")
+    parser.add_argument("--interactive", action="store_true", help="Preguntar por consola en lugar de usar --answers")
+    parser.add_argument("--output", help="Archivo donde guardar el contexto final (por defecto stdout)")
+    parser.add_argument("--batch", metavar="ENTRADA",
+                        help="Ejecutar el flujo una vez por registro de un archivo CSV o JSONL ('-' para stdin); "
+                             "los resultados se escriben en JSONL")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Procesos para --batch (1 = secuencial, 0 = uno por núcleo)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Registros por bloque enviado a cada proceso")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Registros que avanzan juntos por el flujo (los condicionales se evalúan por columnas)")
+    parser.add_argument("--llm-batch", type=int, metavar="N",
+                        help="Con --batch: ejecutar los registros en el motor asíncrono y enviar al LLM "
+                             "los prompts de un mismo nodo en lotes de hasta N llamadas simultáneas")
+    parser.add_argument("--in-flight", type=int, default=256, help="Registros en curso simultáneamente con --llm-batch")
+    parser.add_argument("--llm-cache", action="store_true", help="Reutilizar respuestas del LLM para mensajes idénticos")
+    parser.add_argument("--llm-cache-db", metavar="ARCHIVO",
+                        help="Base SQLite para la caché del LLM (compartida entre procesos; implica --llm-cache)")
+    parser.add_argument("--llm-cache-size", type=int, default=1024, help="Entradas máximas de la caché en memoria")
+    parser.add_argument("--llm-cache-disk-size", type=int, help="Filas máximas de la caché en disco")
+    parser.add_argument("--llm-cache-ttl", type=float, help="Segundos de validez de cada respuesta en caché")
+    parser.add_argument("--ollama-host", help="Servidor de Ollama (por defecto OLLAMA_HOST)")
+    parser.add_argument("--llm-pool-size", type=int, default=10, help="Conexiones keep-alive por host de Ollama")
+    parser.add_argument("--llm-timeout", type=float, help="Segundos máximos por llamada al LLM")
+    parser.add_argument("--stream", action="store_true",
+                        help="Mostrar en stderr la respuesta del LLM a medida que se genera (y el tiempo al primer token)")
+    parser.add_argument("--smtp-pool", action="store_true",
+                        help="Reutilizar sesiones SMTP autenticadas entre correos y ejecuciones")
+    parser.add_argument("--smtp-queue", action="store_true",
+                        help="Enviar los correos en segundo plano, agrupados por servidor (implica --smtp-pool)")
+    parser.add_argument("--smtp-batch", type=int, default=50, help="Correos máximos por conexión en cada envío de la cola")
+    parser.add_argument("--python-workers", type=int, default=2,
+                        help="Procesos para los nodos Python marcados como aislados")
+    parser.add_argument("--python-timeout", type=float, default=10.0, help="Segundos máximos por llamada aislada")
+    parser.add_argument("--python-max-memory", type=float, default=1024, help="MB máximos por proceso aislado")
+    parser.add_argument("--python-max-calls", type=int, default=1000, help="Llamadas tras las cuales se recicla un proceso")
+    parser.add_argument("--memory", choices=RUN_MEMORY_BACKENDS,
+                        help="Guardar el contexto final de cada ejecución en la memoria de ejecuciones")
+    parser.add_argument("--memory-path", help="Carpeta (o archivo .db con sqlite) de la memoria de ejecuciones")
+    parser.add_argument("--memory-flush", type=int, default=100,
+                        help="Ejecuciones guardadas entre cada escritura al disco de la memoria")
+    parser.add_argument("--memory-background", action="store_true",
+                        help="Escribir la memoria de ejecuciones desde un hilo en segundo plano, en grupos")
+    parser.add_argument("--memory-durability", choices=BackgroundRunWriter.DURABILITY_LEVELS, default="lote",
+                        help="Con --memory-background: ninguna (sin fsync), lote (un fsync por grupo) o "
+                             "completa (cada ejecución espera a que su grupo esté en disco)")
+    parser.add_argument("--checkpoints", metavar="ARCHIVO",
+                        help="Base SQLite donde guardar un punto de control tras cada nodo (permite --resume)")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continuar una ejecución interrumpida desde su último nodo completado (requiere --checkpoints)")
+    parser.add_argument("--memo", action="store_true",
+                        help="Memoizar los nodos deterministas (LLM y Python): solo se recalculan los nodos "
+                             "cuya configuración o variables de entrada cambiaron")
+    parser.add_argument("--memo-db", metavar="ARCHIVO",
+                        help="Base SQLite de la memoización, conservada entre ejecuciones (implica --memo)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Medir tiempo real y de CPU de cada nodo y mostrar una tabla al terminar")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Con --profile: medir también la memoria asignada por nodo (tracemalloc, más lento)")
+    parser.add_argument("--profile-json", metavar="ARCHIVO", help="Guardar el perfil por nodo en JSON (implica --profile)")
+    parser.add_argument("--profile-collapsed", metavar="ARCHIVO",
+                        help="Guardar el perfil como pilas colapsadas para flamegraph.pl o speedscope "
+                             "(implica --profile)")
+    parser.add_argument("--trace", metavar="ARCHIVO",
+                        help="Anexar a un archivo JSONL un span por ejecución y por nodo (id de ejecución, nodo, "
+                             "salida tomada, duración y errores)")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Exponer métricas del motor en http://127.0.0.1:PUERTO/metrics (formato Prometheus) "
+                             "mientras dure la ejecución")
+    parser.add_argument("--metrics-file", metavar="ARCHIVO",
+                        help="Escribir las métricas del motor en un archivo (formato Prometheus) periódicamente y al terminar")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="Segundos entre escrituras de --metrics-file")
+    parser.add_argument("--repeat", type=int, default=1, help="Número de ejecuciones (para medir tiempos)")
+    parser.add_argument("--quiet", action="store_true", help="Descartar los mensajes que imprimen los nodos")
+    return parser
+
+def main(argv=None, t_start=None):
+    """'t_start': time.perf_counter() al iniciar el proceso (ver run_flow.py), para incluir las importaciones."""
+    t_main = time.perf_counter()
+    t_start = t_start or t_main
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.interactive and args.workers != 1:
+        parser.error("--interactive no se puede combinar con --workers")
+    if args.llm_batch and args.workers != 1:
+        parser.error("--llm-batch no se puede combinar con --workers")
+    if args.llm_batch and args.batch_size > 1:
+        parser.error("--llm-batch no se puede combinar con --batch-size")
+    if args.resume and not args.checkpoints:
+        parser.error("--resume requiere --checkpoints")
+    if args.checkpoints and args.batch:
+        parser.error("--checkpoints no se puede combinar con --batch")
+    if (args.memo or args.memo_db) and args.llm_batch:
+        parser.error("--memo no se puede combinar con --llm-batch")
+    if args.trace and args.llm_batch:
+        parser.error("--trace no se puede combinar con --llm-batch")
+    profile = args.profile or args.profile_memory or args.profile_json or args.profile_collapsed
+    if profile and (args.llm_batch or (args.batch and args.workers != 1)):
+        parser.error("--profile no se puede combinar con --llm-batch ni con --workers")
+
+    if args.interactive:
+        provider = ConsoleInputProvider()
+    else:
+        provider = StaticInputProvider(parse_json_arg(args.answers) if args.answers else {})
+
+    initial = parse_json_arg(args.context) if args.context else {}
+    initial.update(parse_vars(args.var))
+
+    runner_kwargs = {
+        "llm_clients": OllamaClientRegistry(args.ollama_host, pool_size=args.llm_pool_size, timeout=args.llm_timeout)
+    }
+    if args.llm_cache or args.llm_cache_db:
+        from models.llm_cache import LLMResponseCache
+        runner_kwargs["llm_cache"] = LLMResponseCache(args.llm_cache_size, args.llm_cache_ttl,
+                                                      args.llm_cache_db, args.llm_cache_disk_size)
+
+    if args.stream:
+        from models.llm_stream import PrintStreamListener
+        runner_kwargs["llm_stream"] = PrintStreamListener()
+    if args.memory:
+        run_memory = create_run_memory(args.memory, args.memory_path, args.memory_flush)
+        if args.memory_background:
+            run_memory = BackgroundRunWriter(run_memory, durability=args.memory_durability)
+        runner_kwargs["run_memory"] = run_memory
+    if args.smtp_queue or args.smtp_pool:
+        from models.smtp_transport import SmtpConnectionPool, SmtpSendQueue
+    if args.smtp_queue:
+        runner_kwargs["smtp_transport"] = SmtpSendQueue(batch_size=args.smtp_batch)
+    elif args.smtp_pool:
+        runner_kwargs["smtp_transport"] = SmtpConnectionPool()
+    if args.checkpoints:
+        from models.checkpoint_store import CheckpointStore
+        runner_kwargs["checkpoints"] = CheckpointStore(args.checkpoints)
+    if args.memo or args.memo_db:
+        from models.node_memo import NodeMemo
+        runner_kwargs["memo"] = NodeMemo(db_path=args.memo_db)
+    metrics_outputs = []
+    if args.metrics_port is not None or args.metrics_file:
+        from engine.metrics import MetricsFileDumper, MetricsHttpServer, MetricsRegistry
+        runner_kwargs["metrics"] = MetricsRegistry()
+        if args.metrics_port is not None:
+            server = MetricsHttpServer(runner_kwargs["metrics"], args.metrics_port)
+            print(f"Métricas en {server.address}", file=sys.stderr)
+            metrics_outputs.append(server)
+        if args.metrics_file:
+            metrics_outputs.append(MetricsFileDumper(runner_kwargs["metrics"], args.metrics_file,
+                                                     args.metrics_interval))
+    if args.trace:
+        from engine.tracing import JsonlSpanExporter, Tracer
+        runner_kwargs["tracer"] = Tracer(JsonlSpanExporter(args.trace), os.path.basename(args.flow))
+    if profile:
+        from engine.profiler import NodeProfiler
+        runner_kwargs["profiler"] = NodeProfiler(args.profile_memory, os.path.basename(args.flow))
+
+    runner = FlowRunner.from_file(args.flow, input_provider=provider, **runner_kwargs)
+    if any(node.node_type == "python" and node.config.get("isolated") for node in runner.nodes.values()):
+        # Solo los flujos con nodos Python aislados necesitan el pool de procesos (y multiprocessing)
+        from models.python_pool import PythonWorkerPool
+        runner.python_pool = runner_kwargs["python_pool"] = PythonWorkerPool(
+            args.python_workers, args.python_timeout, args.python_max_memory, args.python_max_calls)
+    startup_ms = (time.perf_counter() - t_start) * 1000
+    import_ms = (t_main - t_start) * 1000
+
+    try:
+        return run_flow(args, parser, runner, runner_kwargs, initial, startup_ms, import_ms)
+    finally:
+        # La última lectura de las métricas incluye la ejecución completa
+        for target in metrics_outputs:
+            target.close()
+
+def run_flow(args, parser, runner, runner_kwargs, initial, startup_ms, import_ms):
+    # Los nodos imprimen en stdout; se redirigen para no mezclarlos con el resultado
+    log_stream = open(os.devnull, "w") if args.quiet else sys.stderr
+    if args.batch:
+        return run_batch(args, runner, runner_kwargs, initial, log_stream)
+    run_times = []
+    try:
+        with contextlib.redirect_stdout(log_stream):
+            try:
+                context = run_repeated(args, parser, runner, initial, run_times)
+            finally:
+                # También si falla un nodo: los correos encolados, la memoria y los spans ayudan a investigarlo
+                close_services(runner)
+    finally:
+        if args.quiet:
+            log_stream.close()
+
+    if context.get("memo_report"):
+        from models.node_memo import describe_report
+        print("Nodos memoizados:", describe_report(context["memo_report"], runner.nodes), file=sys.stderr)
+    result = json.dumps(clean_context(context), indent=4, ensure_ascii=False, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(result)
+    else:
+        print(result)
+
+    print(f"Inicio: {startup_ms:.2f} ms (módulos: {import_ms:.2f} ms, carga del flujo: {runner.load_ms:.2f} ms, "
+          f"compilación: {runner.compile_ms:.2f} ms) | "
+          f"Ejecución: {sum(run_times) / len(run_times):.3f} ms/run ({len(run_times)} runs)",
+          file=sys.stderr)
+    print_llm_stats(runner)
+    write_profile(args, runner)
+    return 0
+
+def run_repeated(args, parser, runner, initial, run_times):
+    """Ejecuta el flujo (o reanuda la ejecución de --resume) y agrega la duración de cada ejecución a 'run_times'."""
+    if args.resume:
+        t0 = time.perf_counter()
+        try:
+            context = runner.resume(args.resume)
+        except ValueError as e:
+            parser.error(str(e))
+        run_times.append((time.perf_counter() - t0) * 1000)
+    for _ in range(max(args.repeat, 1) if not args.resume else 0):
+        run_id = None
+        if args.checkpoints:
+            # El id se informa antes de ejecutar, para poder reanudar si el proceso muere
+            run_id = str(uuid.uuid4())
+            print(f"Ejecución {run_id} (para reanudarla: --resume {run_id})", file=sys.stderr)
+        t0 = time.perf_counter()
+        context = runner.run(dict(initial), run_id)
+        run_times.append((time.perf_counter() - t0) * 1000)
+    return context
+
+def close_services(runner):
+    # Detiene los hilos de las ramas paralelas, espera los correos encolados, cierra las sesiones SMTP,
+    # los procesos de los nodos Python aislados y la memoria de ejecuciones
+    runner.close()
+    if runner.python_pool is not None:
+        runner.python_pool.close()
+        stats = runner.python_pool.stats
+        if stats["calls"]:
+            print(f"Python aislado: {stats['calls']} llamadas, {stats['overhead_ms']:.2f} ms de costo por llamada, "
+                  f"{stats['timeouts']} tiempos excedidos, {stats['recycled']} procesos reciclados", file=sys.stderr)
+    transport = runner.smtp_transport
+    if transport is not None:
+        transport.close()
+        pool = getattr(transport, "pool", transport)
+        if pool.messages_sent:
+            print(f"SMTP: {pool.messages_sent} correos en {pool.connections_opened} conexiones", file=sys.stderr)
+    if runner.checkpoints is not None:
+        runner.checkpoints.close()
+    if runner.memo is not None:
+        runner.memo.close()
+    if runner.tracer is not None:
+        runner.tracer.close()
+    if runner.run_memory is not None:
+        runner.run_memory.close()
+        if isinstance(runner.run_memory, BackgroundRunWriter) and runner.run_memory.batches_written:
+            print(f"Memoria: {runner.run_memory.records_written} ejecuciones en {runner.run_memory.batches_written} "
+                  f"escrituras, {runner.run_memory.backpressure_waits} esperas por cola llena", file=sys.stderr)
+
+def write_profile(args, runner):
+    profiler = runner.profiler
+    if profiler is None:
+        return
+    print(profiler.table(), file=sys.stderr)
+    if args.profile_json:
+        with open(args.profile_json, "w", encoding="utf-8") as f:
+            f.write(profiler.to_json())
+    if args.profile_collapsed:
+        with open(args.profile_collapsed, "w", encoding="utf-8") as f:
+            f.write(profiler.collapsed())
+
+def print_llm_stats(runner):
+    if runner.llm_stream is not None:
+        ttft = runner.llm_stream.ttft_summary()
+        if ttft["count"]:
+            print(f"LLM primer token: promedio {ttft['avg_ms']:.1f} ms, p50 {ttft['p50_ms']:.1f} ms, "
+                  f"máx {ttft['max_ms']:.1f} ms ({ttft['count']} llamadas)", file=sys.stderr)
+    if runner.llm_cache is not None:
+        stats = runner.llm_cache.stats
+        print(f"Caché LLM: {stats['hits']} aciertos ({stats['disk_hits']} desde disco), "
+              f"{stats['misses']} fallos | tasa de acierto {stats['hit_rate']:.1%}", file=sys.stderr)
+    if runner.memo is not None and runner.memo.hits + runner.memo.misses:
+        stats = runner.memo.stats
+        print(f"Memoización: {stats['hits']} nodos desde la caché, {stats['misses']} calculados | "
+              f"tasa de acierto {stats['hit_rate']:.1%}", file=sys.stderr)
+
+def run_batch(args, runner, runner_kwargs, initial, log_stream):
+    from engine.batch import AsyncBatchRunner, BatchRunner, ParallelBatchRunner, read_records
+    records = read_records(args.batch)
+    if initial:
+        # El contexto de --context/--var se usa como base de cada registro
+        records = ({**initial, **record} for record in records)
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        if args.llm_batch:
+            from engine.async_runner import AsyncFlowRunner
+            async_runner = AsyncFlowRunner.from_file(args.flow, runner.input_provider, llm_batch_size=args.llm_batch,
+                                                     **runner_kwargs)
+            batch = AsyncBatchRunner(async_runner, max_in_flight=max(args.in_flight, args.llm_batch))
+        elif args.workers != 1:
+            from models.flow_serializer import FlowSerializer
+            batch = ParallelBatchRunner(FlowSerializer.load(args.flow), runner.input_provider,
+                                        workers=args.workers or None, chunk_size=args.chunk_size,
+                                        quiet=args.quiet,
+                                        runner_kwargs={**runner_kwargs, "flow_name": runner.flow_name},
+                                        by_batch=args.batch_size > 1, metrics=runner.metrics)
+        else:
+            batch = BatchRunner(runner, args.batch_size)
+        with contextlib.redirect_stdout(log_stream):
+            try:
+                stats = batch.run(records, output)
+            finally:
+                close_services(runner)
+                if args.llm_batch:
+                    async_runner.close()
+    finally:
+        if args.output:
+            output.close()
+        if args.quiet:
+            log_stream.close()
+    print(stats.summary(), file=sys.stderr)
+    if args.workers == 1:
+        print_llm_stats(runner)
+        write_profile(args, runner)
+    return 1 if stats.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+# engine/flow_runner.py
+import os
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from models.flow_serializer import FlowSerializer
+from engine.plan import ExecutionPlan
+
+# Claves del contexto que solo existen durante la ejecución (no forman parte del resultado)
+RUNTIME_KEYS = ("root", "input_provider", "llm_cache", "llm_clients", "llm_stream", "smtp_transport",
+                "deferred_results", "python_pool", "memo_report", "trace_span",
+                "metrics")
+
+def clean_context(context):
+    """Retorna una copia del contexto sin los objetos de ejecución (ventana Tk, proveedor de entrada...)."""
+    return {k: v for k, v in context.items() if k not in RUNTIME_KEYS}
+
+class FlowRunner:
+    """
+    Motor de ejecución sin interfaz gráfica. Compila el flujo una sola vez en
+    un ExecutionPlan y lo ejecuta desde el nodo "inicio" tantas veces como se
+    necesite, sin importar Tkinter: las preguntas al usuario se delegan al
+    'input_provider' recibido.
+    """
+    def __init__(self, nodes, variables=None, input_provider=None, llm_cache=None, llm_clients=None,
+                 llm_stream=None, smtp_transport=None, python_pool=None, run_memory=None,
+                 flow_name=None, checkpoints=None, memo=None, profiler=None, tracer=None, metrics=None,
+                 rate_limiter=None):
+        self.nodes = nodes                  # node.id -> FlowNode
+        self.variables = variables or []    # Variables del archivo (se usan como valores iniciales)
+        self.llm_cache = llm_cache          # LLMResponseCache opcional compartido por todas las ejecuciones
+        self.llm_clients = llm_clients      # OllamaClientRegistry opcional (por defecto, el registro del módulo)
+        self.llm_stream = llm_stream        # LLMStreamListener opcional: recibe la salida parcial del LLM
+        self.smtp_transport = smtp_transport  # SmtpConnectionPool o SmtpSendQueue opcional para los nodos SMTP
+        self.python_pool = python_pool      # PythonWorkerPool opcional para los nodos Python aislados
+        self.run_memory = run_memory        # RunMemoryStore opcional donde se guarda el contexto final de cada ejecución
+        self.flow_name = flow_name          # Nombre del archivo del flujo (se guarda con cada ejecución)
+        self.checkpoints = checkpoints      # CheckpointStore opcional: punto de control tras cada nodo (ver resume)
+        self.memo = memo                    # NodeMemo opcional: resultados de los nodos deterministas
+        self.profiler = profiler            # NodeProfiler opcional: tiempos y memoria de cada nodo
+        self.tracer = tracer                # Tracer opcional: un span por ejecución y por nodo
+        self.metrics = metrics              # MetricsRegistry opcional: contadores e histogramas del motor
+        self.rate_limiter = rate_limiter    # NodeRateLimiter opcional: ejecuciones por segundo por tipo de nodo
+        self.defaults = {var["name"]: var.get("value") for var in self.variables if var.get("value") is not None}
+        self.input_provider = input_provider
+        self.load_ms = 0.0
+        self.last_run_ms = 0.0
+        if any(service is not None for service in (memo, profiler, tracer, metrics, rate_limiter)):
+            self.plan = ExecutionPlan.compile(nodes, self._compile_step)
+        else:
+            self.plan = ExecutionPlan.compile(nodes)
+
+    def _compile_step(self, node):
+        # El perfilador envuelve a la memoización: un acierto se mide como una ejecución rápida.
+        # El límite de tasa queda por dentro de la memoización: un acierto no consume turno
+        step = node.compile()
+        if self.rate_limiter is not None:
+            step = self.rate_limiter.wrap(node, step)
+        if self.memo is not None:
+            step = self.memo.wrap(node, step)
+        if self.profiler is not None:
+            step = self.profiler.wrap(node, step)
+        if self.tracer is not None:
+            step = self.tracer.wrap(node, step)
+        if self.metrics is not None:
+            step = self.metrics.wrap(node, step)
+        return step
+
+    def close(self):
+        """Libera los hilos de las ramas paralelas del plan (los servicios compartidos los cierra quien los creó)."""
+        self.plan.close()
+
+    @property
+    def compile_ms(self):
+        return self.plan.compile_ms
+
+    @classmethod
+    def from_dict(cls, flow_data, input_provider=None, **kwargs):
+        nodes = FlowSerializer.nodes_from_dict(flow_data)
+        return cls(nodes, flow_data.get("variables", []), input_provider, **kwargs)
+
+    @classmethod
+    def from_file(cls, file_path, input_provider=None, **kwargs):
+        t0 = time.perf_counter()
+        kwargs.setdefault("flow_name", os.path.basename(file_path))
+        runner = cls.from_dict(FlowSerializer.load(file_path), input_provider, **kwargs)
+        runner.load_ms = (time.perf_counter() - t0) * 1000
+        return runner
+
+    def initial_context(self, context=None):
+        ctx = dict(self.defaults)
+        if context:
+            ctx.update(context)
+        if self.input_provider is not None:
+            ctx.setdefault("input_provider", self.input_provider)
+        if self.llm_cache is not None:
+            ctx.setdefault("llm_cache", self.llm_cache)
+        if self.llm_clients is not None:
+            ctx.setdefault("llm_clients", self.llm_clients)
+        if self.llm_stream is not None:
+            ctx.setdefault("llm_stream", self.llm_stream)
+        if self.smtp_transport is not None:
+            ctx.setdefault("smtp_transport", self.smtp_transport)
+        if self.python_pool is not None:
+            ctx.setdefault("python_pool", self.python_pool)
+        if self.memo is not None:
+            # Lista de (node.id, acierto) de los nodos memoizables de esta ejecución
+            ctx["memo_report"] = []
+        if self.metrics is not None:
+            ctx.setdefault("metrics", self.metrics)
+        return ctx
+
+    @staticmethod
+    def resolve_deferred(context):
+        """
+        Espera los envíos encolados durante la ejecución y guarda su estado en
+        el contexto (si el nodo indicó una variable; si no, solo se esperan).
+        """
+        for var_name, future in context.pop("deferred_results", ()):
+            result = future.result()
+            if var_name:
+                context[var_name] = result
+        return context
+
+    def run(self, context=None, run_id=None):
+        """
+        Ejecuta el flujo desde el nodo "inicio". Con 'checkpoints', el avance se
+        guarda con 'run_id' (uno nuevo si no se indica) para poder reanudarlo.
+        """
+        t0 = time.perf_counter()
+        ctx = self.initial_context(context)
+        if self.checkpoints is not None or self.tracer is not None:
+            run_id = run_id or str(uuid.uuid4())
+        with self._measure(), self._trace(ctx, run_id):
+            if self.checkpoints is None:
+                ctx = self.resolve_deferred(self.plan.run(ctx))
+            else:
+                ctx = self._run_checkpointed(ctx, self.plan.start_index, run_id)
+        self.last_run_ms = (time.perf_counter() - t0) * 1000
+        self.remember(ctx, run_id)
+        if self.checkpoints is not None:
+            self.checkpoints.finish(run_id)
+        return ctx
+
+    def resume(self, run_id):
+        """
+        Continúa una ejecución interrumpida desde el nodo siguiente al último
+        completado, con el contexto guardado en su punto de control.
+        """
+        if self.checkpoints is None:
+            raise ValueError("Para reanudar una ejecución se necesita un CheckpointStore")
+        checkpoint = self.checkpoints.load(run_id)
+        if checkpoint is None:
+            raise ValueError(f"No hay un punto de control para la ejecución '{run_id}'")
+        if checkpoint["flow"] != self.flow_name:
+            raise ValueError(f"La ejecución '{run_id}' es del flujo '{checkpoint['flow']}', no de '{self.flow_name}'")
+        start_index = None
+        if checkpoint["next_node_id"] is not None:
+            if checkpoint["next_node_id"] not in self.plan.node_ids:
+                raise ValueError(f"El nodo '{checkpoint['next_node_id']}' ya no existe en el flujo")
+            start_index = self.plan.node_ids.index(checkpoint["next_node_id"])
+        t0 = time.perf_counter()
+        ctx = self.initial_context(checkpoint["context"])
+        if start_index is not None:
+            with self._measure(), self._trace(ctx, run_id):
+                ctx = self._run_checkpointed(ctx, start_index, run_id)
+        self.last_run_ms = (time.perf_counter() - t0) * 1000
+        self.remember(ctx, run_id)
+        self.checkpoints.finish(run_id)
+        return ctx
+
+    def _trace(self, context, run_id):
+        # Span de la ejecución (sin Tracer no hace nada)
+        return self.tracer.run_span(context, run_id) if self.tracer is not None else nullcontext()
+
+    def _measure(self):
+        # Contadores de ejecuciones y duración (sin MetricsRegistry no hace nada)
+        return self._measured_run() if self.metrics is not None else nullcontext()
+
+    @contextmanager
+    def _measured_run(self):
+        labels = (("flow", self.flow_name or ""),)
+        self.metrics.inc("flow_runs_started_total", labels)
+        t0 = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.metrics.inc("flow_runs_failed_total", labels)
+            raise
+        self.metrics.inc("flow_runs_completed_total", labels)
+        self.metrics.observe("flow_run_duration_ms", (time.perf_counter() - t0) * 1000, labels)
+
+    def _run_checkpointed(self, context, start_index, run_id):
+        node_ids = self.plan.node_ids
+
+        def on_step(index, next_index, ctx):
+            # Los correos encolados por el nodo se esperan antes de darlo por completado
+            self.resolve_deferred(ctx)
+            self.checkpoints.save(run_id, self.flow_name, node_ids[index],
+                                  node_ids[next_index] if next_index is not None else None, clean_context(ctx))
+
+        return self.plan.run_from(context, start_index, on_step)
+
+    def remember(self, context, run_id=None):
+        """Guarda el contexto final en la memoria de ejecuciones (si hay una) y retorna el id de la ejecución."""
+        if self.run_memory is None:
+            return None
+        return self.run_memory.save(clean_context(context), self.flow_name, run_id)
+
+    def run_batch(self, contexts):
+        """
+        Ejecuta el flujo para un lote de contextos con ExecutionPlan.run_batch.
+        Retorna, en el mismo orden, el contexto final o la excepción de cada registro.
+        """
+        contexts = [self.initial_context(context) for context in contexts]
+        run_ids = [None] * len(contexts)
+        if self.tracer is not None:
+            run_ids = [str(uuid.uuid4()) for _ in contexts]
+            for ctx, run_id in zip(contexts, run_ids):
+                self.tracer.start_run(ctx, run_id)
+        results = self.plan.run_batch(contexts)
+        if self.metrics is not None:
+            # Los registros del lote avanzan juntos: no hay una duración por ejecución
+            labels = (("flow", self.flow_name or ""),)
+            failed = sum(1 for result in results if isinstance(result, Exception))
+            self.metrics.inc("flow_runs_started_total", labels, len(results))
+            self.metrics.inc("flow_runs_completed_total", labels, len(results) - failed)
+            if failed:
+                self.metrics.inc("flow_runs_failed_total", labels, failed)
+        for ctx, result, run_id in zip(contexts, results, run_ids):
+            if self.tracer is not None:
+                self.tracer.end_run(ctx, result if isinstance(result, Exception) else None)
+            if not isinstance(result, Exception):
+                self.remember(self.resolve_deferred(result), run_id)
+        return results
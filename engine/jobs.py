@@ -0,0 +1,279 @@
+# engine/jobs.py
+import argparse
+import contextlib
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from engine.batch import read_records
+from engine.cli import parse_json_arg
+from engine.flow_runner import clean_context
+from engine.rate_limit import NodeRateLimiter, parse_rate
+from engine.server import FlowRegistry
+from models.job_queue import CronSchedule, JobQueue, LeaseLostError
+from models.ollama_client import OllamaClientRegistry
+from models.smtp_transport import SmtpConnectionPool
+from models.python_pool import PythonWorkerPool
+
+class JobWorkerPool:
+    """
+    Vacía una JobQueue con 'workers' hilos: cada uno toma el siguiente trabajo
+    listo, ejecuta su flujo (por nombre, en el FlowRegistry) y lo marca como
+    terminado, o lo devuelve a la cola con espera exponencial si el flujo lanzó
+    una excepción. Un hilo renueva la reserva de los trabajos en curso (cada
+    tercio de 'queue.lease'), así un flujo largo, o que espera turno en el
+    limitador de tasa, no se vuelve a tomar en otro proceso mientras se
+    ejecuta. Otro hilo encola los trabajos de las programaciones
+    recurrentes cuando vencen. El ritmo de los nodos costosos se controla con
+    el NodeRateLimiter de los flujos del registro (ver FlowRunner).
+    """
+    def __init__(self, queue, registry, workers=4, poll_interval=1.0):
+        self.queue = queue
+        self.registry = registry
+        self.workers = max(workers, 1)
+        self.poll_interval = poll_interval
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.lost = 0          # Intentos que perdieron su reserva (otro proceso volvió a tomar el trabajo)
+        self._active = {}      # id de los trabajos en curso en este pool -> token de su reserva
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def run_job(self, job):
+        try:
+            self._run_job(job)
+        except LeaseLostError as e:
+            # El otro proceso registrará su propio intento
+            print(e, file=sys.stderr)
+            self._count("lost")
+
+    def _run_job(self, job):
+        runner = self.registry.get(job["flow"])
+        if runner is None:
+            # Sin el flujo no tiene sentido reintentar
+            self.queue.fail(job["id"], job["token"], f"No existe el flujo '{job['flow']}'", retry=False)
+            self._count("failed")
+            return
+        with self._stats_lock:
+            self._active[job["id"]] = job["token"]
+        try:
+            context = runner.run(job["context"], f"job-{job['id']}")
+        except Exception as e:
+            retry_at = self.queue.fail(job["id"], job["token"], f"{type(e).__name__}: {e}")
+            self._count("retried" if retry_at is not None else "failed")
+            return
+        finally:
+            with self._stats_lock:
+                self._active.pop(job["id"], None)
+        self.queue.complete(job["id"], job["token"], clean_context(context))
+        self._count("completed")
+
+    def _heartbeat(self):
+        while not self._stop.wait(max(self.queue.lease / 3, 0.05)):
+            with self._stats_lock:
+                active = list(self._active.items())
+            for job_id, token in active:
+                if not self.queue.extend(job_id, token):
+                    print(f"El trabajo {job_id} perdió su reserva mientras se ejecutaba", file=sys.stderr)
+
+    def _work(self, drain):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is not None:
+                self.run_job(job)
+                # Un trabajo terminado puede haber sido el último (con 'drain') o haber dejado un reintento
+                self._wake.set()
+                continue
+            timeout = self.poll_interval
+            if drain:
+                next_at = self.queue.next_ready_at()
+                if next_at is None:
+                    return
+                # Trabajos a la espera de un reintento o de su momento: se duerme hasta entonces
+                timeout = min(max(next_at - time.time(), 0.01), timeout)
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _schedule(self):
+        while not self._stop.wait(self.poll_interval):
+            if self.queue.enqueue_due():
+                self._wake.set()
+
+    def start(self, drain=False):
+        """
+        Inicia los hilos. Con 'drain' terminan cuando ya no quedan trabajos
+        pendientes ni en curso (y no se atienden las programaciones).
+        """
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._work, args=(drain,), name=f"job-worker-{i}", daemon=True)
+                         for i in range(self.workers)]
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        if not drain:
+            self.queue.enqueue_due()
+            self._threads.append(threading.Thread(target=self._schedule, name="job-scheduler", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        heartbeat.start()
+        return self
+
+    def join(self):
+        for thread in self._threads:
+            # join() con tiempo para que Ctrl+C interrumpa la espera
+            while thread.is_alive():
+                thread.join(0.5)
+        # Sin hilos de trabajo no quedan reservas que renovar
+        self._stop.set()
+
+    def stop(self):
+        """Termina los hilos al acabar los trabajos que están ejecutando."""
+        self._stop.set()
+        self._wake.set()
+        self.join()
+
+    def summary(self):
+        lost = f", {self.lost} con la reserva perdida" if self.lost else ""
+        return f"Trabajos: {self.completed} terminados, {self.retried} reprogramados, {self.failed} fallidos{lost}"
+
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+def parse_rate_limits(pairs):
+    limits = {}
+    for pair in pairs or []:
+        if "=" not in pair:
+            raise ValueError(f"Límite inválido '{pair}', use tipo=tasa (p. ej. smtp=30/min)")
+        node_type, rate = pair.split("=", 1)
+        limits[node_type.strip()] = parse_rate(rate)
+    return limits
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Cola persistente de ejecuciones de flujos.")
+    parser.add_argument("--db", default="trabajos.db", help="Base SQLite de la cola")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Encolar ejecuciones de un flujo")
+    add.add_argument("flow", help="Nombre del flujo (archivo sin .json)")
+    add.add_argument("--context", help="Contexto inicial en JSON (o @archivo.json)")
+    add.add_argument("--batch", metavar="ENTRADA", help="Encolar una ejecución por registro de un CSV o JSONL")
+    add.add_argument("--priority", type=int, default=0, help="Prioridad (mayor = antes)")
+    add.add_argument("--delay", type=float, default=0.0, help="Segundos antes de que pueda ejecutarse")
+    add.add_argument("--max-attempts", type=int, default=3, help="Intentos antes de darla por fallida")
+
+    schedule = commands.add_parser("schedule", help="Programar un flujo con una expresión cron")
+    schedule.add_argument("name", help="Nombre de la programación (reemplaza a una existente)")
+    schedule.add_argument("flow", help="Nombre del flujo (archivo sin .json)")
+    schedule.add_argument("cron", help="Expresión cron, p. ej. '*/15 8-18 * * 1-5' o @daily")
+    schedule.add_argument("--context", help="Contexto inicial en JSON (o @archivo.json)")
+    schedule.add_argument("--priority", type=int, default=0, help="Prioridad de los trabajos encolados")
+    schedule.add_argument("--max-attempts", type=int, default=3, help="Intentos de cada trabajo")
+
+    unschedule = commands.add_parser("unschedule", help="Borrar una programación")
+    unschedule.add_argument("name")
+
+    commands.add_parser("status", help="Trabajos por estado y programaciones")
+
+    work = commands.add_parser("work", help="Ejecutar los trabajos de la cola")
+    work.add_argument("flows", nargs="+", help="Archivos JSON de flujos o carpetas con flujos")
+    work.add_argument("--workers", type=int, default=4, help="Ejecuciones simultáneas")
+    work.add_argument("--rate", action="append", metavar="TIPO=TASA",
+                      help="Ejecuciones máximas de un tipo de nodo, p. ej. smtp=30/min o llm=5/s (repetible)")
+    work.add_argument("--burst", type=float, default=1.0, help="Ejecuciones seguidas admitidas antes de aplicar --rate")
+    work.add_argument("--drain", action="store_true",
+                      help="Terminar cuando no queden trabajos (sin atender las programaciones)")
+    work.add_argument("--backoff", type=float, default=5.0,
+                      help="Segundos de espera antes del primer reintento (se duplica en cada uno)")
+    work.add_argument("--lease", type=float, default=300.0,
+                      help="Segundos tras los cuales un trabajo sin terminar se vuelve a tomar")
+    work.add_argument("--poll-interval", type=float, default=1.0, help="Segundos entre consultas a la cola vacía")
+    work.add_argument("--ollama-host", help="Servidor de Ollama (por defecto OLLAMA_HOST)")
+    work.add_argument("--python-workers", type=int, default=2,
+                      help="Procesos para los nodos Python marcados como aislados")
+    work.add_argument("--quiet", action="store_true", help="Descartar los mensajes que imprimen los nodos")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    queue = JobQueue(args.db)
+    try:
+        if args.command == "add":
+            context = parse_json_arg(args.context) if args.context else {}
+            contexts = ({**context, **record} for record in read_records(args.batch)) if args.batch else [context]
+            ids = queue.enqueue_many(args.flow, list(contexts), args.priority,
+                                     time.time() + args.delay if args.delay else None, args.max_attempts)
+            print(f"{len(ids)} trabajos encolados" + (f" (id {ids[0]})" if len(ids) == 1 else ""), file=sys.stderr)
+        elif args.command == "schedule":
+            try:
+                CronSchedule(args.cron)
+            except ValueError as e:
+                parser.error(str(e))
+            context = parse_json_arg(args.context) if args.context else {}
+            next_run = queue.add_schedule(args.name, args.flow, args.cron, context, args.priority, args.max_attempts)
+            print(f"Programación '{args.name}': próxima ejecución {_format_time(next_run)}", file=sys.stderr)
+        elif args.command == "unschedule":
+            if not queue.remove_schedule(args.name):
+                parser.error(f"No existe la programación '{args.name}'")
+        elif args.command == "status":
+            print(" | ".join(f"{status}: {count}" for status, count in queue.counts().items()))
+            for schedule in queue.schedules():
+                print(f"{schedule['name']}: {schedule['flow']} '{schedule['cron']}', "
+                      f"próxima {_format_time(schedule['next_run'])}")
+        else:
+            return work(args, parser, queue)
+    finally:
+        queue.close()
+    return 0
+
+def work(args, parser, queue):
+    try:
+        limits = parse_rate_limits(args.rate)
+    except ValueError as e:
+        parser.error(str(e))
+    queue.lease = args.lease
+    queue.backoff = args.backoff
+    runner_kwargs = {
+        "llm_clients": OllamaClientRegistry(args.ollama_host),
+        "smtp_transport": SmtpConnectionPool(),
+        "python_pool": PythonWorkerPool(args.python_workers),
+    }
+    if limits:
+        runner_kwargs["rate_limiter"] = NodeRateLimiter(limits, args.burst)
+    registry = FlowRegistry(args.flows, runner_kwargs, reload_interval=0 if args.drain else 1.0)
+    pool = JobWorkerPool(queue, registry, args.workers, args.poll_interval)
+    log_stream = open(os.devnull, "w") if args.quiet else sys.stderr
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log_stream):
+            pool.start(args.drain)
+            try:
+                pool.join()
+            except KeyboardInterrupt:
+                print("Deteniendo: se esperan los trabajos en curso...", file=sys.stderr)
+                pool.stop()
+    finally:
+        registry.close()
+        for service in runner_kwargs.values():
+            if hasattr(service, "close"):
+                service.close()
+        if args.quiet:
+            log_stream.close()
+    elapsed = time.perf_counter() - t0
+    done = pool.completed + pool.failed
+    print(f"{pool.summary()} | {elapsed:.2f} s | {done / elapsed if elapsed > 0 else 0:.1f} trabajos/s",
+          file=sys.stderr)
+    limiter = runner_kwargs.get("rate_limiter")
+    if limiter is not None and limiter.waits:
+        print(f"Límites de tasa: {limiter.waits} esperas, {limiter.waited_s:.2f} s en total", file=sys.stderr)
+    return 1 if pool.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
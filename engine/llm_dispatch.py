@@ -0,0 +1,69 @@
+# engine/llm_dispatch.py
+import asyncio
+from collections import deque
+
+class LLMBatchDispatcher:
+    """
+    Agrupa los prompts pendientes de muchas ejecuciones que llegan al mismo
+    nodo LLM con el mismo modelo y host, y los envía en lotes de hasta
+    'batch_size' llamadas simultáneas. Cada ejecución espera solo su respuesta
+    y continúa su flujo en cuanto llega.
+    Un lote se envía cuando está completo o cuando pasan 'max_wait_ms' desde
+    que llegó su primer prompt. Pertenece al event loop en el que se crea.
+    Con 'usage' (un diccionario), submit() completa en él los tokens de su
+    llamada, igual que OllamaClient.chat_async().
+    """
+    def __init__(self, batch_size=8, max_wait_ms=5.0):
+        self.batch_size = max(batch_size, 1)
+        self.max_wait = max_wait_ms / 1000
+        self.batches_sent = 0
+        self.prompts_sent = 0
+        self._queues = {}   # (node_id, modelo, host) -> deque de (cliente, mensaje, usage, future)
+        self._events = {}   # misma clave -> asyncio.Event que despierta al despachador
+        self._workers = {}
+
+    async def submit(self, node_id, client, message, usage=None):
+        key = (node_id, client.model, client.host)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._events[key] = asyncio.Event()
+            self._workers[key] = asyncio.ensure_future(self._dispatch(key))
+        future = asyncio.get_running_loop().create_future()
+        queue.append((client, message, usage, future))
+        self._events[key].set()
+        return await future
+
+    async def _dispatch(self, key):
+        queue = self._queues[key]
+        event = self._events[key]
+        while True:
+            if not queue:
+                event.clear()
+                await event.wait()
+            # Se espera un poco a que el lote se llene
+            if len(queue) < self.batch_size and self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)
+            batch = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+            self.batches_sent += 1
+            self.prompts_sent += len(batch)
+            results = await asyncio.gather(*(client.chat_async(message, usage) for client, message, usage, _ in batch),
+                                           return_exceptions=True)
+            for (_, _, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    @property
+    def average_batch_size(self):
+        return self.prompts_sent / self.batches_sent if self.batches_sent else 0.0
+
+    def close(self):
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+        self._queues.clear()
+        self._events.clear()
@@ -0,0 +1,244 @@
+# engine/metrics.py
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Límites de los histogramas (milisegundos)
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Métricas que alimenta el motor: nombre -> descripción
+METRICS = {
+    "flow_runs_started_total": "Ejecuciones de flujo iniciadas",
+    "flow_runs_completed_total": "Ejecuciones de flujo terminadas sin error",
+    "flow_runs_failed_total": "Ejecuciones de flujo terminadas con una excepción",
+    "flow_run_duration_ms": "Duración de cada ejecución de flujo",
+    "flow_node_duration_ms": "Duración de cada ejecución de un nodo, por tipo",
+    "flow_llm_request_duration_ms": "Duración de las llamadas al LLM (sin las respondidas por la caché)",
+    "flow_llm_tokens_total": "Tokens del LLM por modelo, de entrada (prompt) y generados (completion)",
+    "flow_llm_cache_total": "Consultas a la caché de respuestas del LLM (hit o miss)",
+    "flow_node_memo_total": "Consultas a la memoización de nodos (hit o miss)",
+    "flow_smtp_send_duration_ms": "Duración de cada envío SMTP hasta conocer su estado",
+}
+
+class MetricsRegistry:
+    """
+    Contadores e histogramas en memoria del proceso. Cada hilo escribe en su
+    propio fragmento (shard), sin locks: el lock solo se toma cuando un hilo
+    escribe por primera vez y al leer, momento en que se suman los fragmentos.
+    Los fragmentos de los hilos terminados (p. ej. uno por conexión en
+    FlowServer) se suman a un fragmento base y se descartan, así su número no
+    crece con la vida del proceso.
+    Las etiquetas son tuplas de pares (nombre, valor).
+    Los procesos de un lote en paralelo tienen su propio registro y envían una
+    copia con cada bloque terminado (ver set_remote), que se suma al exponerlo.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards = []   # (hilo, fragmento) de cada hilo que escribió
+        self._base = ({}, {})   # Suma de los fragmentos de los hilos ya terminados
+        self._remote = {}   # id del proceso -> última copia recibida
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {"buckets": self.buckets}
+
+    def __setstate__(self, state):
+        self.__init__(state["buckets"])
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})   # (contadores, histogramas)
+            with self._lock:
+                self._fold_finished()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _fold_finished(self):
+        # Con el lock tomado. Un hilo terminado ya no escribe: su fragmento se suma al base
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                _add_shard(self._base, shard[0].items(), shard[1].items())
+        self._shards = alive
+
+    def inc(self, name, labels=(), value=1):
+        counters = self._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        histograms = self._shard()[1]
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            # Conteo por intervalo (el último es +Inf), seguido de la suma de los valores
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect_left(self.buckets, value)] += 1
+        histogram[-1] += value
+
+    def snapshot(self, include_remote=True):
+        """
+        Suma de todos los fragmentos: (contadores, histogramas). Sin
+        'include_remote' no se suman las copias de otros procesos (es lo que un
+        proceso de un lote en paralelo envía al principal).
+        """
+        total = ({}, {})
+        with self._lock:
+            self._fold_finished()
+            # El base cambia al sumarle otro fragmento: se copian también sus histogramas
+            sources = [(list(self._base[0].items()), [(key, list(values)) for key, values in self._base[1].items()])]
+            # list() copia cada diccionario de una vez, aunque su hilo siga escribiendo
+            sources += [(list(c.items()), list(h.items())) for _, (c, h) in self._shards]
+            if include_remote:
+                sources += [(list(c.items()), list(h.items())) for c, h in self._remote.values()]
+        for shard_counters, shard_histograms in sources:
+            _add_shard(total, shard_counters, shard_histograms)
+        return total
+
+    def set_remote(self, source, snapshot):
+        with self._lock:
+            self._remote[source] = snapshot
+
+    def wrap(self, node, step):
+        """Retorna step(context) que mide la duración de cada ejecución del nodo."""
+        labels = (("node_type", node.node_type),)
+
+        def measured_step(context):
+            t0 = time.perf_counter()
+            try:
+                return step(context)
+            finally:
+                self.observe("flow_node_duration_ms", (time.perf_counter() - t0) * 1000, labels)
+        return measured_step
+
+    def wrap_async(self, node, step):
+        labels = (("node_type", node.node_type),)
+
+        async def measured_step(context):
+            t0 = time.perf_counter()
+            try:
+                return await step(context)
+            finally:
+                self.observe("flow_node_duration_ms", (time.perf_counter() - t0) * 1000, labels)
+        return measured_step
+
+    def prometheus_text(self):
+        """Las métricas en el formato de texto de Prometheus."""
+        counters, histograms = self.snapshot()
+        series = {}
+        for (name, labels), value in counters.items():
+            series.setdefault(name, []).append((labels, value))
+        for (name, labels), values in histograms.items():
+            series.setdefault(name, []).append((labels, values))
+        lines = []
+        histogram_names = {name for name, _ in histograms}
+        for name in sorted(series):
+            kind = "histogram" if name in histogram_names else "counter"
+            help_text = METRICS.get(name, name)
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(series[name], key=lambda item: item[0]):
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value[-1]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _add_shard(total, counters, histograms):
+    # Suma a 'total' (contadores, histogramas) los pares (clave, valor) de un fragmento
+    total_counters, total_histograms = total
+    for key, value in counters:
+        total_counters[key] = total_counters.get(key, 0) + value
+    for key, values in histograms:
+        target = total_histograms.get(key)
+        if target is None:
+            total_histograms[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                target[i] += value
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsHttpServer:
+    """Expone el registro en http://host:port/metrics (formato de texto de Prometheus) desde un hilo."""
+    def __init__(self, registry, port=9464, host="127.0.0.1"):
+        self.server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.registry = registry
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsFileDumper:
+    """
+    Escribe el registro en 'path' (formato de texto de Prometheus, p. ej. para
+    el textfile collector de node_exporter) cada 'interval' segundos y al cerrar.
+    El archivo se reemplaza de una vez, nunca queda a medio escribir.
+    """
+    def __init__(self, registry, path, interval=10.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.registry.prometheus_text())
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.dump()
@@ -0,0 +1,194 @@
+# engine/plan.py
+import inspect
+import time
+from collections import deque
+
+class ExecutionPlan:
+    """
+    Plan de ejecución inmutable de un flujo. Se construye una sola vez a partir
+    de los nodos cargados: cada nodo queda identificado por un índice, su
+    configuración pre-procesada en una función step(context) (ver
+    FlowNode.compile) y sus salidas resueltas a índices de la tabla de sucesores.
+    Ejecutar el plan varias veces no repite ningún trabajo de preparación.
+    """
+    __slots__ = ("node_ids", "node_types", "steps", "successors", "start_index", "compile_ms", "batch_steps", "pools")
+
+    def __init__(self, node_ids, node_types, steps, successors, start_index, compile_ms=0.0, batch_steps=None,
+                 pools=()):
+        self.node_ids = node_ids        # índice -> node.id
+        self.node_types = node_types    # índice -> node.node_type
+        self.steps = steps              # índice -> step(context) -> salida
+        self.successors = successors    # índice -> (siguiente, verdadero, falso) como índices o None
+        self.start_index = start_index
+        self.compile_ms = compile_ms
+        self.batch_steps = batch_steps or (None,) * len(steps)  # índice -> step_batch(contexts) o None
+        self.pools = pools              # Pools de hilos de las divisiones (ver close())
+
+    @classmethod
+    def compile(cls, nodes, step_factory=None):
+        """
+        Compila un diccionario node.id -> FlowNode en un plan. 'step_factory'
+        permite elegir cómo se compila cada nodo (por defecto node.compile()).
+        Los nodos Paralelo se compilan con sus ramas: su paso ejecuta cada rama
+        (los pasos desde el primer nodo de la rama hasta la Unión) y su sucesor
+        es la Unión (ver ParaleloNode.compile_parallel). Los pools de hilos de
+        esas ramas pertenecen al plan y se liberan con close().
+        """
+        # Los pasos por lotes solo existen para el plan síncrono por defecto
+        with_batch = step_factory is None
+        if step_factory is None:
+            step_factory = lambda node: node.compile()
+        t0 = time.perf_counter()
+        ordered = list(nodes.values())
+        index = {node.id: i for i, node in enumerate(ordered)}
+
+        def index_of(node):
+            return index.get(node.id) if node is not None else None
+
+        start_index = None
+        steps = []
+        batch_steps = []
+        successors = []
+        forks = []
+        pools = []
+        for i, node in enumerate(ordered):
+            if start_index is None and node.node_type == "inicio":
+                start_index = i
+            steps.append(step_factory(node))
+            batch_steps.append(node.compile_batch() if with_batch else None)
+            if hasattr(node, "branches"):
+                join = node.find_join()
+                forks.append((i, node, join))
+                successors.append((index_of(join), None, None))
+                continue
+            successors.append((
+                index_of(node.connected_to),
+                index_of(getattr(node, "true_connection", None)),
+                index_of(getattr(node, "false_connection", None)),
+            ))
+        if start_index is None:
+            raise ValueError("Debe existir un nodo de inicio")
+        for i, node, join in forks:
+            steps[i] = cls._compile_fork(node, steps[i], [index_of(start) for start in node.branches], join,
+                                         index_of(join), steps, successors, pools)
+
+        return cls(
+            tuple(node.id for node in ordered),
+            tuple(node.node_type for node in ordered),
+            tuple(steps),
+            tuple(successors),
+            start_index,
+            (time.perf_counter() - t0) * 1000,
+            tuple(batch_steps),
+            tuple(pools),
+        )
+
+    @staticmethod
+    def _compile_fork(node, step, starts, join, join_index, steps, successors, pools):
+        # Las ramas leen 'steps' al ejecutarse: ya incluye los pasos de las divisiones anidadas
+        if inspect.iscoroutinefunction(step):
+            async def run_branch(context, current):
+                while current is not None and current != join_index:
+                    slot = await steps[current](context)
+                    current = successors[current][slot] if slot is not None else None
+                return context
+            return node.compile_parallel_async(step, run_branch, starts, join)
+
+        def run_branch(context, current, cancelled=None):
+            # 'cancelled' (threading.Event) detiene la rama entre un paso y otro cuando ya no se necesita
+            while current is not None and current != join_index:
+                if cancelled is not None and cancelled.is_set():
+                    break
+                slot = steps[current](context)
+                current = successors[current][slot] if slot is not None else None
+            return context
+        return node.compile_parallel(step, run_branch, starts, join, pools)
+
+    def close(self):
+        """Detiene los hilos de las ramas paralelas (si el plan se vuelve a ejecutar, se crean de nuevo)."""
+        for pool in self.pools:
+            pool.close()
+
+    def run(self, context):
+        steps = self.steps
+        successors = self.successors
+        current = self.start_index
+        while current is not None:
+            slot = steps[current](context)
+            current = successors[current][slot] if slot is not None else None
+        return context
+
+    def run_from(self, context, start_index, on_step):
+        """
+        Igual que run(), pero empieza en 'start_index' y, después de cada nodo,
+        llama a on_step(índice, índice siguiente o None, context) (ver puntos de control).
+        """
+        steps = self.steps
+        successors = self.successors
+        current = start_index
+        while current is not None:
+            slot = steps[current](context)
+            nxt = successors[current][slot] if slot is not None else None
+            on_step(current, nxt, context)
+            current = nxt
+        return context
+
+    def run_batch(self, contexts):
+        """
+        Ejecuta el plan para un lote de contextos avanzando nodo por nodo: todos
+        los registros que llegan a un mismo nodo se procesan juntos, con su
+        step_batch() si lo tiene (p. ej. condicionales evaluados por columnas),
+        y luego se reparten entre sus salidas. Retorna una lista con el contexto
+        final de cada registro, o la excepción que detuvo su ejecución.
+        El orden de los efectos (mensajes impresos) es por nodo, no por registro.
+        """
+        results = list(contexts)
+        steps = self.steps
+        batch_steps = self.batch_steps
+        successors = self.successors
+        pending = {self.start_index: list(range(len(results)))}
+        ready = deque([self.start_index])
+        while ready:
+            current = ready.popleft()
+            indices = pending.pop(current)
+            slots = None
+            if batch_steps[current] is not None and len(indices) > 1:
+                try:
+                    slots = batch_steps[current]([results[i] for i in indices])
+                except Exception:
+                    slots = None  # Se reintenta registro por registro para aislar el error
+            targets = successors[current]
+            for position, i in enumerate(indices):
+                if slots is not None:
+                    slot = slots[position]
+                else:
+                    try:
+                        slot = steps[current](results[i])
+                    except Exception as e:
+                        results[i] = e
+                        continue
+                nxt = targets[slot] if slot is not None else None
+                if nxt is None:
+                    continue
+                waiting = pending.get(nxt)
+                if waiting is None:
+                    pending[nxt] = [i]
+                    ready.append(nxt)
+                else:
+                    waiting.append(i)
+        return results
+
+    async def run_async(self, context):
+        # Igual que run(), para planes cuyos pasos son corrutinas (ver AsyncFlowRunner)
+        steps = self.steps
+        successors = self.successors
+        current = self.start_index
+        while current is not None:
+            slot = await steps[current](context)
+            current = successors[current][slot] if slot is not None else None
+        return context
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError("ExecutionPlan es inmutable")
+        object.__setattr__(self, name, value)
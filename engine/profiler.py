@@ -0,0 +1,174 @@
+# engine/profiler.py
+import json
+import threading
+import time
+import tracemalloc
+
+class NodeTiming:
+    """Acumulado de las ejecuciones de un nodo (o de todos los nodos de un tipo)."""
+    __slots__ = ("node_id", "node_type", "text", "calls", "wall_ms", "max_wall_ms", "cpu_ms", "alloc_kb",
+                 "peak_kb")
+
+    def __init__(self, node_id, node_type, text):
+        self.node_id = node_id
+        self.node_type = node_type
+        self.text = text
+        self.calls = 0
+        self.wall_ms = 0.0
+        self.max_wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.alloc_kb = 0.0     # Memoria asignada y no liberada al terminar el nodo (neto)
+        self.peak_kb = 0.0      # Mayor pico de memoria asignada durante una ejecución del nodo
+
+    def add(self, wall_ms, cpu_ms, alloc_kb=0.0, peak_kb=0.0):
+        self.calls += 1
+        self.wall_ms += wall_ms
+        self.cpu_ms += cpu_ms
+        self.alloc_kb += alloc_kb
+        if wall_ms > self.max_wall_ms:
+            self.max_wall_ms = wall_ms
+        if peak_kb > self.peak_kb:
+            self.peak_kb = peak_kb
+
+    def merge(self, other):
+        self.calls += other.calls
+        self.wall_ms += other.wall_ms
+        self.cpu_ms += other.cpu_ms
+        self.alloc_kb += other.alloc_kb
+        self.max_wall_ms = max(self.max_wall_ms, other.max_wall_ms)
+        self.peak_kb = max(self.peak_kb, other.peak_kb)
+
+    @property
+    def avg_wall_ms(self):
+        return self.wall_ms / self.calls if self.calls else 0.0
+
+    def as_dict(self):
+        return {
+            "node_id": self.node_id,
+            "node_type": self.node_type,
+            "text": self.text,
+            "calls": self.calls,
+            "wall_ms": self.wall_ms,
+            "avg_wall_ms": self.avg_wall_ms,
+            "max_wall_ms": self.max_wall_ms,
+            "cpu_ms": self.cpu_ms,
+            "alloc_kb": self.alloc_kb,
+            "peak_kb": self.peak_kb,
+        }
+
+
+class NodeProfiler:
+    """
+    Mide cada ejecución de cada nodo: tiempo real, tiempo de CPU del hilo y,
+    con 'memory', la memoria asignada (tracemalloc; hace más lenta toda la
+    ejecución, por lo que los tiempos medidos con memoria son más altos).
+    Acumula por id de nodo a lo largo de todas las ejecuciones y exporta el
+    resultado como tabla, JSON o pilas colapsadas (formato de flamegraph.pl
+    y speedscope: "flujo;tipo;nodo microsegundos").
+    Se puede compartir entre hilos.
+    """
+    def __init__(self, memory=False, flow_name=None):
+        self.memory = memory
+        self.flow_name = flow_name
+        self.timings = {}   # node.id -> NodeTiming
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def wrap(self, node, step):
+        """Retorna step(context) que mide cada ejecución del nodo."""
+        timing = self.timings.get(node.id)
+        if timing is None:
+            timing = self.timings[node.id] = NodeTiming(node.id, node.node_type, node.text)
+        lock = self._lock
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        if self.memory:
+            def profiled_step(context):
+                tracemalloc.reset_peak()
+                mem_before = tracemalloc.get_traced_memory()[0]
+                cpu_before = time.thread_time()
+                t0 = time.perf_counter()
+                try:
+                    return step(context)
+                finally:
+                    wall_ms = (time.perf_counter() - t0) * 1000
+                    cpu_ms = (time.thread_time() - cpu_before) * 1000
+                    mem_after, peak = tracemalloc.get_traced_memory()
+                    with lock:
+                        timing.add(wall_ms, cpu_ms, (mem_after - mem_before) / 1024, (peak - mem_before) / 1024)
+        else:
+            def profiled_step(context):
+                cpu_before = time.thread_time()
+                t0 = time.perf_counter()
+                try:
+                    return step(context)
+                finally:
+                    wall_ms = (time.perf_counter() - t0) * 1000
+                    cpu_ms = (time.thread_time() - cpu_before) * 1000
+                    with lock:
+                        timing.add(wall_ms, cpu_ms)
+        return profiled_step
+
+    def by_node(self):
+        """Acumulados por nodo, del que más tiempo real consumió al que menos."""
+        with self._lock:
+            timings = [t for t in self.timings.values() if t.calls]
+        return sorted(timings, key=lambda t: t.wall_ms, reverse=True)
+
+    def by_type(self):
+        """Acumulados por tipo de nodo."""
+        types = {}
+        for timing in self.by_node():
+            total = types.get(timing.node_type)
+            if total is None:
+                total = types[timing.node_type] = NodeTiming(None, timing.node_type, timing.node_type)
+            total.merge(timing)
+        return sorted(types.values(), key=lambda t: t.wall_ms, reverse=True)
+
+    def table(self):
+        """Tabla de texto: una fila por nodo y luego una por tipo."""
+        header = f"{'Nodo':30s} {'Tipo':12s} {'Llamadas':>9s} {'Total ms':>10s} {'Prom ms':>9s} " \
+                 f"{'Máx ms':>9s} {'CPU ms':>10s}"
+        if self.memory:
+            header += f" {'Asignado KB':>12s} {'Pico KB':>10s}"
+        lines = [header, "-" * len(header)]
+        for title, timings in (("", self.by_node()), ("Por tipo", self.by_type())):
+            if title:
+                lines += ["", title, "-" * len(header)]
+            for t in timings:
+                name = t.text if t.node_id is None else f"{t.text} [{t.node_id[:8]}]"
+                line = f"{name[:30]:30s} {t.node_type[:12]:12s} {t.calls:9d} {t.wall_ms:10.2f} " \
+                       f"{t.avg_wall_ms:9.3f} {t.max_wall_ms:9.3f} {t.cpu_ms:10.2f}"
+                if self.memory:
+                    line += f" {t.alloc_kb:12.1f} {t.peak_kb:10.1f}"
+                lines.append(line)
+        return "\n".join(lines)
+
+    def to_json(self):
+        return json.dumps({"flow": self.flow_name, "memory": self.memory,
+                           "nodes": [t.as_dict() for t in self.by_node()],
+                           "types": [t.as_dict() for t in self.by_type()]}, indent=4, ensure_ascii=False)
+
+    def collapsed(self):
+        """Pilas colapsadas: "flujo;tipo;nodo [id] microsegundos" por nodo (tiempo real total)."""
+        root = (self.flow_name or "flujo").replace(";", ",")
+        lines = []
+        for t in self.by_node():
+            frame = f"{t.text} [{t.node_id[:8]}]".replace(";", ",")
+            lines.append(f"{root};{t.node_type};{frame} {round(t.wall_ms * 1000)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        # Los pasos ya compilados conservan su NodeTiming: se reinicia en el lugar
+        with self._lock:
+            for t in self.timings.values():
+                t.__init__(t.node_id, t.node_type, t.text)
@@ -0,0 +1,94 @@
+# engine/rate_limit.py
+import threading
+import time
+
+_UNITS = {"s": 1.0, "seg": 1.0, "min": 60.0, "h": 3600.0}
+
+def parse_rate(text):
+    """Convierte "5", "5/s", "30/min" o "100/h" en ejecuciones por segundo."""
+    value, _, unit = text.partition("/")
+    unit = unit.strip().lower() or "s"
+    if unit not in _UNITS:
+        raise ValueError(f"Unidad de tasa desconocida '{unit}' (use s, min o h)")
+    rate = float(value) / _UNITS[unit]
+    if rate <= 0:
+        raise ValueError(f"La tasa debe ser mayor que cero: '{text}'")
+    return rate
+
+class _TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "lock", "waits", "waited_s")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.waits = 0          # Turnos que tuvieron que esperar y segundos de espera (se cuentan con el lock)
+        self.waited_s = 0.0
+
+    def reserve(self):
+        # Reserva un turno y retorna cuántos segundos hay que esperarlo (el saldo puede quedar negativo)
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1.0
+            if self.tokens >= 0:
+                return 0.0
+            wait = -self.tokens / self.rate
+            self.waits += 1
+            self.waited_s += wait
+            return wait
+
+
+class NodeRateLimiter:
+    """
+    Limita cuántas veces por segundo se ejecuta cada tipo de nodo, sumando
+    todas las ejecuciones que comparten el limitador (p. ej. {"smtp": 2.0,
+    "llm": 10.0}). Cada tipo tiene un balde de turnos (token bucket) que admite
+    ráfagas de hasta 'burst' ejecuciones; cuando se agota, el nodo espera su
+    turno antes de ejecutarse, en el orden en que llegaron. Los tipos sin
+    límite se compilan sin envolver.
+    Se comparte entre hilos (p. ej. los de JobWorkerPool o FlowServer).
+    """
+    def __init__(self, limits, burst=1.0):
+        self.limits = dict(limits)
+        self.burst = burst
+        self._buckets = {node_type: _TokenBucket(rate, burst) for node_type, rate in self.limits.items()}
+
+    def __getstate__(self):
+        return {"limits": self.limits, "burst": self.burst}
+
+    def __setstate__(self, state):
+        self.__init__(state["limits"], state["burst"])
+
+    @property
+    def waits(self):
+        """Ejecuciones que esperaron su turno, sumando todos los tipos de nodo."""
+        return sum(bucket.waits for bucket in self._buckets.values())
+
+    @property
+    def waited_s(self):
+        """Segundos de espera en total, sumando todos los tipos de nodo."""
+        return sum(bucket.waited_s for bucket in self._buckets.values())
+
+    def acquire(self, node_type):
+        bucket = self._buckets.get(node_type)
+        if bucket is None:
+            return
+        wait = bucket.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def wrap(self, node, step):
+        """Retorna step(context) que espera el turno del tipo de nodo, o el mismo 'step' si no tiene límite."""
+        if node.node_type not in self._buckets:
+            return step
+        node_type = node.node_type
+        acquire = self.acquire
+
+        def limited_step(context):
+            acquire(node_type)
+            return step(context)
+        return limited_step
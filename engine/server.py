@@ -0,0 +1,318 @@
+# engine/server.py
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from engine.flow_runner import FlowRunner, clean_context
+from engine.metrics import MetricsRegistry
+from engine.tracing import JsonlSpanExporter, Tracer
+from models.input_provider import StaticInputProvider
+from models.llm_cache import LLMResponseCache
+from models.ollama_client import OllamaClientRegistry
+from models.smtp_transport import SmtpConnectionPool
+from models.python_pool import PythonWorkerPool
+from models.run_memory import RUN_MEMORY_BACKENDS, BackgroundRunWriter, create_run_memory
+
+class FlowRegistry:
+    """
+    Flujos cargados y compilados una sola vez, por nombre (el nombre del
+    archivo sin ".json"). 'paths' son archivos de flujo o carpetas (se cargan
+    todos sus .json). Con 'reload_interval' > 0 un hilo revisa cada tantos
+    segundos si algún archivo cambió y, si es así, lo vuelve a compilar: las
+    ejecuciones en curso terminan con la versión anterior y las nuevas usan la
+    nueva. Si el archivo modificado no se puede cargar se conserva la versión
+    anterior. También se cargan los archivos nuevos de las carpetas y se
+    descartan los flujos cuyo archivo se borró.
+    Todos los flujos comparten los servicios de 'runner_kwargs' (clientes del
+    LLM, caché, sesiones SMTP...).
+    """
+    def __init__(self, paths, runner_kwargs=None, reload_interval=1.0):
+        self.paths = list(paths)
+        self.runner_kwargs = runner_kwargs or {}
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self._flows = {}    # nombre -> (FlowRunner, ruta, (mtime, tamaño), momento de carga)
+        self._stop = threading.Event()
+        self._thread = None
+        self.check()
+        if reload_interval and reload_interval > 0:
+            self._thread = threading.Thread(target=self._watch, name="flow-reload", daemon=True)
+            self._thread.start()
+
+    @staticmethod
+    def flow_name(path):
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def _files(self):
+        for path in self.paths:
+            if os.path.isdir(path):
+                for name in sorted(os.listdir(path)):
+                    if name.lower().endswith(".json"):
+                        yield os.path.join(path, name)
+            else:
+                yield path
+
+    def _load(self, path, signature):
+        kwargs = dict(self.runner_kwargs)
+        if kwargs.get("tracer") is not None:
+            # Un Tracer por flujo, con el nombre del flujo en sus spans, sobre el mismo exportador
+            kwargs["tracer"] = Tracer(kwargs["tracer"].exporter, os.path.basename(path))
+        runner = FlowRunner.from_file(path, StaticInputProvider(), **kwargs)
+        self._flows[self.flow_name(path)] = (runner, path, signature, time.time())
+        return runner
+
+    def check(self):
+        """Carga los archivos nuevos o modificados y descarta los borrados. Retorna los nombres recargados."""
+        seen = set()
+        changed = []
+        for path in self._files():
+            name = self.flow_name(path)
+            seen.add(name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = (stat.st_mtime_ns, stat.st_size)
+            current = self._flows.get(name)
+            if current is not None and current[2] == signature:
+                continue
+            try:
+                self._load(path, signature)
+            except Exception as e:
+                print(f"No se pudo cargar el flujo '{path}': {type(e).__name__}: {e}", file=sys.stderr)
+                if current is not None:
+                    # Se conserva la versión anterior; no se reintenta hasta que el archivo cambie otra vez
+                    self._flows[name] = current[:2] + (signature,) + current[3:]
+                continue
+            if current is not None:
+                # Las ejecuciones en curso con la versión anterior siguen funcionando (ver BranchPool)
+                current[0].close()
+                self.reloads += 1
+                print(f"Flujo '{name}' recargado", file=sys.stderr)
+            changed.append(name)
+        for name in [name for name in self._flows if name not in seen]:
+            self._flows.pop(name)[0].close()
+            print(f"Flujo '{name}' descartado (su archivo ya no existe)", file=sys.stderr)
+        return changed
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            self.check()
+
+    def get(self, name):
+        """Retorna el FlowRunner del flujo, o None si no existe."""
+        entry = self._flows.get(name)
+        return entry[0] if entry is not None else None
+
+    def describe(self):
+        flows = []
+        for name, (runner, path, _, loaded) in sorted(self._flows.items()):
+            flows.append({"name": name, "file": path, "nodes": len(runner.nodes),
+                          "compile_ms": runner.compile_ms, "loaded": loaded})
+        return flows
+
+    def __len__(self):
+        return len(self._flows)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        for runner, _, _, _ in self._flows.values():
+            runner.close()
+
+
+class _FlowHttpServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128    # Conexiones pendientes de aceptar (el valor por defecto, 5, es poco bajo carga)
+
+
+class _FlowRequestHandler(BaseHTTPRequestHandler):
+    # Conexiones keep-alive: un cliente puede enviar muchas ejecuciones por la misma conexión
+    protocol_version = "HTTP/1.1"
+    # Encabezados y cuerpo se escriben por separado: sin esto, Nagle y el ACK diferido suman ~40 ms por respuesta
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        server = self.server.flow_server
+        if path == "/health":
+            self._send_json(200, {"status": "ok", "flows": len(server.registry)})
+        elif path == "/flows":
+            self._send_json(200, {"flows": server.registry.describe()})
+        elif path == "/metrics" and server.metrics is not None:
+            body = server.metrics.prometheus_text().encode("utf-8")
+            self._send(200, body, "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send_json(404, {"error": f"Ruta desconocida: {path}"})
+
+    def do_POST(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if len(parts) != 3 or parts[0] != "flows" or parts[2] != "run":
+            self._send_json(404, {"error": f"Ruta desconocida: {self.path}"})
+            return
+        try:
+            request = json.loads(body) if body else {}
+            if not isinstance(request, dict):
+                raise ValueError("El cuerpo debe ser un objeto JSON")
+        except ValueError as e:
+            self._send_json(400, {"error": f"JSON inválido: {e}"})
+            return
+        status, response = self.server.flow_server.run(parts[1], request)
+        self._send_json(status, response)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FlowServer:
+    """
+    Servidor HTTP/JSON de ejecución de flujos. Cada petición se atiende en su
+    propio hilo sobre los planes ya compilados del FlowRegistry; como mucho
+    'max_concurrent' ejecuciones corren a la vez (las demás esperan su turno).
+
+        GET  /health                 estado y número de flujos cargados
+        GET  /flows                  flujos cargados (archivo, nodos, momento de carga)
+        POST /flows/<nombre>/run     ejecuta el flujo
+        GET  /metrics                métricas del motor (si se indicó 'metrics')
+
+    El cuerpo de /run es {"context": {...}, "answers": {...}, "run_id": "..."}
+    (todos opcionales): el contexto inicial, las respuestas a las preguntas de
+    los nodos (StaticInputProvider) y el id de la ejecución (si falta, se
+    genera uno: es el que registran la memoria y las trazas). La respuesta es
+    {"flow", "run_id", "context", "elapsed_ms"} con el contexto final, o
+    {"error"} con estado 404 (flujo desconocido) o 500 (el flujo falló).
+    """
+    def __init__(self, registry, port=8080, host="127.0.0.1", max_concurrent=32, metrics=None):
+        self.registry = registry
+        self.metrics = metrics
+        self._slots = threading.BoundedSemaphore(max(max_concurrent, 1))
+        self.server = _FlowHttpServer((host, port), _FlowRequestHandler)
+        self.server.flow_server = self
+        self._thread = None
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def run(self, name, request):
+        """Ejecuta el flujo 'name' para una petición. Retorna (estado HTTP, respuesta)."""
+        runner = self.registry.get(name)
+        if runner is None:
+            return 404, {"error": f"No existe el flujo '{name}'"}
+        context = request.get("context") or {}
+        if not isinstance(context, dict):
+            return 400, {"error": "'context' debe ser un objeto JSON"}
+        context = dict(context)
+        # Cada petición trae sus propias respuestas (initial_context no reemplaza este proveedor)
+        context["input_provider"] = StaticInputProvider(request.get("answers") or {})
+        # El id se decide aquí para que la respuesta coincida con lo que guardan la memoria y las trazas
+        run_id = request.get("run_id") or str(uuid.uuid4())
+        if not isinstance(run_id, str):
+            return 400, {"error": "'run_id' debe ser un texto"}
+        with self._slots:
+            t0 = time.perf_counter()
+            try:
+                context = runner.run(context, run_id)
+            except Exception as e:
+                return 500, {"flow": name, "run_id": run_id, "error": f"{type(e).__name__}: {e}"}
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+        return 200, {"flow": name, "run_id": run_id, "context": clean_context(context), "elapsed_ms": elapsed_ms}
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def start(self):
+        """Atiende las peticiones desde un hilo (para usar el servidor dentro de otro programa)."""
+        self._thread = threading.Thread(target=self.server.serve_forever, name="flow-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.registry.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Servidor HTTP/JSON que ejecuta flujos guardados.")
+    parser.add_argument("flows", nargs="+", help="Archivos JSON de flujos o carpetas con flujos")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección en la que escuchar")
+    parser.add_argument("--port", type=int, default=8080, help="Puerto en el que escuchar")
+    parser.add_argument("--max-concurrent", type=int, default=32, help="Ejecuciones simultáneas como máximo")
+    parser.add_argument("--reload-interval", type=float, default=1.0,
+                        help="Segundos entre revisiones de los archivos de flujo (0 = sin recarga)")
+    parser.add_argument("--ollama-host", help="Servidor de Ollama (por defecto OLLAMA_HOST)")
+    parser.add_argument("--llm-pool-size", type=int, default=10, help="Conexiones keep-alive por host de Ollama")
+    parser.add_argument("--llm-timeout", type=float, help="Segundos máximos por llamada al LLM")
+    parser.add_argument("--llm-cache", action="store_true", help="Reutilizar respuestas del LLM para mensajes idénticos")
+    parser.add_argument("--llm-cache-db", metavar="ARCHIVO",
+                        help="Base SQLite para la caché del LLM (implica --llm-cache)")
+    parser.add_argument("--python-workers", type=int, default=2,
+                        help="Procesos para los nodos Python marcados como aislados")
+    parser.add_argument("--memory", choices=RUN_MEMORY_BACKENDS,
+                        help="Guardar el contexto final de cada ejecución en la memoria de ejecuciones "
+                             "(escrita en segundo plano)")
+    parser.add_argument("--memory-path", help="Carpeta (o archivo .db con sqlite) de la memoria de ejecuciones")
+    parser.add_argument("--trace", metavar="ARCHIVO", help="Anexar a un archivo JSONL un span por ejecución y por nodo")
+    parser.add_argument("--metrics", action="store_true", help="Exponer métricas del motor en /metrics")
+    parser.add_argument("--quiet", action="store_true", help="Descartar los mensajes que imprimen los nodos")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Los servicios se comparten entre todos los flujos y todas las peticiones
+    runner_kwargs = {
+        "llm_clients": OllamaClientRegistry(args.ollama_host, pool_size=args.llm_pool_size, timeout=args.llm_timeout),
+        "smtp_transport": SmtpConnectionPool(),
+        "python_pool": PythonWorkerPool(args.python_workers),
+    }
+    if args.llm_cache or args.llm_cache_db:
+        runner_kwargs["llm_cache"] = LLMResponseCache(db_path=args.llm_cache_db)
+    if args.memory:
+        runner_kwargs["run_memory"] = BackgroundRunWriter(create_run_memory(args.memory, args.memory_path))
+    if args.trace:
+        runner_kwargs["tracer"] = Tracer(JsonlSpanExporter(args.trace))
+    if args.metrics:
+        runner_kwargs["metrics"] = MetricsRegistry()
+
+    registry = FlowRegistry(args.flows, runner_kwargs, args.reload_interval)
+    server = FlowServer(registry, args.port, args.host, args.max_concurrent, runner_kwargs.get("metrics"))
+    print(f"{len(registry)} flujos en {server.address}/flows", file=sys.stderr)
+    # Los nodos imprimen en stdout; durante todo el servicio sus mensajes van a stderr (o se descartan)
+    log_stream = open(os.devnull, "w") if args.quiet else sys.stderr
+    try:
+        with contextlib.redirect_stdout(log_stream):
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        for service in ("python_pool", "smtp_transport", "llm_clients", "run_memory", "tracer"):
+            if service in runner_kwargs:
+                runner_kwargs[service].close()
+        if args.quiet:
+            log_stream.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
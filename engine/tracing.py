@@ -0,0 +1,157 @@
+# engine/tracing.py
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from models.nodes import SLOT_NEXT, SLOT_TRUE, SLOT_FALSE
+
+# Nombre de la salida tomada por un nodo (atributo "branch" de su span)
+BRANCHES = {SLOT_NEXT: "siguiente", SLOT_TRUE: "verdadero", SLOT_FALSE: "falso", None: "fin"}
+
+def _new_span_id():
+    return os.urandom(8).hex()
+
+class SpanExporter:
+    """
+    Destino de los spans. export(span) recibe cada span terminado como
+    diccionario con los campos de un span de OpenTelemetry: trace_id, span_id,
+    parent_span_id, name, start_time (segundos desde epoch), duration_ms,
+    status ("ok" o "error"), error y attributes.
+    """
+    def export(self, span):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JsonlSpanExporter(SpanExporter):
+    """
+    Anexa cada span como una línea JSON a 'path'. Las líneas se escriben de a
+    'flush_every' en una sola escritura, así los procesos de un lote en
+    paralelo pueden compartir el archivo sin mezclar líneas.
+    """
+    def __init__(self, path, flush_every=100):
+        self.path = path
+        self.flush_every = max(flush_every, 1)
+        self._lines = []
+        self._file = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_lines=[], _file=None, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._lines.append(line)
+            if len(self._lines) >= self.flush_every:
+                self._flush()
+
+    def _flush(self):
+        if self._lines:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write("".join(self._lines))
+            self._file.flush()
+            self._lines = []
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class Tracer:
+    """
+    Emite un span por ejecución del flujo ("flow.run") y uno por cada nodo
+    ejecutado ("node.<tipo>"), hijo del de su ejecución. Todos llevan el id de
+    la ejecución, de modo que se pueden correlacionar aunque haya ejecuciones
+    simultáneas. Los spans de nodo tienen el id, tipo y texto del nodo, la
+    salida tomada ("branch"), la duración y, si el nodo falló, status "error".
+    Sin Tracer el plan se compila sin envolver los nodos: no tiene costo.
+    """
+    def __init__(self, exporter, flow_name=None):
+        self.exporter = exporter
+        self.flow_name = flow_name
+
+    def start_run(self, context, run_id):
+        """Abre el span de una ejecución; queda en context["trace_span"] para los spans de los nodos."""
+        context["trace_span"] = {"trace_id": os.urandom(16).hex(), "span_id": _new_span_id(), "run_id": run_id,
+                                 "start_time": time.time(), "t0": time.perf_counter()}
+
+    def end_run(self, context, error=None):
+        run = context.pop("trace_span", None)
+        if run is None:
+            return
+        self.exporter.export({
+            "trace_id": run["trace_id"],
+            "span_id": run["span_id"],
+            "parent_span_id": None,
+            "name": "flow.run",
+            "start_time": run["start_time"],
+            "duration_ms": (time.perf_counter() - run["t0"]) * 1000,
+            "status": "error" if error is not None else "ok",
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+            "attributes": {"run_id": run["run_id"], "flow": self.flow_name},
+        })
+
+    @contextmanager
+    def run_span(self, context, run_id):
+        self.start_run(context, run_id)
+        try:
+            yield
+        except Exception as e:
+            self.end_run(context, e)
+            raise
+        self.end_run(context)
+
+    def wrap(self, node, step):
+        """Retorna step(context) que emite un span por cada ejecución del nodo."""
+        export = self.exporter.export
+        name = f"node.{node.node_type}"
+        attributes = {"node_id": node.id, "node_type": node.node_type, "node_text": node.text}
+
+        def traced_step(context):
+            run = context.get("trace_span")
+            if run is None:
+                return step(context)
+            start_time = time.time()
+            t0 = time.perf_counter()
+            slot = error = None
+            try:
+                slot = step(context)
+                return slot
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                export({
+                    "trace_id": run["trace_id"],
+                    "span_id": _new_span_id(),
+                    "parent_span_id": run["span_id"],
+                    "name": name,
+                    "start_time": start_time,
+                    "duration_ms": (time.perf_counter() - t0) * 1000,
+                    "status": "error" if error is not None else "ok",
+                    "error": f"{type(error).__name__}: {error}" if error is not None else None,
+                    "attributes": {**attributes, "run_id": run["run_id"],
+                                   "branch": BRANCHES.get(slot) if error is None else None},
+                })
+        return traced_step
+
+    def close(self):
+        self.exporter.close()
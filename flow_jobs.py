@@ -0,0 +1,10 @@
+# flow_jobs.py
+# Cola persistente de ejecuciones de flujos: encolar, programar con cron y ejecutar con varios hilos.
+# Ejemplo: python flow_jobs.py add saludo --batch clientes.csv --priority 5
+#          python flow_jobs.py schedule reporte reporte "0 8 * * 1-5"
+#          python flow_jobs.py work flujos/ --workers 8 --rate smtp=30/min --rate llm=5/s
+import sys
+from engine.jobs import main
+
+if __name__ == "__main__":
+    sys.exit(main())
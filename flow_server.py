@@ -0,0 +1,9 @@
+# flow_server.py
+# Servidor HTTP/JSON que mantiene compilados los flujos de una carpeta y los ejecuta a pedido.
+# Ejemplo: python flow_server.py flujos/ --port 8080
+#          curl -X POST localhost:8080/flows/saludo/run -d '{"context": {"nombre": "Julian"}}'
+import sys
+from engine.server import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,10 @@ def main():
     view = DiagramView(controller)
     controller.view = view
     view.mainloop()
+    # Escribe las ejecuciones que aún estén en cola y la última lectura de las métricas antes de salir
+    controller.run_memory.close()
+    if controller.metrics_dump is not None:
+        controller.metrics_dump.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,13 +1,22 @@
 # models/accion_node.py
-from models.nodes import FlowNode
-from tkinter import Toplevel, ttk, simpledialog
+from models.nodes import FlowNode, SLOT_NEXT
+from models.input_provider import get_input_provider
+from models.template import compile_template
 
 class AccionNode(FlowNode):
     def __init__(self, x, y):
         super().__init__(x, y, "accion", "Acción", "Acción")
         self.config["action_type"] = "imprimir"  # Valor por defecto
+        self.config["interpolate"] = False       # Reemplazar ${variable} en el texto a imprimir
+
+    @property
+    def blocking(self):
+        # Solo las preguntas esperan al usuario
+        return self.config.get("action_type", "imprimir") == "pregunta"
 
     def configure(self, parent, variable_manager):
+        import tkinter as tk
+        from tkinter import Toplevel, ttk
         dialog = Toplevel(parent)
         dialog.update_idletasks()
         dialog.grab_set()
@@ -34,16 +43,21 @@ class AccionNode(FlowNode):
         entry_message.grid(row=2, column=1, padx=10, pady=5, sticky="w")
         entry_message.insert(0, self.config.get("print_text", ""))
 
+        interpolate_var = tk.BooleanVar(value=self.config.get("interpolate", False))
+        chk_interpolate = ttk.Checkbutton(dialog, text="Reemplazar ${variable} por su valor",
+                                          variable=interpolate_var)
+        chk_interpolate.grid(row=3, column=1, padx=10, pady=5, sticky="w")
+
         lbl_question = ttk.Label(dialog, text="Pregunta:")
-        lbl_question.grid(row=3, column=0, padx=10, pady=5, sticky="w")
+        lbl_question.grid(row=4, column=0, padx=10, pady=5, sticky="w")
         entry_question = ttk.Entry(dialog, width=40)
-        entry_question.grid(row=3, column=1, padx=10, pady=5, sticky="w")
+        entry_question.grid(row=4, column=1, padx=10, pady=5, sticky="w")
         entry_question.insert(0, self.config.get("question", ""))
 
         lbl_var = ttk.Label(dialog, text="Variable (para almacenar respuesta):")
-        lbl_var.grid(row=4, column=0, padx=10, pady=5, sticky="w")
+        lbl_var.grid(row=5, column=0, padx=10, pady=5, sticky="w")
         entry_var = ttk.Entry(dialog, width=40)
-        entry_var.grid(row=4, column=1, padx=10, pady=5, sticky="w")
+        entry_var.grid(row=5, column=1, padx=10, pady=5, sticky="w")
         entry_var.insert(0, self.config.get("variable_name", ""))
 
         def on_ok():
@@ -53,6 +67,7 @@ class AccionNode(FlowNode):
             if act_type == "imprimir":
                 text = entry_message.get().strip()
                 self.config["print_text"] = text
+                self.config["interpolate"] = interpolate_var.get()
                 self.text = text
             else:
                 q = entry_question.get().strip()
@@ -63,22 +78,58 @@ class AccionNode(FlowNode):
             dialog.destroy()
 
         btn_ok = ttk.Button(dialog, text="OK", command=on_ok)
-        btn_ok.grid(row=5, column=0, padx=10, pady=10)
+        btn_ok.grid(row=6, column=0, padx=10, pady=10)
         btn_cancel = ttk.Button(dialog, text="Cancelar", command=dialog.destroy)
-        btn_cancel.grid(row=5, column=1, padx=10, pady=10)
+        btn_cancel.grid(row=6, column=1, padx=10, pady=10)
         dialog.wait_window(dialog)
 
-    def execute(self, context):
+    def compile(self):
+        # La configuración se resuelve una sola vez; el paso solo usa variables locales
         act_type = self.config.get("action_type", "imprimir")
         if act_type == "imprimir":
-            message = self.config.get("print_text", self.text)
-            print(f"Acción imprimir: {message}")
+            message = self._compile_message()
+
+            def step(context):
+                print(f"Acción imprimir: {message.render(context)}")
+                return SLOT_NEXT
         else:
             question = self.config.get("question", "Ingrese respuesta:")
             var_name = self.config.get("variable_name", "respuesta")
-            # Se asume que 'context' incluye la raíz para diálogos
-            root = context.get("root")
-            answer = simpledialog.askstring("Pregunta", question, parent=root)
-            print(f"Pregunta: {question} | Respuesta: {answer}")
-            context[var_name] = answer
-        return self.connected_to
+
+            def step(context):
+                # El proveedor de entrada decide cómo obtener la respuesta (diálogo Tk, consola, etc.)
+                answer = get_input_provider(context).ask("Pregunta", question, variable=var_name)
+                print(f"Pregunta: {question} | Respuesta: {answer}")
+                context[var_name] = answer
+                return SLOT_NEXT
+        return step
+
+    def compile_batch(self):
+        # Las preguntas se hacen una por una; los mensajes de un lote se imprimen con una sola escritura
+        if self.config.get("action_type", "imprimir") != "imprimir":
+            return None
+        message = self._compile_message()
+
+        def step_batch(contexts):
+            print("\n".join(f"Acción imprimir: {message.render(context)}" for context in contexts))
+            return [SLOT_NEXT] * len(contexts)
+        return step_batch
+
+    def _compile_message(self):
+        # Sin 'interpolate' el texto se imprime tal cual, aunque contenga "${"
+        text = self.config.get("print_text", self.text)
+        return compile_template(text) if self.config.get("interpolate", False) else _Literal(text)
+
+    def execute(self, context):
+        return self.successor(self.compile()(context))
+
+
+class _Literal:
+    """Texto fijo con la misma interfaz que una plantilla compilada."""
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def render(self, context):
+        return self.text
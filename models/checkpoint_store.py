@@ -0,0 +1,91 @@
+# models/checkpoint_store.py
+import json
+import sqlite3
+import threading
+import time
+
+class CheckpointStore:
+    """
+    Puntos de control de las ejecuciones en curso, en una base SQLite (WAL).
+    Tras cada nodo completado se guarda, por id de ejecución, el contexto y el
+    nodo que sigue; al terminar la ejecución su punto de control se borra.
+    Si el proceso muere, FlowRunner.resume(run_id) continúa desde el nodo
+    siguiente al último completado sin repetir los anteriores (el nodo que se
+    estaba ejecutando al morir sí se repite).
+    El contexto se guarda como JSON: los valores que no lo son se guardan como texto.
+    """
+    def __init__(self, db_path="checkpoints.db"):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    # Los procesos de un lote en paralelo abren su propia conexión
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_conn=None, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            # Con WAL y synchronous=NORMAL cada commit sobrevive a la caída del proceso (no a un corte de energía)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "run_id TEXT PRIMARY KEY, flow TEXT, node_id TEXT, next_node_id TEXT, "
+                "updated REAL NOT NULL, context TEXT NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def save(self, run_id, flow, node_id, next_node_id, context):
+        """Registra que 'node_id' terminó con 'context' y que la ejecución sigue en 'next_node_id'."""
+        row = (run_id, flow, node_id, next_node_id, time.time(),
+               json.dumps(context, ensure_ascii=False, default=str))
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO checkpoints "
+                             "(run_id, flow, node_id, next_node_id, updated, context) VALUES (?, ?, ?, ?, ?, ?)", row)
+
+    @staticmethod
+    def _checkpoint(row):
+        return {"run_id": row[0], "flow": row[1], "node_id": row[2], "next_node_id": row[3], "time": row[4],
+                "context": json.loads(row[5])}
+
+    def load(self, run_id):
+        """Retorna el último punto de control de la ejecución, o None si no existe (o ya terminó)."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT run_id, flow, node_id, next_node_id, updated, context FROM checkpoints WHERE run_id = ?",
+                (run_id,)).fetchone()
+        return self._checkpoint(row) if row is not None else None
+
+    def pending(self, flow=None):
+        """Ejecuciones interrumpidas (con punto de control), de la más antigua a la más reciente."""
+        sql = "SELECT run_id, flow, node_id, next_node_id, updated, context FROM checkpoints"
+        params = ()
+        if flow is not None:
+            sql += " WHERE flow = ?"
+            params = (flow,)
+        with self._lock:
+            rows = self._connection().execute(sql + " ORDER BY updated", params).fetchall()
+        return [self._checkpoint(row) for row in rows]
+
+    def finish(self, run_id):
+        """Borra el punto de control de una ejecución que terminó."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
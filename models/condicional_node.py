@@ -1,14 +1,17 @@
 # models/condicional_node.py
-from models.nodes import FlowNode
-from tkinter import Toplevel, ttk, messagebox
+from models.nodes import FlowNode, SLOT_TRUE, SLOT_FALSE
+from models.conditions import OPERATORS, compile_conditions
 
 class CondicionalNode(FlowNode):
     def __init__(self, x, y):
         super().__init__(x, y, "condicional", "Condicional", "Condicional")
         self.config["conditions"] = []  # Lista de condiciones (cada una es un dict con variable, operador y valor)
         self.config["logical_operator"] = "AND"
+        self.true_connection = None
+        self.false_connection = None
 
     def configure(self, parent, variable_manager):
+        from tkinter import Toplevel, ttk, messagebox
         dialog = Toplevel(parent)
         dialog.update_idletasks()
         dialog.grab_set()
@@ -37,7 +40,7 @@ class CondicionalNode(FlowNode):
             entry_var.grid(row=row, column=1, padx=5, pady=3)
             lbl_op = ttk.Label(conditions_frame, text="Operador:")
             lbl_op.grid(row=row, column=2, padx=5, pady=3)
-            entry_op = ttk.Entry(conditions_frame, width=5)
+            entry_op = ttk.Combobox(conditions_frame, values=OPERATORS, width=8)
             entry_op.grid(row=row, column=3, padx=5, pady=3)
             lbl_val = ttk.Label(conditions_frame, text="Valor:")
             lbl_val.grid(row=row, column=4, padx=5, pady=3)
@@ -84,42 +87,29 @@ class CondicionalNode(FlowNode):
         btn_cancel.grid(row=4, column=1, padx=10, pady=10)
         dialog.wait_window(dialog)
 
-    def execute(self, context):
-        conditions = self.config.get("conditions", [])
-        logical_op = self.config.get("logical_operator", "AND").upper()
-        result = None
-        for cond in conditions:
-            var_name = cond.get("variable")
-            operator = cond.get("operator")
-            value = cond.get("value")
-            var_val = context.get(var_name)
-            cond_result = False
-            if operator == "==":
-                cond_result = str(var_val) == value
-            elif operator == "!=":
-                cond_result = str(var_val) != value
-            elif operator == ">":
-                try:
-                    cond_result = float(var_val) > float(value)
-                except:
-                    cond_result = False
-            elif operator == "<":
-                try:
-                    cond_result = float(var_val) < float(value)
-                except:
-                    cond_result = False
-            if result is None:
-                result = cond_result
+    def compile(self):
+        # Las condiciones se convierten una sola vez en un predicado que corta en cuanto conoce el resultado
+        predicate = compile_conditions(self.config.get("conditions", []), self.config.get("logical_operator", "AND"))
+
+        def step(context):
+            if predicate(context):
+                print("Condicional: VERDADERO")
+                return SLOT_TRUE
             else:
-                if logical_op == "AND":
-                    result = result and cond_result
-                elif logical_op == "OR":
-                    result = result or cond_result
-                else:
-                    result = cond_result
-        if result:
-            print("Condicional: VERDADERO")
-            return self.true_connection
-        else:
-            print("Condicional: FALSO")
-            return self.false_connection
+                print("Condicional: FALSO")
+                return SLOT_FALSE
+        return step
+
+    def compile_batch(self):
+        # Todo el lote se evalúa con el mismo predicado; se informa un resumen en lugar de una línea por registro
+        predicate = compile_conditions(self.config.get("conditions", []), self.config.get("logical_operator", "AND"))
+
+        def step_batch(contexts):
+            slots = [SLOT_TRUE if predicate(context) else SLOT_FALSE for context in contexts]
+            false_count = slots.count(SLOT_FALSE)
+            print(f"Condicional: {len(slots) - false_count} VERDADERO, {false_count} FALSO")
+            return slots
+        return step_batch
+
+    def execute(self, context):
+        return self.successor(self.compile()(context))
@@ -0,0 +1,85 @@
+# models/conditions.py
+import math
+import re
+
+# Operadores disponibles en el nodo Condicional (en el orden en que se muestran)
+OPERATORS = ("==", "!=", ">", "<", ">=", "<=", "in", "contains", "regex")
+
+_NUMBER_TYPES = (int, float)
+_COLLECTION_TYPES = (list, tuple, set, frozenset, dict)
+_NUMERIC_OPERATORS = (">", "<", ">=", "<=")
+
+def to_number(value):
+    """Convierte a número; si no es posible retorna NaN, con el que toda comparación es falsa."""
+    if type(value) in _NUMBER_TYPES:
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return math.nan
+
+def _contains(var_val, value):
+    # El texto de la variable incluye el valor, o la colección de la variable lo tiene como elemento
+    if var_val is None:
+        return False
+    if isinstance(var_val, _COLLECTION_TYPES):
+        return value in var_val or any(str(item) == value for item in var_val)
+    return value in str(var_val)
+
+def _condition_source(i, var_name, operator, value, names):
+    """
+    Retorna la expresión Python de una condición. Los nombres de variables y las
+    constantes ya procesadas (número, opciones, expresión regular) se pasan en
+    'names', nunca como texto dentro del código.
+    """
+    value = "" if value is None else str(value)
+    names[f"_v{i}"] = var_name
+    get = f"context.get(_v{i})"
+    if operator in ("==", "!="):
+        names[f"_c{i}"] = value
+        return f"str({get}) {operator} _c{i}"
+    if operator in _NUMERIC_OPERATORS:
+        number = to_number(value)
+        if math.isnan(number):
+            # La constante no es numérica: la condición nunca se cumple
+            return "False"
+        names[f"_c{i}"] = number
+        return f"_num({get}) {operator} _c{i}"
+    if operator == "in":
+        # "in": la variable es una de las opciones separadas por comas
+        names[f"_c{i}"] = frozenset(option.strip() for option in value.split(","))
+        return f"str({get}) in _c{i}"
+    if operator == "contains":
+        names[f"_c{i}"] = value
+        return f"_contains({get}, _c{i})"
+    if operator == "regex":
+        try:
+            names[f"_c{i}"] = re.compile(value).search
+        except re.error as e:
+            print(f"Condicional: expresión regular inválida '{value}': {e}")
+            return "False"
+        return f"_regex(_c{i}, {get})"
+    # Operador desconocido: la condición nunca se cumple
+    return "False"
+
+def _regex(search, var_val):
+    return var_val is not None and search(str(var_val)) is not None
+
+def compile_conditions(conditions, logical_operator="AND"):
+    """
+    Compila la lista de condiciones en una única función predicate(context) -> bool.
+    Se genera una expresión con 'and' / 'or', así la evaluación se detiene en
+    cuanto conoce el resultado (AND: al primer falso, OR: al primer verdadero).
+    Con otro operador lógico solo cuenta la última condición.
+    """
+    names = {"_num": to_number, "_contains": _contains, "_regex": _regex}
+    parts = [_condition_source(i, cond.get("variable"), cond.get("operator"), cond.get("value"), names)
+             for i, cond in enumerate(conditions)]
+    logical_operator = (logical_operator or "AND").upper()
+    if not parts:
+        source = "False"
+    elif logical_operator in ("AND", "OR"):
+        source = f" {logical_operator.lower()} ".join(f"({part})" for part in parts)
+    else:
+        source = parts[-1]
+    return eval(f"lambda context: bool({source})", names)
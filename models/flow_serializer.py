@@ -0,0 +1,85 @@
+# models/flow_serializer.py
+import json
+from models.node_factory import NodeFactory
+
+class FlowSerializer:
+    """
+    Convierte un flujo (nodos + variables) desde/hacia el formato JSON que
+    guarda la aplicación. No depende de Tkinter, por lo que lo usan tanto el
+    controlador de la GUI como el motor de ejecución sin interfaz.
+    """
+
+    @staticmethod
+    def node_to_dict(node):
+        true_conn = getattr(node, "true_connection", None)
+        false_conn = getattr(node, "false_connection", None)
+        data = {
+            "id": node.id,
+            "x": node.x,
+            "y": node.y,
+            "node_type": node.node_type,
+            "text": node.text,
+            "title": node.title,
+            "config": node.config,
+            # Para conexiones, almacenamos el id del nodo conectado (si existe)
+            "connected_to": node.connected_to.id if node.connected_to else None,
+            # Para nodos condicionales (si aplicable)
+            "true_connection": true_conn.id if true_conn else None,
+            "false_connection": false_conn.id if false_conn else None
+        }
+        # Para nodos paralelos: el id del primer nodo de cada rama
+        if hasattr(node, "branches"):
+            data["branches"] = [target.id for target in node.branches]
+        return data
+
+    @staticmethod
+    def to_dict(nodes, variables):
+        return {
+            "nodes": [FlowSerializer.node_to_dict(node) for node in nodes],
+            "variables": [{"name": var.name, "var_type": var.var_type, "value": var.value} for var in variables]
+        }
+
+    @staticmethod
+    def nodes_from_dict(flow_data):
+        """
+        Crea los nodos usando la factoría y restablece sus conexiones.
+        Retorna un diccionario node.id -> nodo (en el orden del archivo).
+        """
+        nodes = {}
+        for nd in flow_data.get("nodes", []):
+            node = NodeFactory.create_node(nd["node_type"], nd["x"], nd["y"])
+            node.id = nd["id"]  # Restaurar el id original
+            node.text = nd["text"]
+            node.title = nd.get("title", "")
+            node.config = nd.get("config", {})
+            nodes[node.id] = node
+
+        # Establecer conexiones lógicas
+        for nd in flow_data.get("nodes", []):
+            node = nodes[nd["id"]]
+            if nd.get("connected_to"):
+                target = nodes.get(nd["connected_to"])
+                if target:
+                    node.connected_to = target
+            if node.node_type == "condicional":
+                if nd.get("true_connection"):
+                    target = nodes.get(nd["true_connection"])
+                    if target:
+                        node.true_connection = target
+                if nd.get("false_connection"):
+                    target = nodes.get(nd["false_connection"])
+                    if target:
+                        node.false_connection = target
+            if node.node_type == "paralelo":
+                node.branches = [nodes[target_id] for target_id in nd.get("branches", []) if target_id in nodes]
+        return nodes
+
+    @staticmethod
+    def load(file_path):
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def save(flow_data, file_path):
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(flow_data, f, indent=4)
@@ -1,12 +1,12 @@
 # models/inicio_node.py
-from models.nodes import FlowNode
-from tkinter import Toplevel, ttk
+from models.nodes import FlowNode, SLOT_NEXT
 
 class InicioNode(FlowNode):
     def __init__(self, x, y):
         super().__init__(x, y, "inicio", "Inicio", "Inicio")
     
     def configure(self, parent, variable_manager):
+        from tkinter import Toplevel, ttk
         dialog = Toplevel(parent)
         dialog.update_idletasks()
         dialog.grab_set()
@@ -31,6 +31,16 @@ class InicioNode(FlowNode):
         btn_cancel.grid(row=1, column=1, padx=10, pady=10)
         dialog.wait_window(dialog)
 
+    def compile(self):
+        # El nodo de inicio simplemente pasa al siguiente nodo
+        def step(context):
+            return SLOT_NEXT
+        return step
+
+    def compile_batch(self):
+        def step_batch(contexts):
+            return [SLOT_NEXT] * len(contexts)
+        return step_batch
+
     def execute(self, context):
-        # El nodo de inicio simplemente retorna el siguiente nodo
-        return self.connected_to
+        return self.successor(self.compile()(context))
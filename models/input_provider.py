@@ -0,0 +1,45 @@
+# models/input_provider.py
+class InputProvider:
+    """
+    Fuente de respuestas para los nodos que necesitan datos del usuario
+    (Acción "pregunta", Múltiples Respuestas y parámetros faltantes de Python).
+    """
+    def ask(self, title, prompt, variable=None, options=None):
+        raise NotImplementedError("Debe implementarse en la subclase.")
+
+
+class TkInputProvider(InputProvider):
+    """Muestra un simpledialog sobre la ventana 'root' (comportamiento de la GUI)."""
+    def __init__(self, root=None):
+        self.root = root
+
+    def ask(self, title, prompt, variable=None, options=None):
+        from tkinter import simpledialog
+        return simpledialog.askstring(title, prompt, parent=self.root)
+
+
+class ConsoleInputProvider(InputProvider):
+    """Pregunta por la entrada estándar (útil al ejecutar flujos desde la terminal)."""
+    def ask(self, title, prompt, variable=None, options=None):
+        return input(f"{prompt} ")
+
+
+class StaticInputProvider(InputProvider):
+    """
+    Responde a partir de un diccionario {variable: valor}. Pensado para
+    ejecuciones sin interfaz: nunca bloquea esperando al usuario.
+    """
+    def __init__(self, answers=None, default=None):
+        self.answers = answers or {}
+        self.default = default
+
+    def ask(self, title, prompt, variable=None, options=None):
+        return self.answers.get(variable, self.default)
+
+
+def get_input_provider(context):
+    # Si el contexto no trae un proveedor explícito se usa el diálogo de Tk
+    provider = context.get("input_provider")
+    if provider is None:
+        provider = TkInputProvider(context.get("root"))
+    return provider
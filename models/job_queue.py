@@ -0,0 +1,330 @@
+# models/job_queue.py
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+JOB_STATUSES = ("pendiente", "en_curso", "terminado", "fallido")
+
+class LeaseLostError(Exception):
+    """La reserva del trabajo venció y otro proceso lo volvió a tomar: este intento no debe registrarse."""
+
+class CronSchedule:
+    """
+    Expresión cron de cinco campos: minuto, hora, día del mes, mes y día de la
+    semana (0 o 7 = domingo), en hora local. Cada campo acepta "*", valores,
+    rangos "a-b", listas "a,b" y pasos "*/n" o "a-b/n". También se aceptan
+    @hourly, @daily, @weekly y @monthly. Como en cron (Vixie), si ni el día del
+    mes ni el de la semana empiezan con "*", basta con que coincida uno de los
+    dos; si alguno empieza con "*" (p. ej. "*/2"), tienen que coincidir ambos.
+    """
+    ALIASES = {"@hourly": "0 * * * *", "@daily": "0 0 * * *", "@weekly": "0 0 * * 0", "@monthly": "0 0 1 * *"}
+    FIELDS = (("minuto", 0, 59), ("hora", 0, 23), ("día", 1, 31), ("mes", 1, 12), ("día de la semana", 0, 7))
+
+    def __init__(self, expression):
+        self.expression = expression
+        parts = self.ALIASES.get(expression.strip(), expression).split()
+        if len(parts) != 5:
+            raise ValueError(f"Expresión cron inválida '{expression}': se esperan 5 campos")
+        fields = [self._parse_field(part, *spec) for part, spec in zip(parts, self.FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = parts[2].startswith("*")
+        self.any_weekday = parts[4].startswith("*")
+
+    @staticmethod
+    def _parse_field(text, name, low, high):
+        values = set()
+        for item in text.split(","):
+            step = 1
+            if "/" in item:
+                item, step_text = item.split("/", 1)
+                step = int(step_text) if step_text.isdigit() else 0
+            if item == "*":
+                start, end = low, high
+            elif "-" in item:
+                start, end = (int(v) if v.isdigit() else -1 for v in item.split("-", 1))
+            elif item.isdigit():
+                start = end = int(item)
+                if step != 1:
+                    end = high
+            else:
+                start, end = -1, -1
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"Campo {name} inválido en la expresión cron: '{text}'")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        in_days = moment.day in self.days
+        # datetime.weekday() es 0 = lunes; en cron 0 = domingo
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, timestamp):
+        """Retorna el primer momento (timestamp) posterior a 'timestamp' que cumple la expresión."""
+        moment = datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ValueError(f"La expresión cron '{self.expression}' no se cumple nunca")
+
+
+class JobQueue:
+    """
+    Cola persistente de ejecuciones de flujos en una base SQLite (WAL), que
+    pueden compartir varios procesos. Cada trabajo indica el flujo (por nombre,
+    ver FlowRegistry), el contexto inicial, una prioridad (mayor = antes) y el
+    momento a partir del cual puede ejecutarse.
+    claim() entrega el siguiente trabajo listo y lo reserva por 'lease' segundos
+    con un token propio; mientras el flujo se ejecuta, extend() renueva la
+    reserva. Si el proceso que lo tomó muere sin terminarlo, al vencer la
+    reserva otro lo vuelve a tomar con otro token, y complete() o fail() con
+    el token anterior lanzan LeaseLostError. fail() lo reprograma con espera exponencial (backoff * 2^(intento-1))
+    hasta agotar sus intentos.
+    Las programaciones recurrentes (add_schedule) encolan un trabajo cada vez
+    que se cumple su expresión cron (ver enqueue_due); si el programa estuvo
+    detenido, las ocurrencias perdidas se encolan una sola vez.
+    """
+    def __init__(self, db_path="trabajos.db", lease=300.0, backoff=5.0, max_backoff=3600.0):
+        self.db_path = db_path
+        self.lease = lease
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_conn=None, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            # Sin transacciones implícitas: cada operación abre la suya con BEGIN IMMEDIATE
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, flow TEXT NOT NULL, context TEXT NOT NULL, "
+                "priority INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL, run_at REAL NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+                "created REAL NOT NULL, updated REAL NOT NULL, schedule TEXT, error TEXT, result TEXT, token TEXT)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "token" not in columns:
+                # Colas creadas antes de que las reservas tuvieran token
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN token TEXT")
+            # Con este índice el siguiente trabajo pendiente se encuentra sin ordenar la cola
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, run_at)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS schedules ("
+                "name TEXT PRIMARY KEY, flow TEXT NOT NULL, cron TEXT NOT NULL, context TEXT NOT NULL, "
+                "priority INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, next_run REAL NOT NULL)"
+            )
+        return self._conn
+
+    def _transaction(self, work):
+        # BEGIN IMMEDIATE toma el lock de escritura al empezar: dos procesos no pueden reservar el mismo trabajo
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, flow, context=None, priority=0, run_at=None, max_attempts=3, schedule=None):
+        """Agrega un trabajo y retorna su id. 'run_at' (timestamp) lo difiere hasta ese momento."""
+        return self.enqueue_many(flow, [context], priority, run_at, max_attempts, schedule)[0]
+
+    def enqueue_many(self, flow, contexts, priority=0, run_at=None, max_attempts=3, schedule=None):
+        """Agrega un trabajo por contexto en una sola transacción. Retorna sus ids."""
+        now = time.time()
+        rows = [(flow, json.dumps(context or {}, ensure_ascii=False, default=str), priority, "pendiente",
+                 run_at or now, max(max_attempts, 1), now, now, schedule) for context in contexts]
+
+        def insert(conn):
+            ids = []
+            for row in rows:
+                cursor = conn.execute("INSERT INTO jobs (flow, context, priority, status, run_at, max_attempts, "
+                                      "created, updated, schedule) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+                ids.append(cursor.lastrowid)
+            return ids
+        return self._transaction(insert)
+
+    def claim(self):
+        """
+        Reserva el siguiente trabajo listo (mayor prioridad y luego el más antiguo)
+        y lo retorna como diccionario, o None si no hay ninguno. Su "token"
+        identifica la reserva en extend(), complete() y fail().
+        """
+        def take(conn):
+            now = time.time()
+            while True:
+                # Primero los trabajos en curso cuya reserva venció (son de un proceso que murió)
+                row = conn.execute(
+                    "SELECT id, flow, context, priority, attempts, max_attempts, status, schedule FROM jobs "
+                    "WHERE status = 'en_curso' AND run_at <= ? ORDER BY run_at LIMIT 1", (now,)).fetchone()
+                if row is None:
+                    row = conn.execute(
+                        "SELECT id, flow, context, priority, attempts, max_attempts, status, schedule FROM jobs "
+                        "WHERE status = 'pendiente' AND run_at <= ? ORDER BY priority DESC, run_at LIMIT 1",
+                        (now,)).fetchone()
+                if row is None:
+                    return None
+                if row[6] == "en_curso" and row[4] >= row[5]:
+                    conn.execute("UPDATE jobs SET status = 'fallido', error = ?, updated = ? WHERE id = ?",
+                                 ("Reserva vencida sin terminar (intentos agotados)", now, row[0]))
+                    continue
+                token = uuid.uuid4().hex
+                conn.execute("UPDATE jobs SET status = 'en_curso', attempts = attempts + 1, run_at = ?, "
+                             "updated = ?, token = ? WHERE id = ?", (now + self.lease, now, token, row[0]))
+                return {"id": row[0], "flow": row[1], "context": json.loads(row[2]), "priority": row[3],
+                        "attempt": row[4] + 1, "max_attempts": row[5], "schedule": row[7], "token": token}
+        return self._transaction(take)
+
+    def extend(self, job_id, token):
+        """Renueva por 'lease' segundos la reserva del trabajo. Retorna False si ya no es de este token."""
+        now = time.time()
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET run_at = ?, updated = ? WHERE id = ? AND token = ? AND status = 'en_curso'",
+            (now + self.lease, now, job_id, token)).rowcount) > 0
+
+    def complete(self, job_id, token, result=None):
+        """Marca el trabajo como terminado y guarda su contexto final (LeaseLostError si perdió la reserva)."""
+        now = time.time()
+        value = json.dumps(result, ensure_ascii=False, default=str) if result is not None else None
+        updated = self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = 'terminado', result = ?, error = NULL, updated = ? "
+            "WHERE id = ? AND token = ? AND status = 'en_curso'", (value, now, job_id, token)).rowcount)
+        if not updated:
+            raise LeaseLostError(f"El trabajo {job_id} ya no está reservado por este proceso")
+
+    def fail(self, job_id, token, error, retry=True):
+        """
+        Registra el error del intento. Si quedan intentos (y 'retry'), el trabajo
+        vuelve a quedar pendiente tras la espera exponencial; si no, queda fallido.
+        Retorna el momento del próximo intento o None (LeaseLostError si perdió la reserva).
+        """
+        def update(conn):
+            now = time.time()
+            row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND token = ? "
+                               "AND status = 'en_curso'", (job_id, token)).fetchone()
+            if row is None:
+                raise LeaseLostError(f"El trabajo {job_id} ya no está reservado por este proceso")
+            attempts, max_attempts = row
+            if retry and attempts < max_attempts:
+                run_at = now + min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+                conn.execute("UPDATE jobs SET status = 'pendiente', run_at = ?, error = ?, updated = ? WHERE id = ?",
+                             (run_at, error, now, job_id))
+                return run_at
+            conn.execute("UPDATE jobs SET status = 'fallido', error = ?, updated = ? WHERE id = ?",
+                         (error, now, job_id))
+            return None
+        return self._transaction(update)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT id, flow, context, priority, status, run_at, attempts, max_attempts, created, updated, "
+                "schedule, error, result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "flow", "context", "priority", "status", "run_at", "attempts", "max_attempts", "created",
+                "updated", "schedule", "error", "result")
+        job = dict(zip(keys, row))
+        job["context"] = json.loads(job["context"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def counts(self):
+        """Cantidad de trabajos por estado."""
+        with self._lock:
+            rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+    def next_ready_at(self):
+        """Momento en que estará listo el próximo trabajo pendiente o en curso (None si no hay)."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT MIN(run_at) FROM jobs WHERE status IN ('pendiente', 'en_curso')").fetchone()
+        return row[0]
+
+    def purge(self, older_than=0.0):
+        """Borra los trabajos terminados hace más de 'older_than' segundos. Retorna cuántos borró."""
+        limit = time.time() - older_than
+        return self._transaction(lambda conn: conn.execute(
+            "DELETE FROM jobs WHERE status = 'terminado' AND updated <= ?", (limit,)).rowcount)
+
+    # Programaciones recurrentes
+
+    def add_schedule(self, name, flow, cron, context=None, priority=0, max_attempts=3):
+        """Crea o reemplaza la programación 'name': encola 'flow' cada vez que se cumple 'cron'."""
+        next_run = CronSchedule(cron).next_after(time.time())
+        row = (name, flow, cron, json.dumps(context or {}, ensure_ascii=False, default=str), priority,
+               max(max_attempts, 1), next_run)
+        self._transaction(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO schedules (name, flow, cron, context, priority, max_attempts, next_run) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", row))
+        return next_run
+
+    def remove_schedule(self, name):
+        return self._transaction(lambda conn: conn.execute("DELETE FROM schedules WHERE name = ?",
+                                                           (name,)).rowcount) > 0
+
+    def schedules(self):
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT name, flow, cron, context, priority, max_attempts, next_run FROM schedules "
+                "ORDER BY next_run").fetchall()
+        return [{"name": r[0], "flow": r[1], "cron": r[2], "context": json.loads(r[3]), "priority": r[4],
+                 "max_attempts": r[5], "next_run": r[6]} for r in rows]
+
+    def enqueue_due(self, now=None):
+        """Encola un trabajo por cada programación vencida y calcula su próxima ejecución. Retorna los ids."""
+        now = now or time.time()
+
+        def enqueue(conn):
+            ids = []
+            due = conn.execute("SELECT name, flow, cron, context, priority, max_attempts FROM schedules "
+                               "WHERE next_run <= ?", (now,)).fetchall()
+            for name, flow, cron, context, priority, max_attempts in due:
+                cursor = conn.execute(
+                    "INSERT INTO jobs (flow, context, priority, status, run_at, max_attempts, created, updated, "
+                    "schedule) VALUES (?, ?, ?, 'pendiente', ?, ?, ?, ?, ?)",
+                    (flow, context, priority, now, max_attempts, now, now, name))
+                ids.append(cursor.lastrowid)
+                conn.execute("UPDATE schedules SET next_run = ? WHERE name = ?",
+                             (CronSchedule(cron).next_after(now), name))
+            return ids
+        return self._transaction(enqueue)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,140 @@
+# models/llm_cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class LLMResponseCache:
+    """
+    Caché de respuestas del LLM direccionada por contenido: la clave es un hash
+    del modelo y del mensaje ya resuelto (personalidad, instrucciones, contexto
+    y prompt). Tiene dos niveles:
+    - Memoria: LRU con un máximo de 'max_entries' entradas.
+    - Disco (opcional): SQLite en 'db_path', compartible entre procesos, con un
+      máximo de 'max_disk_entries' filas.
+    'ttl' (segundos) aplica a ambos niveles. Se puede compartir entre hilos.
+    """
+    EVICT_EVERY = 100  # Cada cuántas escrituras se recorta la tabla en disco
+
+    def __init__(self, max_entries=1024, ttl=None, db_path=None, max_disk_entries=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._memory = OrderedDict()   # clave -> (respuesta, expira_en)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._puts = 0
+
+    # Los procesos del pool reciben una copia sin conexión ni lock (se recrean al usarse)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_memory"] = OrderedDict()
+        state["_lock"] = None
+        state["_conn"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, message):
+        payload = json.dumps({"model": model, "message": message}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, answer TEXT NOT NULL, created REAL NOT NULL, expires REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created)")
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key, answer, expires):
+        self._memory[key] = (answer, expires)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, model, message):
+        key = self.make_key(model, message)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                answer, expires = entry
+                if expires is None or expires > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return answer
+                del self._memory[key]
+            if self.db_path:
+                row = self._connection().execute(
+                    "SELECT answer, expires FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and (row[1] is None or row[1] > now):
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, model, message, answer):
+        if answer is None:
+            return
+        key = self.make_key(model, message)
+        now = time.time()
+        expires = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._remember(key, answer, expires)
+            if self.db_path:
+                conn = self._connection()
+                conn.execute("INSERT OR REPLACE INTO llm_cache (key, answer, created, expires) VALUES (?, ?, ?, ?)",
+                             (key, answer, now, expires))
+                self._puts += 1
+                if self._puts % self.EVICT_EVERY == 0:
+                    self._evict_disk(conn, now)
+                conn.commit()
+
+    def _evict_disk(self, conn, now):
+        conn.execute("DELETE FROM llm_cache WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        if self.max_disk_entries:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,))
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.db_path:
+                conn = self._connection()
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+
+    @property
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
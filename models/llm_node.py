@@ -1,8 +1,21 @@
 # models/llm_node.py
-from models.nodes import FlowNode
-from tkinter import Toplevel, ttk
-import re
-from models.ollama_client import OllamaClient
+import time
+from models.nodes import FlowNode, SLOT_NEXT
+from models.template import compile_template, render
+from models.ollama_client import default_registry
+from models.llm_stream import consume_stream, consume_stream_async, publish_cached
+
+def record_llm_metrics(metrics, model, cached, started=None, usage=None):
+    """Métricas de una respuesta del LLM: caché, duración de la llamada y tokens (ver MetricsRegistry)."""
+    if cached is not None:
+        metrics.inc("flow_llm_cache_total", (("result", "hit" if cached else "miss"),))
+    if started is None:
+        return
+    labels = (("model", model),)
+    metrics.observe("flow_llm_request_duration_ms", (time.perf_counter() - started) * 1000, labels)
+    if usage:
+        metrics.inc("flow_llm_tokens_total", labels + (("kind", "prompt"),), usage["prompt"])
+        metrics.inc("flow_llm_tokens_total", labels + (("kind", "completion"),), usage["completion"])
 
 class LLMNode(FlowNode):
     def __init__(self, x, y):
@@ -13,8 +26,10 @@ class LLMNode(FlowNode):
         self.config["context"] = {"type": "free", "value": ""}
         self.config["prompt"] = {"type": "free", "value": ""}
         self.config["variable_name"] = ""
+        self.config["memo"] = False      # Reutilizar la respuesta anterior para el mismo prompt
 
     def configure(self, parent, variable_manager):
+        from tkinter import BooleanVar, Toplevel, ttk
         dialog = Toplevel(parent)
         dialog.update_idletasks()
         dialog.grab_set()
@@ -64,6 +79,10 @@ class LLMNode(FlowNode):
         entry_var.grid(row=6, column=1, padx=10, pady=5, sticky="w")
         entry_var.insert(0, self.config.get("variable_name", ""))
 
+        memo_var = BooleanVar(value=self.config.get("memo", False))
+        chk_memo = ttk.Checkbutton(dialog, text="Reutilizar la respuesta si el prompt no cambia", variable=memo_var)
+        chk_memo.grid(row=7, column=1, padx=10, pady=5, sticky="w")
+
         def on_ok():
             self.title = entry_title.get().strip()
             self.config["model"]["value"] = entry_model.get().strip()
@@ -72,38 +91,146 @@ class LLMNode(FlowNode):
             self.config["context"]["value"] = entry_context.get().strip()
             self.config["prompt"]["value"] = entry_prompt.get().strip()
             self.config["variable_name"] = entry_var.get().strip()
+            self.config["memo"] = memo_var.get()
             self.text = f"LLM: {self.config.get('variable_name', '')}" or "LLM"
             dialog.destroy()
 
         btn_ok = ttk.Button(dialog, text="OK", command=on_ok)
-        btn_ok.grid(row=7, column=0, padx=10, pady=10)
+        btn_ok.grid(row=8, column=0, padx=10, pady=10)
         btn_cancel = ttk.Button(dialog, text="Cancelar", command=dialog.destroy)
-        btn_cancel.grid(row=7, column=1, padx=10, pady=10)
+        btn_cancel.grid(row=8, column=1, padx=10, pady=10)
         dialog.wait_window(dialog)
 
-    def execute(self, context):
-        def resolve_field(cfg):
+    def _compile_message(self):
+        """
+        Pre-procesa la configuración y retorna build(context) -> (modelo, mensaje),
+        compartido por la ejecución síncrona y la asíncrona.
+        """
+        def field_resolver(cfg):
+            # Los campos libres se resuelven ahora; los de tipo variable se leen del contexto en cada ejecución
             if cfg.get("type") == "variable":
-                return context.get(cfg.get("value"), "")
+                var = cfg.get("value")
+                return lambda context: context.get(var, "")
+            value = cfg.get("value", "")
+            return lambda context: value
+        default = {"type": "free", "value": ""}
+        model = field_resolver(self.config.get("model", default))
+        personality = field_resolver(self.config.get("personality", default))
+        instructions = field_resolver(self.config.get("instructions", default))
+        context_str = field_resolver(self.config.get("context", default))
+        prompt_cfg = self.config.get("prompt", default)
+        # Si el prompt es texto libre se analiza una sola vez; si viene de una variable, al ejecutar
+        if prompt_cfg.get("type") == "variable":
+            prompt_var = prompt_cfg.get("value")
+            prompt_text = lambda context: render(str(context.get(prompt_var, "")), context)
+        else:
+            prompt_text = compile_template(prompt_cfg.get("value", "")).render
+
+        def build(context):
+            prompt = prompt_text(context)
+            message = {
+                "personality": personality(context),
+                "instructions": instructions(context),
+                "context": context_str(context),
+                "prompt": prompt
+            }
+            return model(context), message
+        return build
+
+    def memo_signature(self):
+        # Las respuestas del modelo varían entre llamadas: solo se memoizan si el usuario lo indicó
+        if not self.config.get("memo", False):
+            return None
+        reads = []
+        default = {"type": "free", "value": ""}
+        for field in ("model", "personality", "instructions", "context"):
+            cfg = self.config.get(field, default)
+            if cfg.get("type") == "variable":
+                reads.append(cfg.get("value"))
+        prompt_cfg = self.config.get("prompt", default)
+        if prompt_cfg.get("type") == "variable":
+            # El prompt es una plantilla que se conoce recién al ejecutar: no se sabe qué variables usa
+            return None
+        # Las variables "usuario.nombre" se leen del diccionario "usuario"
+        reads.extend(name.split(".")[0] for name in compile_template(prompt_cfg.get("value", "")).variables)
+        return tuple(dict.fromkeys(reads)), (self.config.get("variable_name", "respuesta"),)
+
+    def compile(self):
+        build = self._compile_message()
+        var_name = self.config.get("variable_name", "respuesta")
+        node_id = self.id
+
+        def step(context):
+            model, message = build(context)
+            cache = context.get("llm_cache")
+            listener = context.get("llm_stream")
+            metrics = context.get("metrics")
+            answer = cache.get(model, message) if cache is not None else None
+            if answer is None:
+                # Un cliente de larga vida por modelo y host (conexiones keep-alive reutilizadas)
+                client = (context.get("llm_clients") or default_registry).get(model)
+                usage = {} if metrics is not None else None
+                started = time.perf_counter()
+                if listener is not None:
+                    answer = consume_stream(client.chat_stream(message, usage), listener, node_id, var_name)
+                else:
+                    answer = client.chat(message, usage)
+                if cache is not None:
+                    cache.put(model, message, answer)
+                if metrics is not None:
+                    record_llm_metrics(metrics, model, False if cache is not None else None, started, usage)
             else:
-                return cfg.get("value", "")
-        model = resolve_field(self.config.get("model", {"type": "free", "value": ""}))
-        personality = resolve_field(self.config.get("personality", {"type": "free", "value": ""}))
-        instructions = resolve_field(self.config.get("instructions", {"type": "free", "value": ""}))
-        context_str = resolve_field(self.config.get("context", {"type": "free", "value": ""}))
-        prompt = resolve_field(self.config.get("prompt", {"type": "free", "value": ""}))
-        possibles = re.findall(r'\$\{([^}]+)\}', prompt)
-        for var in possibles:
-            prompt = prompt.replace(f"${{{var}}}", str(context.get(var, "")))
-        message = {
-            "personality": personality,
-            "instructions": instructions,
-            "context": context_str,
-            "prompt": prompt
-        }
-        client = OllamaClient(model)
-        answer = client.chat(message)
+                if metrics is not None:
+                    record_llm_metrics(metrics, model, True)
+                if listener is not None:
+                    # Respuesta en caché: se publica completa como un único fragmento
+                    publish_cached(listener, node_id, var_name, answer)
+            context[var_name] = answer
+            print(f"LLM: {message['prompt']} | Respuesta: {answer}")
+            return SLOT_NEXT
+        return step
+
+    def compile_async(self, runtime):
+        build = self._compile_message()
         var_name = self.config.get("variable_name", "respuesta")
-        context[var_name] = answer
-        print(f"LLM: {prompt} | Respuesta: {answer}")
-        return self.connected_to
+        node_id = self.id
+
+        async def step(context):
+            model, message = build(context)
+            cache = context.get("llm_cache")
+            listener = context.get("llm_stream")
+            metrics = context.get("metrics")
+            answer = cache.get(model, message) if cache is not None else None
+            if answer is None:
+                # Un cliente de larga vida por modelo y host (conexiones keep-alive reutilizadas)
+                client = (context.get("llm_clients") or default_registry).get(model)
+                dispatcher = runtime.llm_dispatcher
+                usage = {} if metrics is not None else None
+                started = time.perf_counter()
+                if dispatcher is not None and listener is None:
+                    # En lotes: el prompt espera junto a los de otras ejecuciones de este nodo (sin tokens)
+                    answer = await dispatcher.submit(node_id, client, message, usage)
+                else:
+                    # El semáforo del runtime limita las llamadas simultáneas al LLM
+                    async with runtime.llm_semaphore:
+                        if listener is not None:
+                            answer = await consume_stream_async(client.chat_stream_async(message, usage), listener,
+                                                                node_id, var_name)
+                        else:
+                            answer = await client.chat_async(message, usage)
+                if cache is not None:
+                    cache.put(model, message, answer)
+                if metrics is not None:
+                    record_llm_metrics(metrics, model, False if cache is not None else None, started, usage)
+            else:
+                if metrics is not None:
+                    record_llm_metrics(metrics, model, True)
+                if listener is not None:
+                    publish_cached(listener, node_id, var_name, answer)
+            context[var_name] = answer
+            print(f"LLM: {message['prompt']} | Respuesta: {answer}")
+            return SLOT_NEXT
+        return step
+
+    def execute(self, context):
+        return self.successor(self.compile()(context))
@@ -0,0 +1,164 @@
+# models/llm_stream.py
+import sys
+import threading
+import time
+from collections import deque
+
+class LLMStreamListener:
+    """
+    Recibe la salida parcial de los nodos LLM mientras se genera. Si el
+    contexto trae un listener en "llm_stream", el nodo LLM pide la respuesta
+    en modo streaming y publica cada fragmento con on_token().
+    También registra el tiempo hasta el primer token (TTFT) de cada llamada.
+    """
+    def __init__(self, max_samples=1000):
+        self.ttft_samples = deque(maxlen=max_samples)  # milisegundos
+        self._lock = threading.Lock()
+
+    # Los procesos del pool reciben una copia sin lock ni muestras
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        state["ttft_samples"] = deque(maxlen=self.ttft_samples.maxlen)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def on_start(self, node_id, var_name):
+        pass
+
+    def on_token(self, node_id, var_name, token):
+        pass
+
+    def on_end(self, node_id, var_name, answer, ttft_ms, total_ms):
+        pass
+
+    def record_ttft(self, ttft_ms):
+        with self._lock:
+            self.ttft_samples.append(ttft_ms)
+
+    def ttft_summary(self):
+        with self._lock:
+            samples = sorted(self.ttft_samples)
+        if not samples:
+            return {"count": 0}
+        return {
+            "count": len(samples),
+            "avg_ms": sum(samples) / len(samples),
+            "p50_ms": samples[len(samples) // 2],
+            "max_ms": samples[-1],
+        }
+
+
+class PrintStreamListener(LLMStreamListener):
+    """Muestra los tokens a medida que llegan (por defecto en stderr)."""
+    def __init__(self, stream=None, max_samples=1000):
+        super().__init__(max_samples)
+        self.stream = stream  # None = sys.stderr (se resuelve al escribir, así el listener se puede copiar a otros procesos)
+
+    def _write(self, text):
+        stream = self.stream or sys.stderr
+        stream.write(text)
+        stream.flush()
+
+    def on_start(self, node_id, var_name):
+        self._write(f"LLM [{var_name}]: ")
+
+    def on_token(self, node_id, var_name, token):
+        self._write(token)
+
+    def on_end(self, node_id, var_name, answer, ttft_ms, total_ms):
+        self._write(f"\n(primer token: {ttft_ms:.0f} ms, total: {total_ms:.0f} ms)\n")
+
+
+class AsyncTokenStream(LLMStreamListener):
+    """
+    Expone la salida parcial como iterador asíncrono de eventos
+    (tipo, node_id, var_name, dato), con tipo "start", "token" o "end".
+    Debe crearse dentro del event loop que la consume; puede recibir eventos
+    desde cualquier hilo. Llamar a close() para terminar la iteración.
+    """
+    _DONE = object()
+
+    def __init__(self, loop=None, max_samples=1000):
+        # asyncio se importa aquí: solo se usa dentro de un event loop y el motor síncrono no lo carga
+        import asyncio
+        super().__init__(max_samples)
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def _publish(self, event):
+        import asyncio
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.queue.put_nowait(event)
+        else:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+    def on_start(self, node_id, var_name):
+        self._publish(("start", node_id, var_name, None))
+
+    def on_token(self, node_id, var_name, token):
+        self._publish(("token", node_id, var_name, token))
+
+    def on_end(self, node_id, var_name, answer, ttft_ms, total_ms):
+        self._publish(("end", node_id, var_name, answer))
+
+    def close(self):
+        self._publish(self._DONE)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self.queue.get()
+        if event is self._DONE:
+            raise StopAsyncIteration
+        return event
+
+
+def _emit(listener, node_id, var_name, t0, first, token):
+    if first is None:
+        first = time.perf_counter()
+        listener.record_ttft((first - t0) * 1000)
+    listener.on_token(node_id, var_name, token)
+    return first
+
+def consume_stream(tokens, listener, node_id, var_name):
+    """Publica cada token de un generador en el listener y retorna la respuesta completa."""
+    t0 = time.perf_counter()
+    first = None
+    parts = []
+    listener.on_start(node_id, var_name)
+    for token in tokens:
+        first = _emit(listener, node_id, var_name, t0, first, token)
+        parts.append(token)
+    end = time.perf_counter()
+    answer = "".join(parts)
+    listener.on_end(node_id, var_name, answer, ((first or end) - t0) * 1000, (end - t0) * 1000)
+    return answer
+
+async def consume_stream_async(tokens, listener, node_id, var_name):
+    """Igual que consume_stream() para un generador asíncrono."""
+    t0 = time.perf_counter()
+    first = None
+    parts = []
+    listener.on_start(node_id, var_name)
+    async for token in tokens:
+        first = _emit(listener, node_id, var_name, t0, first, token)
+        parts.append(token)
+    end = time.perf_counter()
+    answer = "".join(parts)
+    listener.on_end(node_id, var_name, answer, ((first or end) - t0) * 1000, (end - t0) * 1000)
+    return answer
+
+def publish_cached(listener, node_id, var_name, answer):
+    """Publica una respuesta que no pasó por el modelo (caché) sin contarla en el TTFT."""
+    listener.on_start(node_id, var_name)
+    listener.on_token(node_id, var_name, answer)
+    listener.on_end(node_id, var_name, answer, 0.0, 0.0)
@@ -1,8 +1,10 @@
 # models/multiples_node.py
-from models.nodes import FlowNode
-from tkinter import Toplevel, ttk, simpledialog
+from models.nodes import FlowNode, SLOT_NEXT
+from models.input_provider import get_input_provider
 
 class MultiplesNode(FlowNode):
+    blocking = True
+
     def __init__(self, x, y):
         super().__init__(x, y, "multiples", "Múltiples Respuestas", "Pregunta Múltiple")
         self.config["question"] = ""
@@ -10,6 +12,7 @@ class MultiplesNode(FlowNode):
         self.config["variable_name"] = ""
 
     def configure(self, parent, variable_manager):
+        from tkinter import Toplevel, ttk
         dialog = Toplevel(parent)
         dialog.update_idletasks()
         dialog.grab_set()
@@ -56,12 +59,18 @@ class MultiplesNode(FlowNode):
         btn_cancel.grid(row=4, column=1, padx=10, pady=10)
         dialog.wait_window(dialog)
 
-    def execute(self, context):
+    def compile(self):
         question = self.config.get("question", "Seleccione una opción:")
-        responses = self.config.get("responses", [])
+        responses = list(self.config.get("responses", []))
         var_name = self.config.get("variable_name", "respuesta")
-        root = context.get("root")
-        answer = simpledialog.askstring("Pregunta Múltiple", f"{question}\nOpciones: {', '.join(responses)}", parent=root)
-        print(f"Múltiples: {question} | Respuesta: {answer}")
-        context[var_name] = answer
-        return self.connected_to
+        prompt = f"{question}\nOpciones: {', '.join(responses)}"
+
+        def step(context):
+            answer = get_input_provider(context).ask("Pregunta Múltiple", prompt, variable=var_name, options=responses)
+            print(f"Múltiples: {question} | Respuesta: {answer}")
+            context[var_name] = answer
+            return SLOT_NEXT
+        return step
+
+    def execute(self, context):
+        return self.successor(self.compile()(context))
@@ -6,6 +6,7 @@ from models.multiples_node import MultiplesNode
 from models.llm_node import LLMNode
 from models.python_node import PythonNode
 from models.smtp_node import SmtpNode
+from models.paralelo_node import ParaleloNode, UnionNode
 from models.nodes import DefaultNode
 
 class NodeFactory:
@@ -25,5 +26,9 @@ class NodeFactory:
             return PythonNode(x, y)
         elif node_type == "smtp":
             return SmtpNode(x, y)
+        elif node_type == "paralelo":
+            return ParaleloNode(x, y)
+        elif node_type == "union":
+            return UnionNode(x, y)
         else:
             return DefaultNode(x, y, node_type, f"{node_type.capitalize()} Node")
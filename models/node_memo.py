@@ -0,0 +1,147 @@
+# models/node_memo.py
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+def describe_report(report, nodes):
+    """Texto del context["memo_report"] de una ejecución: cada nodo con "caché" o "calculado"."""
+    return ", ".join(f"{nodes[node_id].text if node_id in nodes else node_id} ({'caché' if hit else 'calculado'})"
+                     for node_id, hit in report)
+
+class NodeMemo:
+    """
+    Memoización por nodo: guarda la salida y las variables escritas por cada
+    nodo determinista (los que implementan FlowNode.memo_signature), con una
+    clave que combina el hash de su tipo y configuración con los valores de
+    las variables que lee. Al volver a ejecutar un flujo en el que se editó un
+    nodo, solo ese nodo y los que dependen de lo que escribe cambian de clave
+    y se recalculan; los anteriores se toman de la memoria.
+    Tiene dos niveles, como LLMResponseCache: LRU en memoria ('max_entries')
+    y, opcionalmente, SQLite en 'db_path' (se conserva entre ejecuciones del
+    programa). Si falta alguna de las variables que el nodo lee, el nodo se
+    ejecuta sin memoización (p. ej. un nodo Python que preguntará el valor).
+    """
+    def __init__(self, max_entries=1024, db_path=None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()   # clave -> pickle de (salida, {variable: valor})
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_memory=OrderedDict(), _lock=None, _conn=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS node_memo (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+            elif self.db_path:
+                row = self._connection().execute("SELECT value FROM node_memo WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = row[0]
+                    self._remember(key, value)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pickle.loads(value)
+
+    def put(self, key, slot, outputs):
+        try:
+            value = pickle.dumps((slot, outputs), pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return  # Valores que no se pueden guardar: el nodo se recalculará la próxima vez
+        with self._lock:
+            self._remember(key, value)
+            if self.db_path:
+                conn = self._connection()
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO node_memo (key, value) VALUES (?, ?)", (key, value))
+
+    def wrap(self, node, step):
+        """
+        Retorna step(context) memoizado si el nodo es determinista, o el mismo
+        'step' si no lo es. Cada ejecución del nodo se anota como (node.id, acierto)
+        en la lista context["memo_report"] (si existe).
+        """
+        signature = node.memo_signature()
+        if signature is None:
+            return step
+        reads, writes = signature
+        node_hash = hashlib.sha256(json.dumps([node.node_type, node.config], sort_keys=True, ensure_ascii=False,
+                                              default=repr).encode("utf-8"))
+        node_id = node.id
+
+        def memo_step(context):
+            values = []
+            for name in reads:
+                value = context.get(name, _MISSING)
+                if value is _MISSING:
+                    return step(context)
+                values.append(value)
+            key_hash = node_hash.copy()
+            key_hash.update(json.dumps(values, sort_keys=True, ensure_ascii=False, default=repr).encode("utf-8"))
+            key = key_hash.hexdigest()
+            entry = self.get(key)
+            hit = entry is not None
+            if hit:
+                slot, outputs = entry
+                context.update(outputs)
+            else:
+                slot = step(context)
+                self.put(key, slot, {name: context.get(name) for name in writes})
+            report = context.get("memo_report")
+            if report is not None:
+                report.append((node_id, hit))
+            metrics = context.get("metrics")
+            if metrics is not None:
+                metrics.inc("flow_node_memo_total", (("result", "hit" if hit else "miss"),))
+            return slot
+        return memo_step
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.db_path:
+                conn = self._connection()
+                with conn:
+                    conn.execute("DELETE FROM node_memo")
+
+    @property
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
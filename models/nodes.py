@@ -1,8 +1,11 @@
 # models/nodes.py
 import uuid
 from abc import ABC, abstractmethod
-import tkinter as tk
-from tkinter import Toplevel, ttk
+
+# Salidas posibles de un nodo compilado (índices en la tabla de sucesores del plan de ejecución)
+SLOT_NEXT = 0
+SLOT_TRUE = 1
+SLOT_FALSE = 2
 
 class FlowNode(ABC):
     def __init__(self, x, y, node_type, text, title=""):
@@ -16,6 +19,9 @@ class FlowNode(ABC):
         self.connected_from = None  # Nodo que conecta a este (entrada)
         self.connected_to = None    # Nodo al que conecta (salida)
 
+    # Indica si execute() puede bloquear (E/S, código de usuario, preguntas al usuario)
+    blocking = False
+
     @abstractmethod
     def execute(self, context):
         """
@@ -25,6 +31,69 @@ class FlowNode(ABC):
         """
         raise NotImplementedError("Debe implementarse en la subclase.")
 
+    def compile(self):
+        """
+        Retorna una función step(context) con la configuración ya resuelta, que
+        ejecuta el nodo y retorna la salida tomada (SLOT_NEXT, SLOT_TRUE,
+        SLOT_FALSE) o None para terminar el flujo.
+        Por defecto envuelve a execute(), para nodos que solo implementan ese método.
+        """
+        def step(context):
+            return self.slot_of(self.execute(context))
+        return step
+
+    def compile_batch(self):
+        """
+        Opcional: retorna step_batch(contexts) -> lista de salidas (una por
+        contexto), para nodos que pueden procesar muchos registros a la vez de
+        forma más eficiente que uno por uno (ver ExecutionPlan.run_batch).
+        Por defecto None: el plan usa step(context) para cada registro.
+        """
+        return None
+
+    def memo_signature(self):
+        """
+        Opcional: para nodos deterministas (el mismo resultado para las mismas
+        variables de entrada) retorna (variables que lee, variables que escribe),
+        y así sus resultados se pueden memoizar (ver NodeMemo). Los nodos que
+        pueden no serlo (LLM, Python) solo lo retornan si el usuario lo indicó
+        con config["memo"].
+        Por defecto None: el nodo siempre se ejecuta.
+        """
+        return None
+
+    def compile_async(self, runtime):
+        """
+        Versión asíncrona de compile(): retorna una corrutina step(context).
+        Los nodos que bloquean (self.blocking) se ejecutan en el pool de hilos
+        del 'runtime' (ver engine/async_runner.py) para no detener el event loop.
+        """
+        step = self.compile()
+        if self.blocking:
+            async def async_step(context):
+                return await runtime.run_blocking(step, context)
+        else:
+            async def async_step(context):
+                return step(context)
+        return async_step
+
+    def successor(self, slot):
+        if slot == SLOT_NEXT:
+            return self.connected_to
+        if slot == SLOT_TRUE:
+            return getattr(self, "true_connection", None)
+        if slot == SLOT_FALSE:
+            return getattr(self, "false_connection", None)
+        return None
+
+    def slot_of(self, node):
+        if node is None:
+            return None
+        for slot in (SLOT_NEXT, SLOT_TRUE, SLOT_FALSE):
+            if self.successor(slot) is node:
+                return slot
+        raise ValueError(f"El nodo {self.id} retornó un nodo que no está conectado a él")
+
     @abstractmethod
     def configure(self, parent, variable_manager):
         """
@@ -49,11 +118,18 @@ class DefaultNode(FlowNode):
     def __init__(self, x, y, node_type, text, title=""):
         super().__init__(x, y, node_type, text, title)
 
+    def compile(self):
+        text = self.text
+        def step(context):
+            print(f"Ejecutando {text}")
+            return SLOT_NEXT
+        return step
+
     def execute(self, context):
-        print(f"Ejecutando {self.text}")
-        return self.connected_to
+        return self.successor(self.compile()(context))
 
     def configure(self, parent, variable_manager):
+        from tkinter import Toplevel, ttk
         dialog = Toplevel(parent)
         dialog.title("Configurar Nodo")
         dialog.transient(parent)
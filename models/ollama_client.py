@@ -1,15 +1,36 @@
 # models/ollama_client.py
-try:
-    from ollama import chat
-    from ollama import ChatResponse
-except ImportError:
-    raise ImportError("La librería oficial de Ollama no está instalada.")
+import threading
+
+_ollama = None
+
+def _load_ollama():
+    # La librería (y httpx/asyncio) se importa con el primer nodo LLM: importarla cuesta decenas de ms
+    # al iniciar y así el resto de la aplicación (y el motor sin interfaz) funciona sin Ollama instalado.
+    global _ollama
+    if _ollama is None:
+        try:
+            import ollama
+        except ImportError:
+            raise ImportError("La librería oficial de Ollama no está instalada.")
+        _ollama = ollama
+    return _ollama
+
+def _record_usage(usage, response):
+    # Tokens que informa Ollama en la respuesta (o en el último fragmento del streaming)
+    if usage is not None:
+        usage["prompt"] = response.get("prompt_eval_count") or 0
+        usage["completion"] = response.get("eval_count") or 0
 
 class OllamaClient:
-    def __init__(self, model):
+    def __init__(self, model, host=None, registry=None):
+        _load_ollama()
         self.model = model
+        self.host = host
+        # Si hay registro, las conexiones HTTP se reutilizan entre llamadas; si no, se usa el cliente del módulo
+        self.registry = registry
 
-    def chat(self, message):
+    @staticmethod
+    def build_messages(message):
         messages = [
             {'role': 'system', 'content': message["personality"]},
             {'role': 'system', 'content': message["instructions"]},
@@ -17,5 +38,126 @@ class OllamaClient:
         if message["context"]:
             messages.append({'role': 'system', 'content': message["context"]})
         messages.append({'role': 'user', 'content': message["prompt"]})
-        response: ChatResponse = chat(model=self.model, messages=messages)
-        return response['message']['content']
\ No newline at end of file
+        return messages
+
+    # Con 'usage' (un diccionario), se completan en él los tokens de entrada ("prompt") y generados ("completion")
+    def chat(self, message, usage=None):
+        chat_fn = self.registry.http_client(self.host).chat if self.registry is not None else _ollama.chat
+        response = chat_fn(model=self.model, messages=self.build_messages(message))
+        _record_usage(usage, response)
+        return response['message']['content']
+
+    async def chat_async(self, message, usage=None):
+        if self.registry is not None:
+            client = self.registry.async_http_client(self.host)
+        else:
+            client = _ollama.AsyncClient(host=self.host)
+        response = await client.chat(model=self.model, messages=self.build_messages(message))
+        _record_usage(usage, response)
+        return response['message']['content']
+
+    def chat_stream(self, message, usage=None):
+        """Generador con los fragmentos de la respuesta a medida que el modelo los produce."""
+        chat_fn = self.registry.http_client(self.host).chat if self.registry is not None else _ollama.chat
+        for chunk in chat_fn(model=self.model, messages=self.build_messages(message), stream=True):
+            if chunk.get('done'):
+                _record_usage(usage, chunk)
+            content = chunk['message']['content']
+            if content:
+                yield content
+
+    async def chat_stream_async(self, message, usage=None):
+        if self.registry is not None:
+            client = self.registry.async_http_client(self.host)
+        else:
+            client = _ollama.AsyncClient(host=self.host)
+        async for chunk in await client.chat(model=self.model, messages=self.build_messages(message), stream=True):
+            if chunk.get('done'):
+                _record_usage(usage, chunk)
+            content = chunk['message']['content']
+            if content:
+                yield content
+
+
+class OllamaClientRegistry:
+    """
+    Mantiene un OllamaClient de larga vida por (modelo, host) y un cliente HTTP
+    por host con conexiones keep-alive reutilizables, en lugar de crear un
+    cliente nuevo en cada ejecución del nodo LLM.
+    - pool_size: conexiones máximas (y en keep-alive) por host.
+    - keepalive_expiry: segundos que una conexión ociosa permanece abierta.
+    - timeout / connect_timeout: tiempos máximos de cada petición (None = sin límite).
+    """
+    def __init__(self, host=None, pool_size=10, keepalive_expiry=30.0, timeout=None, connect_timeout=None):
+        self.host = host
+        self.pool_size = pool_size
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._clients = {}         # (modelo, host) -> OllamaClient
+        self._http = {}            # host -> ollama.Client
+        self._async_http = {}      # (host, event loop) -> ollama.AsyncClient
+        self._lock = threading.Lock()
+
+    # Los procesos del pool reciben la configuración, no las conexiones abiertas
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_clients={}, _http={}, _async_http={}, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _http_kwargs(self):
+        import httpx  # Dependencia de la librería ollama
+        return {
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout or self.timeout),
+            "limits": httpx.Limits(max_connections=self.pool_size,
+                                   max_keepalive_connections=self.pool_size,
+                                   keepalive_expiry=self.keepalive_expiry),
+        }
+
+    def get(self, model, host=None):
+        key = (model, host or self.host)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = OllamaClient(model, key[1], registry=self)
+        return client
+
+    def http_client(self, host=None):
+        client = self._http.get(host)
+        if client is None:
+            with self._lock:
+                client = self._http.get(host)
+                if client is None:
+                    client = self._http[host] = _load_ollama().Client(host=host, **self._http_kwargs())
+        return client
+
+    def async_http_client(self, host=None):
+        # Los clientes asíncronos pertenecen al event loop en el que se crean
+        import asyncio
+        key = (host, asyncio.get_running_loop())
+        client = self._async_http.get(key)
+        if client is None:
+            with self._lock:
+                # Se descartan los clientes de loops ya cerrados
+                for old_key in [k for k in self._async_http if k[1].is_closed()]:
+                    del self._async_http[old_key]
+                client = self._async_http[key] = _load_ollama().AsyncClient(host=host, **self._http_kwargs())
+        return client
+
+    def close(self):
+        with self._lock:
+            for client in self._http.values():
+                client._client.close()
+            self._http.clear()
+            self._async_http.clear()
+            self._clients.clear()
+
+
+# Registro usado por los nodos LLM cuando el contexto no trae uno propio
+default_registry = OllamaClientRegistry()
@@ -0,0 +1,343 @@
+# models/paralelo_node.py
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from models.nodes import FlowNode, SLOT_NEXT
+
+WAIT_MODES = ("todas", "cualquiera")
+CONFLICT_POLICIES = ("error", "primera", "ultima", "lista")
+
+def branch_updates(base, context):
+    """Variables que una rama agregó o reemplazó respecto del contexto 'base' (el de antes de dividirse)."""
+    return {k: v for k, v in context.items() if k not in base or base[k] is not v}
+
+def merge_updates(updates, policy):
+    """
+    Combina los cambios de cada rama (en el orden de sus conexiones) según
+    'policy' cuando más de una rama escribió la misma variable con valores
+    distintos: "error" lanza ValueError, "primera" y "ultima" conservan el de
+    la primera o la última rama, y "lista" guarda la lista de valores.
+    """
+    merged = {}
+    written = {}    # variable -> valores escritos por las ramas, en orden
+    for branch in updates:
+        for name, value in branch.items():
+            written.setdefault(name, []).append(value)
+    for name, values in written.items():
+        if len(values) == 1 or all(value == values[0] for value in values[1:]):
+            merged[name] = values[0]
+        elif policy == "primera":
+            merged[name] = values[0]
+        elif policy == "ultima":
+            merged[name] = values[-1]
+        elif policy == "lista":
+            merged[name] = values
+        else:
+            raise ValueError(f"Conflicto en la variable '{name}': las ramas paralelas escribieron valores distintos")
+    return merged
+
+
+class BranchPool:
+    """
+    Pool de hilos de las ramas de un nodo Paralelo. El ThreadPoolExecutor se
+    crea con el primer envío (la interfaz gráfica ejecuta las ramas en orden y
+    no lo necesita) y close() lo detiene; si después llegan más ramas se crea
+    uno nuevo, de modo que cerrar el plan no rompe una ejecución en curso.
+    """
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="flow-paralelo")
+            return self._executor.submit(fn, *args)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+class ParaleloNode(FlowNode):
+    """
+    Divide el flujo en varias ramas (self.branches, una por conexión de
+    salida) que se ejecutan a la vez, cada una con su propia copia del
+    contexto, hasta llegar al nodo Unión común. El plan de ejecución continúa
+    en la Unión con los cambios de las ramas combinados según su configuración
+    (ver UnionNode y ExecutionPlan.compile). Las ramas corren en un pool de
+    hilos ('max_workers', por defecto 4 por rama, compartido por todas las
+    ejecuciones del flujo y cerrado con ExecutionPlan.close()) o, en el motor
+    asíncrono, como tareas del event loop.
+    """
+    def __init__(self, x, y):
+        super().__init__(x, y, "paralelo", "Paralelo", "Paralelo")
+        self.config["max_workers"] = 0     # 0 = 4 hilos por rama
+        self.branches = []                 # Nodo inicial de cada rama, en el orden de conexión
+
+    def configure(self, parent, variable_manager):
+        from tkinter import Toplevel, ttk, messagebox
+        dialog = Toplevel(parent)
+        dialog.update_idletasks()
+        dialog.grab_set()
+        dialog.title("Configurar Nodo Paralelo")
+        dialog.transient(parent)
+        dialog.grab_set()
+
+        lbl_title = ttk.Label(dialog, text="Título:")
+        lbl_title.grid(row=0, column=0, padx=10, pady=5, sticky="w")
+        entry_title = ttk.Entry(dialog, width=40)
+        entry_title.grid(row=0, column=1, padx=10, pady=5, sticky="w")
+        entry_title.insert(0, self.title)
+
+        lbl_workers = ttk.Label(dialog, text="Hilos máximos (0 = 4 por rama):")
+        lbl_workers.grid(row=1, column=0, padx=10, pady=5, sticky="w")
+        entry_workers = ttk.Entry(dialog, width=10)
+        entry_workers.grid(row=1, column=1, padx=10, pady=5, sticky="w")
+        entry_workers.insert(0, str(self.config.get("max_workers", 0)))
+
+        def on_ok():
+            try:
+                max_workers = int(entry_workers.get().strip() or 0)
+            except ValueError:
+                messagebox.showwarning("Advertencia", "Los hilos máximos deben ser un número entero.", parent=dialog)
+                return
+            self.title = entry_title.get().strip()
+            self.config["max_workers"] = max(max_workers, 0)
+            self.text = f"Paralelo ({len(self.branches)} ramas)"
+            dialog.destroy()
+
+        btn_ok = ttk.Button(dialog, text="OK", command=on_ok)
+        btn_ok.grid(row=2, column=0, padx=10, pady=10)
+        btn_cancel = ttk.Button(dialog, text="Cancelar", command=dialog.destroy)
+        btn_cancel.grid(row=2, column=1, padx=10, pady=10)
+        dialog.wait_window(dialog)
+
+    def find_join(self):
+        """
+        Retorna el nodo Unión al que llegan las ramas (None si todas terminan
+        sin llegar a una). Las divisiones anidadas se saltan hasta su propia
+        Unión. Lanza ValueError si las ramas llegan a uniones distintas.
+        """
+        joins = set()
+        for start in self.branches:
+            pending = [start]
+            visited = set()
+            while pending:
+                node = pending.pop()
+                if node is None or node.id in visited:
+                    continue
+                visited.add(node.id)
+                if node.node_type == "union":
+                    joins.add(node)
+                    continue
+                if node.node_type == "paralelo":
+                    inner = node.find_join()
+                    pending.append(inner.connected_to if inner is not None else None)
+                    continue
+                pending.extend((node.connected_to, getattr(node, "true_connection", None),
+                                getattr(node, "false_connection", None)))
+        if len(joins) > 1:
+            raise ValueError(f"Las ramas del nodo '{self.text}' llegan a distintos nodos Unión")
+        return joins.pop() if joins else None
+
+    def compile(self):
+        count = len(self.branches)
+
+        def step(context):
+            print(f"Paralelo: {count} ramas")
+            return SLOT_NEXT
+        return step
+
+    def compile_parallel(self, step, run_branch, starts, join, pools):
+        """
+        Retorna step(context) que ejecuta 'step' (el paso del nodo) y luego cada
+        rama con run_branch(contexto, índice inicial, cancelada) en un
+        BranchPool, combinando sus cambios en el contexto según la
+        configuración de 'join'. El pool se agrega a 'pools' para que el plan
+        lo cierre. Con "cualquiera", las demás ramas se detienen en cuanto
+        termine su paso en curso.
+        """
+        wait_mode = join.config.get("wait", "todas") if join is not None else "todas"
+        policy = join.config.get("conflict_policy", "error") if join is not None else "error"
+        pool = BranchPool(self.config.get("max_workers") or 4 * max(len(starts), 1))
+        pools.append(pool)
+
+        def parallel_step(context):
+            slot = step(context)
+            base = dict(context)
+            if context.get("root") is not None:
+                # En la interfaz gráfica Tk solo admite diálogos desde su hilo: las ramas se ejecutan en orden
+                results = _run_in_order(run_branch, base, starts, wait_mode)
+            else:
+                cancelled = threading.Event()
+                futures = [pool.submit(run_branch, _branch_context(base), start, cancelled) for start in starts]
+                if wait_mode == "cualquiera":
+                    try:
+                        results = [_first_result(futures)]
+                    finally:
+                        cancelled.set()
+                else:
+                    results = [_result(future) for future in futures]
+            for ctx in results:
+                if isinstance(ctx, Exception):
+                    raise ctx
+            _merge(context, base, results, policy)
+            return slot
+        return parallel_step
+
+    def compile_parallel_async(self, step, run_branch, starts, join):
+        """Versión asíncrona de compile_parallel(): cada rama es una tarea del event loop."""
+        import asyncio
+        wait_mode = join.config.get("wait", "todas") if join is not None else "todas"
+        policy = join.config.get("conflict_policy", "error") if join is not None else "error"
+
+        async def parallel_step(context):
+            slot = await step(context)
+            base = dict(context)
+            tasks = [asyncio.ensure_future(run_branch(_branch_context(base), start)) for start in starts]
+            if wait_mode == "cualquiera":
+                results = [await _first_task(tasks)]
+            else:
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+                for ctx in results:
+                    if isinstance(ctx, BaseException):
+                        raise ctx
+            _merge(context, base, results, policy)
+            return slot
+        return parallel_step
+
+    def execute(self, context):
+        return self.successor(self.compile()(context))
+
+
+def _branch_context(base):
+    # Cada rama encola sus envíos en su propia lista: una rama descartada no deja resultados en el flujo
+    return dict(base, deferred_results=[])
+
+def _merge(context, base, results, policy):
+    """Combina en 'context' los cambios de las ramas conservadas y sus envíos encolados."""
+    updates = [branch_updates(base, ctx) for ctx in results]
+    deferred = [update.pop("deferred_results", None) for update in updates]
+    context.update(merge_updates(updates, policy))
+    for pending in deferred:
+        if pending:
+            context.setdefault("deferred_results", []).extend(pending)
+
+def _run_in_order(run_branch, base, starts, wait_mode):
+    results = []
+    for start in starts:
+        try:
+            ctx = run_branch(_branch_context(base), start)
+        except Exception as e:
+            results.append(e)
+            continue
+        if wait_mode == "cualquiera":
+            return [ctx]
+        results.append(ctx)
+    # Con "cualquiera" llega aquí solo si todas las ramas fallaron
+    return results[:1] if wait_mode == "cualquiera" else results
+
+def _result(future):
+    # Se esperan todas las ramas antes de propagar el error de la primera que falló
+    try:
+        return future.result()
+    except Exception as e:
+        return e
+
+def _first_result(futures):
+    """Contexto de la primera rama que termina sin error (si todas fallan, el error de la primera)."""
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in futures:
+            if future in done and future.exception() is None:
+                return future.result()
+    return futures[0].result()
+
+async def _first_task(tasks):
+    import asyncio
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                if task in done and task.exception() is None:
+                    return task.result()
+        return tasks[0].result()
+    finally:
+        # Las ramas que siguen en curso ya no se necesitan
+        for task in pending:
+            task.cancel()
+
+
+class UnionNode(FlowNode):
+    """
+    Punto de encuentro de las ramas de un nodo Paralelo. 'wait' indica si se
+    espera a todas las ramas ("todas") o solo a la primera que termine sin
+    error ("cualquiera"; sus cambios y sus correos encolados son los únicos
+    que se conservan, y las demás ramas se detienen al terminar su paso en
+    curso, o se cancelan en el motor asíncrono).
+    'conflict_policy' resuelve las variables que varias ramas escribieron con
+    valores distintos (ver merge_updates).
+    """
+    def __init__(self, x, y):
+        super().__init__(x, y, "union", "Unión", "Unión")
+        self.config["wait"] = "todas"
+        self.config["conflict_policy"] = "error"
+
+    def configure(self, parent, variable_manager):
+        from tkinter import Toplevel, ttk
+        dialog = Toplevel(parent)
+        dialog.update_idletasks()
+        dialog.grab_set()
+        dialog.title("Configurar Nodo Unión")
+        dialog.transient(parent)
+        dialog.grab_set()
+
+        lbl_title = ttk.Label(dialog, text="Título:")
+        lbl_title.grid(row=0, column=0, padx=10, pady=5, sticky="w")
+        entry_title = ttk.Entry(dialog, width=40)
+        entry_title.grid(row=0, column=1, padx=10, pady=5, sticky="w")
+        entry_title.insert(0, self.title)
+
+        lbl_wait = ttk.Label(dialog, text="Esperar a:")
+        lbl_wait.grid(row=1, column=0, padx=10, pady=5, sticky="w")
+        cb_wait = ttk.Combobox(dialog, values=WAIT_MODES, state="readonly", width=15)
+        cb_wait.grid(row=1, column=1, padx=10, pady=5, sticky="w")
+        cb_wait.set(self.config.get("wait", "todas"))
+
+        lbl_policy = ttk.Label(dialog, text="Si dos ramas escriben la misma variable:")
+        lbl_policy.grid(row=2, column=0, padx=10, pady=5, sticky="w")
+        cb_policy = ttk.Combobox(dialog, values=CONFLICT_POLICIES, state="readonly", width=15)
+        cb_policy.grid(row=2, column=1, padx=10, pady=5, sticky="w")
+        cb_policy.set(self.config.get("conflict_policy", "error"))
+
+        def on_ok():
+            self.title = entry_title.get().strip()
+            self.config["wait"] = cb_wait.get()
+            self.config["conflict_policy"] = cb_policy.get()
+            self.text = f"Unión ({self.config['wait']})"
+            dialog.destroy()
+
+        btn_ok = ttk.Button(dialog, text="OK", command=on_ok)
+        btn_ok.grid(row=3, column=0, padx=10, pady=10)
+        btn_cancel = ttk.Button(dialog, text="Cancelar", command=dialog.destroy)
+        btn_cancel.grid(row=3, column=1, padx=10, pady=10)
+        dialog.wait_window(dialog)
+
+    def compile(self):
+        # Los cambios de las ramas ya se combinaron al terminar el nodo Paralelo
+        def step(context):
+            return SLOT_NEXT
+        return step
+
+    def compile_batch(self):
+        def step_batch(contexts):
+            return [SLOT_NEXT] * len(contexts)
+        return step_batch
+
+    def execute(self, context):
+        return self.successor(self.compile()(context))
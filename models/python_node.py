@@ -1,16 +1,60 @@
 # models/python_node.py
-from models.nodes import FlowNode
-from tkinter import Toplevel, ttk, messagebox, simpledialog
+from models.nodes import FlowNode, SLOT_NEXT
+from models.input_provider import get_input_provider
+import hashlib
 import traceback
 
+# Función 'func' de cada código, por hash del código. Se comparte entre todas las
+# ejecuciones del proceso (incluidos los procesos de un lote en paralelo).
+_function_cache = {}
+FUNCTION_CACHE_SIZE = 256
+
+def code_key(code):
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+def _build_function(code):
+    try:
+        compiled = compile(code, "<string>", "exec")
+        # Un solo espacio de nombres (como un módulo): 'func' ve los imports y las variables globales del código
+        namespace = {}
+        exec(compiled, namespace)
+    except Exception as e:
+        return None, f"Error al ejecutar código: {e}"
+    if "func" not in namespace:
+        return None, "Error: No se definió la función 'func'"
+    return namespace["func"], None
+
+def load_function(code, key=None):
+    """
+    Retorna (func, error) para el código: se compila y ejecuta una sola vez por
+    proceso y el resultado (o el error) queda en caché.
+    """
+    key = key or code_key(code)
+    entry = _function_cache.get(key)
+    if entry is None:
+        entry = _build_function(code)
+        if len(_function_cache) >= FUNCTION_CACHE_SIZE:
+            _function_cache.pop(next(iter(_function_cache)), None)
+        _function_cache[key] = entry
+    return entry
+
+def forget_function(code):
+    _function_cache.pop(code_key(code), None)
+
 class PythonNode(FlowNode):
+    blocking = True
+
     def __init__(self, x, y):
         super().__init__(x, y, "python", "Python", "Ejecutar Código Python")
         self.config["code"] = ""
         self.config["params"] = []
         self.config["variable_name"] = ""
+        self.config["isolated"] = False
+        self.config["memo"] = False      # Reutilizar resultados anteriores (solo si 'func' no tiene efectos ni azar)
 
     def configure(self, parent, variable_manager):
+        import tkinter as tk
+        from tkinter import Toplevel, ttk, messagebox
         dialog = Toplevel(parent)
         dialog.update_idletasks()
         dialog.grab_set()
@@ -42,12 +86,26 @@ class PythonNode(FlowNode):
         entry_var.grid(row=3, column=1, padx=10, pady=5, sticky="w")
         entry_var.insert(0, self.config.get("variable_name", ""))
 
+        isolated_var = tk.BooleanVar(value=self.config.get("isolated", False))
+        chk_isolated = ttk.Checkbutton(dialog, text="Ejecutar en un proceso aislado (con tiempo y memoria límite)",
+                                       variable=isolated_var)
+        chk_isolated.grid(row=4, column=1, padx=10, pady=5, sticky="w")
+
+        memo_var = tk.BooleanVar(value=self.config.get("memo", False))
+        chk_memo = ttk.Checkbutton(dialog, text="Reutilizar el resultado si los parámetros no cambian "
+                                               "('func' sin efectos, azar ni hora)", variable=memo_var)
+        chk_memo.grid(row=5, column=1, padx=10, pady=5, sticky="w")
+
         def on_ok():
             self.title = entry_title.get().strip()
+            # El código anterior deja de usarse: se descarta su función de la caché
+            forget_function(self.config.get("code", ""))
             self.config["code"] = txt_code.get("1.0", "end").strip()
             params = [p.strip() for p in entry_params.get().split(",") if p.strip()]
             self.config["params"] = params
             self.config["variable_name"] = entry_var.get().strip()
+            self.config["isolated"] = isolated_var.get()
+            self.config["memo"] = memo_var.get()
             self.text = f"Python: {self.config.get('variable_name', '')}" or "Python"
             try:
                 compile(self.config["code"], "<string>", "exec")
@@ -57,32 +115,57 @@ class PythonNode(FlowNode):
             dialog.destroy()
 
         btn_ok = ttk.Button(dialog, text="OK", command=on_ok)
-        btn_ok.grid(row=4, column=0, padx=10, pady=10)
+        btn_ok.grid(row=6, column=0, padx=10, pady=10)
         btn_cancel = ttk.Button(dialog, text="Cancelar", command=dialog.destroy)
-        btn_cancel.grid(row=4, column=1, padx=10, pady=10)
+        btn_cancel.grid(row=6, column=1, padx=10, pady=10)
         dialog.wait_window(dialog)
 
-    def execute(self, context):
+    def memo_signature(self):
+        # Solo si el usuario indicó que 'func' es pura (sin efectos, azar ni hora): memoizarla sería incorrecto
+        if not self.config.get("memo", False):
+            return None
+        return tuple(self.config.get("params", [])), (self.config.get("variable_name", "respuesta"),)
+
+    def compile(self):
         code = self.config.get("code", "")
-        params = self.config.get("params", [])
+        params = list(self.config.get("params", []))
         var_name = self.config.get("variable_name", "respuesta")
-        param_values = {}
-        for p in params:
-            value = context.get(p)
-            if value is None:
-                root = context.get("root")
-                value = simpledialog.askstring("Parámetro", f"Ingrese valor para '{p}':", parent=root)
-            param_values[p] = value
-        try:
-            compiled = compile(code, "<string>", "exec")
-            local_vars = {}
-            exec(compiled, {}, local_vars)
-            if "func" not in local_vars:
-                result = "Error: No se definió la función 'func'"
+        # El código se compila y ejecuta la primera vez que se usa; luego se reutiliza 'func'
+        key = code_key(code)
+        isolated = self.config.get("isolated", False)
+        if isolated:
+            # multiprocessing se importa solo en los flujos con nodos aislados
+            from models.python_pool import PythonWorkerError, default_pool
+
+        def step(context):
+            param_values = {}
+            for p in params:
+                value = context.get(p)
+                if value is None:
+                    value = get_input_provider(context).ask("Parámetro", f"Ingrese valor para '{p}':", variable=p)
+                param_values[p] = value
+            if isolated:
+                # El pool del contexto (o el del módulo) ejecuta 'func' en otro proceso
+                pool = context.get("python_pool") or default_pool()
+                try:
+                    result = pool.call(code, key, param_values)
+                except PythonWorkerError as e:
+                    result = str(e)
+                except Exception as e:
+                    result = f"Error al ejecutar código: {e}"
             else:
-                result = local_vars["func"](**param_values)
-        except Exception as e:
-            result = f"Error al ejecutar código: {e}"
-        context[var_name] = result
-        print(f"Python: Resultado: {result}")
-        return self.connected_to
+                func, error = load_function(code, key)
+                if error is not None:
+                    result = error
+                else:
+                    try:
+                        result = func(**param_values)
+                    except Exception as e:
+                        result = f"Error al ejecutar código: {e}"
+            context[var_name] = result
+            print(f"Python: Resultado: {result}")
+            return SLOT_NEXT
+        return step
+
+    def execute(self, context):
+        return self.successor(self.compile()(context))
@@ -0,0 +1,243 @@
+# models/python_pool.py
+import multiprocessing
+import pickle
+import queue
+import threading
+import time
+try:
+    import resource
+except ImportError:
+    # Windows: no hay límite de memoria por proceso, solo el reciclaje por llamadas
+    resource = None
+
+class PythonWorkerError(Exception):
+    """Error al ejecutar 'func' en un proceso aislado (el mensaje ya está listo para el contexto)."""
+
+def _peak_rss_mb():
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux informa KB
+
+def _worker_main(conn, max_memory_mb):
+    # Proceso aislado: recibe (clave, código o None, parámetros) y responde (ok, valor, ms, rss)
+    from models.python_node import load_function
+    if resource is not None and max_memory_mb:
+        limit = int(max_memory_mb * 1024 * 1024)
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError):
+            pass
+    conn.send_bytes(b"listo")
+    codes = {}
+    while True:
+        try:
+            request = conn.recv_bytes()
+        except (EOFError, OSError):
+            return
+        if not request:
+            return
+        key, code, params = pickle.loads(request)
+        if code is not None:
+            codes[key] = code
+        t0 = time.perf_counter()
+        func, error = load_function(codes[key], key)
+        if error is not None:
+            response = (False, error)
+        else:
+            try:
+                response = (True, func(**params))
+            except MemoryError:
+                response = (False, "Error al ejecutar código: se excedió el límite de memoria")
+            except Exception as e:
+                response = (False, f"Error al ejecutar código: {e}")
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        try:
+            payload = pickle.dumps(response + (elapsed_ms, _peak_rss_mb()), pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            payload = pickle.dumps((False, f"Error al ejecutar código: resultado no serializable ({e})",
+                                    elapsed_ms, _peak_rss_mb()), pickle.HIGHEST_PROTOCOL)
+        conn.send_bytes(payload)
+
+
+class _Worker:
+    def __init__(self, ctx, max_memory_mb):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, max_memory_mb),
+                                   name="flow-python", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.calls = 0
+        self.known_codes = set()   # Claves cuyo código ya se envió a este proceso
+
+    def wait_ready(self):
+        # El proceso avisa cuando terminó de iniciar (así el arranque no se cuenta en la primera llamada)
+        try:
+            self.conn.recv_bytes()
+        except (EOFError, OSError):
+            pass
+
+    def stop(self, kill=False):
+        if not kill and self.process.is_alive():
+            try:
+                self.conn.send_bytes(b"")
+            except (OSError, ValueError):
+                pass
+            self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class PythonWorkerPool:
+    """
+    Ejecuta las funciones de los nodos Python marcados como aislados en
+    procesos separados, ya iniciados y listos. Cada llamada tiene:
+    - timeout: segundos máximos; si se excede, el proceso se mata y se reemplaza.
+    - max_memory_mb: límite de memoria del proceso (RLIMIT_AS) y de RSS: si el
+      pico de RSS lo supera, el proceso se recicla tras la llamada.
+    - max_calls: llamadas tras las cuales el proceso se recicla.
+    El código de cada nodo se envía una sola vez por proceso; luego solo viajan
+    los parámetros y el resultado (pickle). Se puede compartir entre hilos.
+    close() detiene los procesos libres; los que están en una llamada se
+    detienen al terminarla en lugar de volver al pool.
+    """
+    def __init__(self, workers=2, timeout=10.0, max_memory_mb=1024, max_calls=1000):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_memory_mb = max_memory_mb
+        self.max_calls = max_calls
+        self.calls = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self.total_ms = 0.0     # Tiempo total de las llamadas visto desde este proceso
+        self.func_ms = 0.0      # Tiempo dentro de 'func' (medido en el proceso aislado)
+        self._idle = None
+        self._all = []
+        self._lock = threading.Lock()
+
+    # Los procesos de un lote en paralelo reciben la configuración y crean sus propios procesos
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_idle=None, _all=[], _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _spawn(self):
+        worker = _Worker(multiprocessing.get_context("spawn"), self.max_memory_mb)
+        self._all.append(worker)
+        return worker
+
+    def start(self):
+        """Inicia los procesos (se llama sola con la primera ejecución). Retorna la cola de procesos libres."""
+        with self._lock:
+            if self._idle is None:
+                self._idle = queue.Queue()
+                started = [self._spawn() for _ in range(self.workers)]
+                for worker in started:
+                    worker.wait_ready()
+                    self._idle.put(worker)
+            return self._idle
+
+    def _replace(self, worker, idle, kill=False):
+        # Retorna el proceso nuevo, o None si el pool se cerró durante la llamada
+        worker.stop(kill)
+        with self._lock:
+            if worker in self._all:
+                self._all.remove(worker)
+            if self._idle is not idle:
+                return None
+            self.recycled += 1
+            worker = self._spawn()
+        worker.wait_ready()
+        return worker
+
+    def _release(self, worker, idle):
+        with self._lock:
+            if self._idle is idle:
+                idle.put(worker)
+                return
+            # El pool se cerró mientras el proceso estaba en una llamada
+            if worker in self._all:
+                self._all.remove(worker)
+        worker.stop()
+
+    def call(self, code, key, params):
+        """Ejecuta func(**params) del código en un proceso aislado y retorna su resultado."""
+        idle = self._idle
+        if idle is None:
+            idle = self.start()
+        worker = idle.get()
+        if worker is None:
+            idle.put(None)  # Despierta a las demás llamadas que esperaban un proceso libre
+            raise PythonWorkerError("Error al ejecutar código: el pool de procesos aislados se cerró")
+        try:
+            t0 = time.perf_counter()
+            send_code = key not in worker.known_codes
+            worker.conn.send_bytes(pickle.dumps((key, code if send_code else None, params),
+                                                pickle.HIGHEST_PROTOCOL))
+            worker.known_codes.add(key)
+            if not worker.conn.poll(self.timeout):
+                with self._lock:
+                    self.timeouts += 1
+                worker = self._replace(worker, idle, kill=True)
+                raise PythonWorkerError(f"Error al ejecutar código: se excedió el tiempo límite ({self.timeout} s)")
+            try:
+                ok, value, func_ms, rss_mb = pickle.loads(worker.conn.recv_bytes())
+            except (EOFError, OSError):
+                worker = self._replace(worker, idle, kill=True)
+                raise PythonWorkerError("Error al ejecutar código: el proceso aislado terminó inesperadamente")
+            with self._lock:
+                self.calls += 1
+                self.total_ms += (time.perf_counter() - t0) * 1000
+                self.func_ms += func_ms
+            worker.calls += 1
+            if worker.calls >= self.max_calls or (self.max_memory_mb and rss_mb > self.max_memory_mb):
+                worker = self._replace(worker, idle)
+            if not ok:
+                raise PythonWorkerError(value)
+            return value
+        finally:
+            if worker is not None:
+                self._release(worker, idle)
+
+    @property
+    def stats(self):
+        overhead = (self.total_ms - self.func_ms) / self.calls if self.calls else 0.0
+        return {
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "recycled": self.recycled,
+            "overhead_ms": overhead,   # Costo promedio por llamada, sin contar 'func'
+        }
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, None
+            stopped = []
+            if idle is not None:
+                while True:
+                    try:
+                        stopped.append(idle.get_nowait())
+                    except queue.Empty:
+                        break
+                idle.put(None)  # Las llamadas que esperan un proceso libre terminan con un error
+            for worker in stopped:
+                self._all.remove(worker)
+        for worker in stopped:
+            worker.stop()
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+def default_pool():
+    """Pool del módulo, para los nodos aislados ejecutados sin un pool propio (p. ej. desde la interfaz)."""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = PythonWorkerPool()
+        return _default_pool
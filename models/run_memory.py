@@ -0,0 +1,522 @@
+# models/run_memory.py
+import atexit
+import glob
+import json
+import os
+import pickle
+import queue
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+def _to_json(record):
+    return json.dumps(record, ensure_ascii=False, default=str)
+
+class RunMemoryStore:
+    """
+    Memoria de ejecuciones: guarda el contexto final de cada ejecución de un
+    flujo. Cada registro es {"run_id", "flow", "time", "context"}.
+    Las subclases implementan _write() y _records(); get() y query() recorren
+    los registros salvo que la subclase tenga un índice (ver SqliteRunStore).
+    """
+    def save(self, context, flow=None, run_id=None):
+        """Guarda el contexto (ya sin objetos de ejecución) y retorna el id de la ejecución."""
+        record = {"run_id": run_id or str(uuid.uuid4()), "flow": flow, "time": time.time(), "context": context}
+        self._write(record)
+        return record["run_id"]
+
+    def get(self, run_id):
+        for record in self._records():
+            if record["run_id"] == run_id:
+                return record
+        return None
+
+    def query(self, flow=None, since=None, until=None, limit=None):
+        """Registros de un flujo y/o rango de tiempo [since, until) (timestamps), en orden de escritura."""
+        count = 0
+        for record in self._records():
+            if flow is not None and record["flow"] != flow:
+                continue
+            if since is not None and record["time"] < since:
+                continue
+            if until is not None and record["time"] >= until:
+                continue
+            yield record
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+    @property
+    def location(self):
+        """Dónde quedó guardada la última ejecución (para informarlo al usuario)."""
+        return ""
+
+    def flush(self):
+        pass
+
+    def sync(self):
+        """Escribe lo pendiente y lo lleva al disco (fsync), para que sobreviva a un corte."""
+        self.flush()
+
+    def close(self):
+        self.flush()
+
+    def _write_many(self, records):
+        # Escribe un grupo de registros; las subclases pueden hacerlo en una sola operación
+        for record in records:
+            self._write(record)
+
+    def _write(self, record):
+        raise NotImplementedError
+
+    def _records(self):
+        raise NotImplementedError
+
+
+class JsonFileRunStore(RunMemoryStore):
+    """Un archivo <run_id>.json por ejecución (formato original de la carpeta 'memoria')."""
+    def __init__(self, folder="memoria"):
+        self.folder = folder
+        self._last_path = ""
+
+    def _write(self, record):
+        os.makedirs(self.folder, exist_ok=True)
+        self._last_path = os.path.join(self.folder, f"{record['run_id']}.json")
+        with open(self._last_path, "w", encoding="utf-8") as f:
+            json.dump(record["context"], f, indent=4, default=str)
+
+    def get(self, run_id):
+        path = os.path.join(self.folder, f"{run_id}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return {"run_id": run_id, "flow": None, "time": os.path.getmtime(path), "context": json.load(f)}
+
+    def _records(self):
+        for path in sorted(glob.glob(os.path.join(self.folder, "*.json")), key=os.path.getmtime):
+            run_id = os.path.splitext(os.path.basename(path))[0]
+            yield self.get(run_id)
+
+    @property
+    def location(self):
+        return self._last_path
+
+
+class SegmentRunStore(RunMemoryStore):
+    """
+    Segmentos de solo-anexar en 'folder': cada proceso escribe sus propios
+    archivos y pasa a uno nuevo cuando el actual supera 'max_segment_bytes'.
+    - binary=False: JSONL (una ejecución por línea, legible con cualquier herramienta).
+    - binary=True: registros pickle precedidos por su largo (más compacto y rápido;
+      solo deben leerse archivos propios).
+    'flush_every' indica cada cuántas ejecuciones se vacía el búfer al disco.
+    """
+    _LENGTH = struct.Struct("<I")
+
+    def __init__(self, folder="memoria", max_segment_bytes=64 * 1024 * 1024, binary=False, flush_every=1):
+        self.folder = folder
+        self.max_segment_bytes = max_segment_bytes
+        self.binary = binary
+        self.flush_every = max(flush_every, 1)
+        self._file = None
+        self._path = ""
+        self._sequence = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    # Cada proceso de un lote en paralelo abre sus propios segmentos
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_file=None, _path="", _sequence=0, _pending=0, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def extension(self):
+        return ".bin" if self.binary else ".jsonl"
+
+    def _open_segment(self):
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.folder, exist_ok=True)
+        self._sequence += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self._path = os.path.join(self.folder, f"runs-{stamp}-{os.getpid()}-{self._sequence:04d}{self.extension}")
+        self._file = open(self._path, "ab")
+
+    def _encode(self, record):
+        if self.binary:
+            try:
+                payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                # Valores que no se pueden serializar: se guardan como en JSONL (convertidos a texto)
+                payload = pickle.dumps(json.loads(_to_json(record)), pickle.HIGHEST_PROTOCOL)
+            return self._LENGTH.pack(len(payload)) + payload
+        return (_to_json(record) + "\n").encode("utf-8")
+
+    def _write(self, record):
+        data = self._encode(record)
+        with self._lock:
+            if self._file is None or self._file.tell() + len(data) > self.max_segment_bytes:
+                self._open_segment()
+            self._file.write(data)
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._file.flush()
+                self._pending = 0
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                self._pending = 0
+
+    def sync(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._pending = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def segments(self):
+        return sorted(glob.glob(os.path.join(self.folder, f"runs-*{self.extension}")))
+
+    def _records(self):
+        self.flush()
+        for path in self.segments():
+            with open(path, "rb") as f:
+                if not self.binary:
+                    for line in f:
+                        if line.strip():
+                            yield json.loads(line)
+                    continue
+                while True:
+                    header = f.read(self._LENGTH.size)
+                    if len(header) < self._LENGTH.size:
+                        break
+                    yield pickle.loads(f.read(self._LENGTH.unpack(header)[0]))
+
+    @property
+    def location(self):
+        return self._path or self.folder
+
+
+class SqliteRunStore(RunMemoryStore):
+    """
+    Base SQLite indexada por id de ejecución, flujo y fecha. Se puede compartir
+    entre hilos y procesos (WAL). 'commit_every' agrupa varias ejecuciones en
+    una misma transacción.
+    """
+    def __init__(self, db_path="memoria.db", commit_every=1):
+        self.db_path = db_path
+        self.commit_every = max(commit_every, 1)
+        self._conn = None
+        self._pending = []   # Filas que aún no se escribieron (la transacción solo dura lo que tarda el flush)
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_conn=None, _pending=[], _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "run_id TEXT PRIMARY KEY, flow TEXT, created REAL NOT NULL, context TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_flow_created ON runs(flow, created)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def _row(record):
+        return (record["run_id"], record["flow"], record["time"], _to_json(record["context"]))
+
+    def _write(self, record):
+        row = self._row(record)
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.commit_every:
+                self._flush_pending()
+
+    def _write_many(self, records):
+        # El grupo queda pendiente y se escribe completo en la transacción del siguiente flush()/sync()
+        rows = [self._row(record) for record in records]
+        with self._lock:
+            self._pending.extend(rows)
+
+    def _flush_pending(self, durable=False):
+        if self._pending:
+            conn = self._connection()
+            if durable:
+                # Con WAL y synchronous=NORMAL el commit no hace fsync; FULL lo hace en este commit
+                conn.execute("PRAGMA synchronous=FULL")
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO runs (run_id, flow, created, context) VALUES (?, ?, ?, ?)",
+                        self._pending)
+            finally:
+                if durable:
+                    conn.execute("PRAGMA synchronous=NORMAL")
+            self._pending = []
+
+    @staticmethod
+    def _record(row):
+        return {"run_id": row[0], "flow": row[1], "time": row[2], "context": json.loads(row[3])}
+
+    def get(self, run_id):
+        self.flush()
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT run_id, flow, created, context FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return self._record(row) if row is not None else None
+
+    def query(self, flow=None, since=None, until=None, limit=None):
+        sql = "SELECT run_id, flow, created, context FROM runs"
+        conditions = []
+        params = []
+        if flow is not None:
+            conditions.append("flow = ?")
+            params.append(flow)
+        if since is not None:
+            conditions.append("created >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created < ?")
+            params.append(until)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY created"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        self.flush()
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+        return [self._record(row) for row in rows]
+
+    def flush(self):
+        with self._lock:
+            self._flush_pending()
+
+    def sync(self):
+        with self._lock:
+            self._flush_pending(durable=True)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @property
+    def location(self):
+        return self.db_path
+
+
+class BackgroundRunWriter(RunMemoryStore):
+    """
+    Escribe en otra memoria de ejecuciones ('store') desde un hilo en segundo
+    plano, así la latencia del disco no se suma a cada ejecución. save()
+    solo encola el registro; el hilo toma todos los registros disponibles (hasta
+    'batch_size', esperando como mucho 'max_delay_ms' a que lleguen más) y los
+    escribe juntos (group commit). Niveles de 'durability':
+    - "ninguna": cada grupo se escribe sin fsync (queda en manos del sistema operativo).
+    - "lote": un fsync por grupo escrito.
+    - "completa": save() espera a que su registro esté en disco. No se espera
+      'max_delay_ms': el grupo se forma con los registros que llegan mientras
+      se escribe el anterior (desde varios hilos).
+    Si la cola llega a 'max_queued' registros, save() espera (contrapresión).
+    close() (también al salir del programa) espera a los save() en curso y
+    vacía la cola antes de cerrar; un save() posterior lanza RuntimeError.
+    """
+    DURABILITY_LEVELS = ("ninguna", "lote", "completa")
+
+    def __init__(self, store, max_queued=10000, batch_size=256, max_delay_ms=20.0, durability="lote"):
+        if durability not in self.DURABILITY_LEVELS:
+            raise ValueError(f"Durabilidad desconocida '{durability}' (use {', '.join(self.DURABILITY_LEVELS)})")
+        self.store = store
+        self.max_queued = max_queued
+        self.batch_size = max(batch_size, 1)
+        self.max_delay = max_delay_ms / 1000
+        self.durability = durability
+        self.records_written = 0
+        self.batches_written = 0
+        self.backpressure_waits = 0
+        self._queue = None
+        self._thread = None
+        self._closed = False
+        self._writers = 0       # save() que están encolando su registro (close() los espera)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    # Cada proceso de un lote en paralelo inicia su propio hilo de escritura
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_queue=None, _thread=None, _writers=0, _lock=None, _idle=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def _start(self):
+        # Se llama con self._lock tomado
+        self._queue = queue.Queue(self.max_queued)
+        self._thread = threading.Thread(target=self._run, args=(self._queue,), name="run-memory-writer",
+                                        daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _write(self, record):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("La memoria de ejecuciones ya se cerró: la ejecución no se guardó")
+            if self._queue is None:
+                self._start()
+            pending = self._queue
+            self._writers += 1
+        waiter = Future() if self.durability == "completa" else None
+        item = (record, waiter)
+        try:
+            try:
+                pending.put_nowait(item)
+            except queue.Full:
+                with self._lock:
+                    self.backpressure_waits += 1
+                pending.put(item)
+        finally:
+            with self._lock:
+                self._writers -= 1
+                if not self._writers:
+                    self._idle.notify_all()
+        if waiter is not None:
+            waiter.result()
+
+    def _run(self, pending):
+        while True:
+            item = pending.get()
+            if item is None:
+                pending.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + (self.max_delay if self.durability != "completa" else 0.0)
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    extra = pending.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        extra = pending.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if extra is None:
+                    stop = True
+                    break
+                batch.append(extra)
+            self._write_batch(batch)
+            for _ in batch:
+                pending.task_done()
+            if stop:
+                pending.task_done()
+                return
+
+    def _write_batch(self, batch):
+        error = None
+        try:
+            self.store._write_many([record for record, _ in batch])
+            if self.durability == "ninguna":
+                self.store.flush()
+            else:
+                self.store.sync()
+        except Exception as e:
+            error = e
+            print(f"Memoria de ejecuciones: no se pudieron guardar {len(batch)} ejecuciones: {e}")
+        self.records_written += len(batch)
+        self.batches_written += 1
+        for _, waiter in batch:
+            if waiter is not None:
+                if error is None:
+                    waiter.set_result(None)
+                else:
+                    waiter.set_exception(error)
+
+    @property
+    def average_batch_size(self):
+        return self.records_written / self.batches_written if self.batches_written else 0.0
+
+    def flush(self):
+        """Espera a que se escriban todos los registros encolados."""
+        pending = self._queue
+        if pending is not None:
+            pending.join()
+        self.store.flush()
+
+    def get(self, run_id):
+        self.flush()
+        return self.store.get(run_id)
+
+    def query(self, flow=None, since=None, until=None, limit=None):
+        self.flush()
+        return self.store.query(flow, since, until, limit)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            while self._writers:
+                self._idle.wait()
+            pending, thread = self._queue, self._thread
+            self._queue = self._thread = None
+        if pending is not None:
+            pending.put(None)
+            thread.join()
+            atexit.unregister(self.close)
+        self.store.close()
+
+    @property
+    def location(self):
+        return self.store.location
+
+
+# Nombres de los formatos disponibles (opción --memory del modo sin interfaz)
+RUN_MEMORY_BACKENDS = ("jsonl", "binario", "sqlite", "archivos")
+
+def create_run_memory(backend, path=None, flush_every=1, max_segment_bytes=64 * 1024 * 1024):
+    """
+    Crea la memoria de ejecuciones 'backend' en 'path' (carpeta, o archivo para
+    sqlite). 'flush_every' es cada cuántas ejecuciones se escribe al disco.
+    """
+    if backend in ("jsonl", "binario"):
+        return SegmentRunStore(path or "memoria", max_segment_bytes, backend == "binario", flush_every)
+    if backend == "sqlite":
+        return SqliteRunStore(path or "memoria.db", flush_every)
+    if backend == "archivos":
+        return JsonFileRunStore(path or "memoria")
+    raise ValueError(f"Formato de memoria desconocido '{backend}' (use {', '.join(RUN_MEMORY_BACKENDS)})")
@@ -1,17 +1,23 @@
 # models/smtp_node.py
-from models.nodes import FlowNode
-import re
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from tkinter import Toplevel, ttk
-import tkinter as tk
+from models.nodes import FlowNode, SLOT_NEXT
+import time
+from concurrent.futures import Future
+from models.smtp_transport import SENT, error_status
+from models.template import compile_template
+
+def record_send(metrics, started, status):
+    labels = (("status", "enviado" if status == SENT else "error"),)
+    metrics.observe("flow_smtp_send_duration_ms", (time.perf_counter() - started) * 1000, labels)
 
 class SmtpNode(FlowNode):
+    blocking = True
+
     def __init__(self, x, y):
         super().__init__(x, y, "smtp", "SMTP", "Enviar Correo")
 
     def configure(self, parent, variable_manager):
+        import tkinter as tk
+        from tkinter import Toplevel, ttk
         dialog = Toplevel(parent)
         dialog.update_idletasks()
         dialog.grab_set()
@@ -71,6 +77,16 @@ class SmtpNode(FlowNode):
         chk_html = ttk.Checkbutton(dialog, text="Contenido en HTML", variable=html_var)
         chk_html.grid(row=9, column=1, padx=10, pady=5, sticky="w")
 
+        tls_var = tk.BooleanVar(value=self.config.get("use_tls", True))
+        chk_tls = ttk.Checkbutton(dialog, text="Usar STARTTLS", variable=tls_var)
+        chk_tls.grid(row=10, column=1, padx=10, pady=5, sticky="w")
+
+        lbl_var = ttk.Label(dialog, text="Variable de resultado (opcional):")
+        lbl_var.grid(row=11, column=0, padx=10, pady=5, sticky="w")
+        entry_var = ttk.Entry(dialog, width=40)
+        entry_var.grid(row=11, column=1, padx=10, pady=5, sticky="w")
+        entry_var.insert(0, self.config.get("variable_name", ""))
+
         def on_ok():
             self.title = entry_title.get().strip()
             self.config["smtp_server"] = entry_server.get().strip()
@@ -82,48 +98,95 @@ class SmtpNode(FlowNode):
             self.config["subject"] = entry_subject.get().strip()
             self.config["body"] = txt_body.get("1.0", tk.END).strip()
             self.config["is_html"] = html_var.get()
+            self.config["use_tls"] = tls_var.get()
+            self.config["variable_name"] = entry_var.get().strip()
             self.config["action_type"] = "smtp"
             self.text = f"SMTP: {self.config.get('subject', '')}" or "SMTP"
             dialog.destroy()
 
         btn_ok = ttk.Button(dialog, text="OK", command=on_ok)
-        btn_ok.grid(row=10, column=0, padx=10, pady=10)
+        btn_ok.grid(row=12, column=0, padx=10, pady=10)
         btn_cancel = ttk.Button(dialog, text="Cancelar", command=dialog.destroy)
-        btn_cancel.grid(row=10, column=1, padx=10, pady=10)
+        btn_cancel.grid(row=12, column=1, padx=10, pady=10)
         dialog.wait_window(dialog)
 
-    def execute(self, context):
+    def compile(self):
+        # smtplib y email.mime cuestan unos 20 ms: se importan solo en los flujos con nodos SMTP
+        import smtplib
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        server = self.config.get("smtp_server", "")
         try:
-            def resolve_text(text):
-                # Reemplaza variables embebidas en el texto usando el contexto
-                possibles = re.findall(r'\$\{([^}]+)\}', text)
-                for var in possibles:
-                    value = context.get(var, "")
-                    text = text.replace(f"${{{var}}}", str(value))
-                return text
-
-            server = self.config.get("smtp_server", "")
             port = int(self.config.get("smtp_port", "0"))
-            user = self.config.get("user", "")
-            password = self.config.get("password", "")
-            remitente = self.config.get("from", "")
-            destinatario = self.config.get("to", "")
-            subject = resolve_text(self.config.get("subject", ""))
-            body = resolve_text(self.config.get("body", ""))
-            is_html = self.config.get("is_html", False)
-
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = remitente
-            msg["To"] = destinatario
-            mime_body = MIMEText(body, "html" if is_html else "plain")
-            msg.attach(mime_body)
-
-            smtp = smtplib.SMTP(server, port)
-            smtp.starttls()
-            smtp.login(user, password)
-            smtp.sendmail(remitente, destinatario.split(","), msg.as_string())
-            smtp.quit()
-            print(f"Correo enviado exitosamente a {destinatario}")
-        except Exception as e:
-            print(f"Error al enviar correo SMTP: {str(e)}")
+            port_error = None
+        except (TypeError, ValueError) as e:
+            port = None
+            port_error = str(e)
+        user = self.config.get("user", "")
+        password = self.config.get("password", "")
+        remitente = self.config.get("from", "")
+        destinatario = self.config.get("to", "")
+        recipients = destinatario.split(",")
+        subject_template = self.config.get("subject", "")
+        body_template = self.config.get("body", "")
+        subtype = "html" if self.config.get("is_html", False) else "plain"
+        use_tls = self.config.get("use_tls", True)
+        var_name = self.config.get("variable_name", "")
+        # Asunto y cuerpo se analizan una sola vez
+        subject_template = compile_template(subject_template)
+        body_template = compile_template(body_template)
+
+        def step(context):
+            started = time.perf_counter()
+            try:
+                if port_error is not None:
+                    raise ValueError(port_error)
+                subject = subject_template.render(context)
+                body = body_template.render(context)
+
+                msg = MIMEMultipart("alternative")
+                msg["Subject"] = subject
+                msg["From"] = remitente
+                msg["To"] = destinatario
+                mime_body = MIMEText(body, subtype)
+                msg.attach(mime_body)
+
+                # Con un transporte (pool o cola de envío) se reutilizan sesiones autenticadas
+                transport = context.get("smtp_transport")
+                if transport is None:
+                    smtp = smtplib.SMTP(server, port)
+                    if use_tls:
+                        smtp.starttls()
+                    smtp.login(user, password)
+                    smtp.sendmail(remitente, recipients, msg.as_string())
+                    smtp.quit()
+                    status = SENT
+                else:
+                    status = transport.send(server, port, user, password, remitente, recipients,
+                                            msg.as_string(), use_tls)
+            except Exception as e:
+                status = error_status(e)
+            metrics = context.get("metrics")
+            if metrics is not None:
+                if isinstance(status, Future):
+                    # Cola de envío: la duración llega hasta que el correo sale (o falla)
+                    status.add_done_callback(lambda future: record_send(metrics, started, future.result()))
+                else:
+                    record_send(metrics, started, status)
+            if isinstance(status, Future):
+                # Cola de envío: la ejecución (y su punto de control) espera a que el correo salga; si se pidió
+                # el estado, se escribe en el contexto al terminar
+                context.setdefault("deferred_results", []).append((var_name or None, status))
+                print(f"Correo encolado para {destinatario}")
+                return SLOT_NEXT
+            if status == SENT:
+                print(f"Correo enviado exitosamente a {destinatario}")
+            else:
+                print(status)
+            if var_name:
+                context[var_name] = status
+            return SLOT_NEXT
+        return step
+
+    def execute(self, context):
+        return self.successor(self.compile()(context))
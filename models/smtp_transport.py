@@ -0,0 +1,224 @@
+# models/smtp_transport.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+SENT = "enviado"
+
+def error_status(error):
+    return f"Error al enviar correo SMTP: {error}"
+
+class SmtpConnectionPool:
+    """
+    Reutiliza sesiones SMTP ya autenticadas (STARTTLS + LOGIN) por
+    (servidor, puerto, usuario), en lugar de abrir una conexión por mensaje.
+    - max_idle_per_key: conexiones ociosas que se conservan por clave.
+    - idle_timeout: segundos tras los cuales una conexión ociosa se descarta.
+    Se puede compartir entre hilos.
+    """
+    def __init__(self, max_idle_per_key=4, idle_timeout=60.0, timeout=30.0):
+        self.max_idle_per_key = max_idle_per_key
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.connections_opened = 0
+        self.messages_sent = 0
+        self._idle = {}  # (servidor, puerto, usuario) -> [(smtp, último uso)]
+        self._lock = threading.Lock()
+
+    # Los procesos del pool de ejecución reciben la configuración, no las conexiones
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_idle={}, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self, server, port, user, password, use_tls):
+        # smtplib (con ssl y email) se importa al enviar el primer correo, no al iniciar el motor
+        import smtplib
+        smtp = smtplib.SMTP(server, port, timeout=self.timeout)
+        if use_tls:
+            smtp.starttls()
+        if user:
+            smtp.login(user, password)
+        with self._lock:
+            self.connections_opened += 1
+        return smtp
+
+    @staticmethod
+    def _discard(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _acquire(self, key):
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                smtp, last_used = idle.pop()
+                if now - last_used < self.idle_timeout:
+                    return smtp
+                self._discard(smtp)
+        return None
+
+    def _release(self, key, smtp):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_key:
+                idle.append((smtp, time.monotonic()))
+                return
+        self._discard(smtp)
+
+    @contextmanager
+    def connection(self, server, port, user, password, use_tls=True):
+        """Presta una conexión autenticada; se devuelve al pool si no hubo errores."""
+        key = (server, port, user)
+        smtp = self._acquire(key) or self._connect(server, port, user, password, use_tls)
+        try:
+            yield smtp
+        except Exception:
+            self._discard(smtp)
+            raise
+        self._release(key, smtp)
+
+    def send_many(self, server, port, user, password, messages, use_tls=True):
+        """
+        Envía varios mensajes (remitente, destinatarios, texto) por una misma
+        conexión. Retorna una lista con SENT o la excepción de cada mensaje.
+        Si una conexión reutilizada fue cerrada por el servidor se reintenta una vez.
+        """
+        import smtplib
+        results = []
+        pending = list(messages)
+        retried = False
+        while pending:
+            try:
+                with self.connection(server, port, user, password, use_tls) as smtp:
+                    while pending:
+                        sender, recipients, text = pending[0]
+                        try:
+                            smtp.sendmail(sender, recipients, text)
+                            result = SENT
+                        except smtplib.SMTPServerDisconnected:
+                            raise
+                        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                                smtplib.SMTPDataError) as e:
+                            # Error del mensaje, no de la conexión: se informa y se continúa
+                            smtp.rset()
+                            result = e
+                        pending.pop(0)
+                        results.append(result)
+            except smtplib.SMTPServerDisconnected as e:
+                if retried:
+                    results.extend(e for _ in pending)
+                    pending = []
+                retried = True
+            except Exception as e:
+                results.extend(e for _ in pending)
+                pending = []
+        with self._lock:
+            self.messages_sent += sum(1 for r in results if r == SENT)
+        return results
+
+    def send(self, server, port, user, password, sender, recipients, text, use_tls=True):
+        """Envía un mensaje y retorna su estado (SENT o el texto del error)."""
+        result = self.send_many(server, port, user, password, [(sender, recipients, text)], use_tls)[0]
+        return result if result == SENT else error_status(result)
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for smtp, _ in idle:
+                    self._discard(smtp)
+            self._idle.clear()
+
+
+class SmtpSendQueue:
+    """
+    Cola de envío en segundo plano sobre un SmtpConnectionPool. send() no
+    espera al servidor: retorna un Future con el estado de la entrega. Los
+    hilos de envío agrupan hasta 'batch_size' mensajes con el mismo servidor,
+    puerto y usuario y los envían por una misma conexión.
+    """
+    def __init__(self, pool=None, batch_size=50, workers=1, max_queued=10000):
+        self.pool = pool or SmtpConnectionPool()
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_queued = max_queued
+        self._queue = None
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_queue=None, _threads=[], _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _start(self):
+        # Los hilos se inician con el primer mensaje (así la cola se puede copiar a otros procesos)
+        with self._lock:
+            if self._queue is None:
+                self._queue = queue.Queue(self.max_queued)
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._worker, args=(self._queue,), name=f"smtp-send-{i}",
+                                              daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def send(self, server, port, user, password, sender, recipients, text, use_tls=True):
+        if self._queue is None:
+            self._start()
+        future = Future()
+        self._queue.put(((server, port, user, password, use_tls), (sender, recipients, text), future))
+        return future
+
+    def _worker(self, pending):
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    extra = pending.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is None:
+                    stop = True
+                    break
+                batch.append(extra)
+            groups = {}
+            for conn_args, message, future in batch:
+                groups.setdefault(conn_args, []).append((message, future))
+            for (server, port, user, password, use_tls), items in groups.items():
+                results = self.pool.send_many(server, port, user, password, [m for m, _ in items], use_tls)
+                for (_, future), result in zip(items, results):
+                    future.set_result(result if result == SENT else error_status(result))
+            if stop:
+                return
+
+    def close(self):
+        """Espera a que se envíen todos los mensajes encolados y cierra las conexiones."""
+        with self._lock:
+            if self._queue is not None:
+                for _ in self._threads:
+                    self._queue.put(None)
+                for thread in self._threads:
+                    thread.join()
+                self._queue = None
+                self._threads = []
+        self.pool.close()
@@ -0,0 +1,72 @@
+# models/template.py
+import re
+from functools import lru_cache
+
+_PLACEHOLDER = re.compile(r'\$\{([^}]+)\}')
+_MISSING = object()
+
+def lookup(context, name):
+    """
+    Busca una variable en el contexto. Si el nombre completo no existe y tiene
+    puntos (p. ej. "usuario.nombre"), se recorre cada parte como clave de
+    diccionario, índice de lista o atributo. Retorna "" si no se encuentra.
+    """
+    value = context.get(name, _MISSING)
+    if value is not _MISSING:
+        return value
+    if "." not in name:
+        return ""
+    value = context
+    for part in name.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, (list, tuple)) and part.lstrip("-").isdigit():
+            try:
+                value = value[int(part)]
+            except IndexError:
+                value = _MISSING
+        else:
+            value = getattr(value, part, _MISSING)
+        if value is _MISSING:
+            return ""
+    return value
+
+class Template:
+    """
+    Texto con variables ${nombre} analizado una sola vez: se guarda como
+    segmentos literales y posiciones de variables, y render() arma el
+    resultado con un único join.
+    """
+    __slots__ = ("text", "variables", "_parts", "_slots")
+
+    def __init__(self, text):
+        self.text = text
+        parts = []
+        slots = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(text):
+            parts.append(text[position:match.start()])
+            slots.append((len(parts), match.group(1)))
+            parts.append("")
+            position = match.end()
+        parts.append(text[position:])
+        self._parts = parts
+        self._slots = tuple(slots)
+        self.variables = tuple(name for _, name in slots)
+
+    def render(self, context):
+        if not self._slots:
+            return self.text
+        parts = self._parts.copy()
+        for index, name in self._slots:
+            parts[index] = str(lookup(context, name))
+        return "".join(parts)
+
+@lru_cache(maxsize=1024)
+def compile_template(text):
+    """Retorna el Template de 'text' (los textos repetidos se analizan una sola vez)."""
+    return Template(text)
+
+def render(text, context):
+    """Reemplaza las variables ${...} de un texto que solo se conoce al ejecutar."""
+    return compile_template(text).render(context)
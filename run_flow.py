@@ -0,0 +1,10 @@
+# run_flow.py
+# Ejecuta un flujo guardado sin abrir la interfaz gráfica (no requiere Tkinter).
+# Ejemplo: python run_flow.py saludo.json --answers '{"nombre": "Julian"}'
+import time
+T_START = time.perf_counter()   # Antes de importar el motor: el tiempo de inicio informado incluye las importaciones
+import sys
+from engine.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main(t_start=T_START))
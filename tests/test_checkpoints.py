@@ -0,0 +1,54 @@
+# tests/test_checkpoints.py
+import json
+import os
+import re
+import subprocess
+import sys
+
+RUN_FLOW = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "run_flow.py")
+
+
+def python_node(node_id, code, variable_name, connected_to):
+    return {"id": node_id, "x": 0, "y": 0, "node_type": "python", "text": node_id,
+            "config": {"code": code, "params": [], "variable_name": variable_name}, "connected_to": connected_to}
+
+def run_flow(tmp_path, *args):
+    return subprocess.run([sys.executable, RUN_FLOW, *args], cwd=tmp_path, capture_output=True, text=True,
+                          timeout=60)
+
+
+def test_resume_skips_the_nodes_that_already_finished(tmp_path):
+    log_path = str(tmp_path / "nodos.log")
+    crash_path = str(tmp_path / "fallar")
+    first = f"def func():\n    open({log_path!r}, 'a').write('a\\n')\n    return 1"
+    # El segundo nodo mata el proceso mientras exista el archivo 'fallar'
+    second = (f"def func():\n    import os\n"
+              f"    if os.path.exists({crash_path!r}):\n        os._exit(3)\n"
+              f"    open({log_path!r}, 'a').write('b\\n')\n    return 2")
+    flow = {
+        "nodes": [
+            {"id": "s", "x": 0, "y": 0, "node_type": "inicio", "text": "Inicio", "config": {}, "connected_to": "a"},
+            python_node("a", first, "va", "b"),
+            python_node("b", second, "vb", None),
+        ],
+        "variables": [],
+    }
+    (tmp_path / "flujo.json").write_text(json.dumps(flow), encoding="utf-8")
+    open(crash_path, "w").close()
+
+    crashed = run_flow(tmp_path, "flujo.json", "--checkpoints", "puntos.db", "--quiet")
+    assert crashed.returncode == 3
+    run_id = re.search(r"--resume (\S+)\)", crashed.stderr).group(1)
+
+    os.remove(crash_path)
+    resumed = run_flow(tmp_path, "flujo.json", "--checkpoints", "puntos.db", "--resume", run_id, "--quiet")
+    assert resumed.returncode == 0, resumed.stderr
+    context = json.loads(resumed.stdout)
+    assert context["va"] == 1 and context["vb"] == 2
+    # El primer nodo se ejecutó una sola vez; el segundo, solo al reanudar
+    with open(log_path) as f:
+        assert f.read().split() == ["a", "b"]
+
+    # Al terminar se borra el punto de control: no se puede reanudar de nuevo
+    again = run_flow(tmp_path, "flujo.json", "--checkpoints", "puntos.db", "--resume", run_id, "--quiet")
+    assert again.returncode != 0
@@ -0,0 +1,91 @@
+# tests/test_job_queue.py
+import json
+import time
+from datetime import datetime
+
+import pytest
+
+from engine.jobs import JobWorkerPool
+from engine.server import FlowRegistry
+from models.job_queue import CronSchedule, JobQueue, LeaseLostError
+
+
+def test_expired_lease_is_lost_to_the_next_claim(tmp_path):
+    queue = JobQueue(str(tmp_path / "trabajos.db"), lease=0.05)
+    job_id = queue.enqueue("flujo", {"n": 1})
+    first = queue.claim()
+    time.sleep(0.1)
+    second = queue.claim()
+    assert second["id"] == job_id and second["token"] != first["token"]
+    assert second["attempt"] == 2
+
+    # El primer intento ya no puede renovar, terminar ni fallar el trabajo
+    assert not queue.extend(job_id, first["token"])
+    with pytest.raises(LeaseLostError):
+        queue.complete(job_id, first["token"], {"n": 1})
+    with pytest.raises(LeaseLostError):
+        queue.fail(job_id, first["token"], "error")
+
+    queue.complete(job_id, second["token"], {"n": 2})
+    job = queue.get(job_id)
+    assert job["status"] == "terminado" and job["result"] == {"n": 2}
+    queue.close()
+
+
+def test_extend_keeps_the_job_reserved(tmp_path):
+    queue = JobQueue(str(tmp_path / "trabajos.db"), lease=0.2)
+    queue.enqueue("flujo")
+    job = queue.claim()
+    for _ in range(4):
+        time.sleep(0.1)
+        assert queue.extend(job["id"], job["token"])
+        assert queue.claim() is None
+    queue.complete(job["id"], job["token"])
+    assert queue.counts()["terminado"] == 1
+    queue.close()
+
+
+def test_heartbeat_renews_leases_of_long_flows(tmp_path):
+    # Cada flujo dura más que la reserva: sin renovarla, el otro pool volvería a tomar el trabajo
+    log_path = tmp_path / "ejecuciones.log"
+    code = ("def func(n):\n"
+            "    import time\n"
+            "    time.sleep(0.5)\n"
+            f"    with open({str(log_path)!r}, 'a') as f:\n"
+            "        f.write(f'{n}\\n')\n"
+            "    return n")
+    flow = {
+        "nodes": [
+            {"id": "s", "x": 0, "y": 0, "node_type": "inicio", "text": "Inicio", "config": {}, "connected_to": "p"},
+            {"id": "p", "x": 0, "y": 0, "node_type": "python", "text": "P",
+             "config": {"code": code, "params": ["n"], "variable_name": "resultado"}, "connected_to": None},
+        ],
+        "variables": [],
+    }
+    (tmp_path / "largo.json").write_text(json.dumps(flow), encoding="utf-8")
+    db_path = str(tmp_path / "trabajos.db")
+    JobQueue(db_path).enqueue_many("largo", [{"n": n} for n in range(4)])
+
+    registry = FlowRegistry([str(tmp_path / "largo.json")], reload_interval=0)
+    pools = [JobWorkerPool(JobQueue(db_path, lease=0.15), registry, workers=2, poll_interval=0.05)
+             for _ in range(2)]
+    for pool in pools:
+        pool.start(drain=True)
+    for pool in pools:
+        pool.join()
+    registry.close()
+
+    assert sorted(log_path.read_text().split()) == ["0", "1", "2", "3"]
+    assert sum(pool.completed for pool in pools) == 4
+    assert sum(pool.lost for pool in pools) == 0
+    assert JobQueue(db_path).counts()["terminado"] == 4
+
+
+def test_cron_day_fields_starting_with_star_do_not_restrict():
+    start = datetime(2026, 1, 1).timestamp()
+    # "*/2" empieza con "*": se exigen el día 1 y un día de la semana par (domingo 1 de febrero de 2026)
+    moment = datetime.fromtimestamp(CronSchedule("0 0 1 * */2").next_after(start))
+    assert (moment.month, moment.day) == (2, 1)
+    # Con los dos campos restringidos basta con uno: el primer lunes llega antes que el día 1
+    moment = datetime.fromtimestamp(CronSchedule("0 0 1 * 1").next_after(start))
+    assert (moment.month, moment.day) == (1, 5)
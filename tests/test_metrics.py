@@ -0,0 +1,44 @@
+# tests/test_metrics.py
+import threading
+
+from engine.metrics import MetricsRegistry
+
+
+def run_threads(registry, count, increments):
+    def work():
+        for _ in range(increments):
+            registry.inc("flow_runs_total", (("flow", "f"),))
+        registry.observe("flow_run_duration_ms", 5.0)
+
+    threads = [threading.Thread(target=work) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_shards_of_finished_threads_keep_their_totals():
+    registry = MetricsRegistry()
+    run_threads(registry, 50, 100)
+    counters, histograms = registry.snapshot()
+    assert counters[("flow_runs_total", (("flow", "f"),))] == 5000
+    histogram = histograms[("flow_run_duration_ms", ())]
+    assert sum(histogram[:-1]) == 50 and histogram[-1] == 250.0
+    # Los hilos terminaron: sus fragmentos se sumaron al base y se descartaron
+    assert registry._shards == []
+
+    # Leer otra vez no vuelve a sumar el base, y los hilos nuevos se agregan a lo anterior
+    assert registry.snapshot()[0] == counters
+    run_threads(registry, 10, 1)
+    counters, histograms = registry.snapshot()
+    assert counters[("flow_runs_total", (("flow", "f"),))] == 5010
+    assert sum(histograms[("flow_run_duration_ms", ())][:-1]) == 60
+
+
+def test_shards_do_not_grow_with_the_number_of_threads():
+    registry = MetricsRegistry()
+    for _ in range(20):
+        run_threads(registry, 10, 1)
+    # Cada hilo nuevo suma al base los fragmentos de los que ya terminaron
+    assert len(registry._shards) <= 10
+    assert registry.snapshot()[0][("flow_runs_total", (("flow", "f"),))] == 200
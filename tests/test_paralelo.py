@@ -0,0 +1,127 @@
+# tests/test_paralelo.py
+import time
+
+import pytest
+
+from engine.flow_runner import FlowRunner, clean_context
+from engine.plan import ExecutionPlan
+from models.flow_serializer import FlowSerializer
+from models.paralelo_node import merge_updates
+
+
+def python_node(node_id, code, variable_name, connected_to):
+    return {"id": node_id, "x": 0, "y": 0, "node_type": "python", "text": node_id,
+            "config": {"code": code, "params": [], "variable_name": variable_name}, "connected_to": connected_to}
+
+def sleeping(seconds, value):
+    return f"def func():\n    import time\n    time.sleep({seconds})\n    return {value!r}"
+
+def fork_flow(wait="todas", policy="lista", after_slow=None):
+    """
+    Inicio -> Paralelo con dos ramas -> Unión: la rama lenta (0.3 s) escribe
+    'va' y 'vb'; la rápida solo 'va'. 'after_slow' agrega un nodo más al final
+    de la rama lenta.
+    """
+    slow_next = "extra" if after_slow is not None else "j"
+    nodes = [
+        {"id": "s", "x": 0, "y": 0, "node_type": "inicio", "text": "Inicio", "config": {}, "connected_to": "f"},
+        {"id": "f", "x": 0, "y": 0, "node_type": "paralelo", "text": "P", "config": {"max_workers": 0},
+         "connected_to": None, "branches": ["lenta", "rapida"]},
+        python_node("lenta", sleeping(0.3, "lenta"), "va", "lenta_b"),
+        python_node("lenta_b", "def func():\n    return 2", "vb", slow_next),
+        python_node("rapida", "def func():\n    return 'rapida'", "va", "j"),
+        {"id": "j", "x": 0, "y": 0, "node_type": "union", "text": "U",
+         "config": {"wait": wait, "conflict_policy": policy}, "connected_to": None},
+    ]
+    if after_slow is not None:
+        nodes.append(python_node("extra", after_slow, "vextra", "j"))
+    return {"nodes": nodes, "variables": []}
+
+
+def test_merge_updates_policies():
+    updates = [{"a": 1, "b": "x"}, {"a": 2, "b": "x"}, {"c": 3}]
+    assert merge_updates(updates, "primera") == {"a": 1, "b": "x", "c": 3}
+    assert merge_updates(updates, "ultima") == {"a": 2, "b": "x", "c": 3}
+    assert merge_updates(updates, "lista") == {"a": [1, 2], "b": "x", "c": 3}
+    with pytest.raises(ValueError):
+        merge_updates(updates, "error")
+
+
+def test_todas_merges_every_branch_in_connection_order():
+    runner = FlowRunner.from_dict(fork_flow("todas", "lista"))
+    try:
+        context = clean_context(runner.run({}))
+    finally:
+        runner.close()
+    assert context["va"] == ["lenta", "rapida"]
+    assert context["vb"] == 2
+
+
+def test_conflict_with_error_policy_fails_the_run():
+    runner = FlowRunner.from_dict(fork_flow("todas", "error"))
+    try:
+        with pytest.raises(ValueError):
+            runner.run({})
+    finally:
+        runner.close()
+
+
+def test_cualquiera_keeps_the_winner_and_stops_the_other_branches(tmp_path):
+    marker = tmp_path / "marca"
+    after_slow = f"def func():\n    open({str(marker)!r}, 'w').close()\n    return 1"
+    runner = FlowRunner.from_dict(fork_flow("cualquiera", "error", after_slow))
+    try:
+        t0 = time.perf_counter()
+        context = clean_context(runner.run({}))
+        elapsed = time.perf_counter() - t0
+        # La rama lenta termina el nodo en curso pero no ejecuta los siguientes
+        time.sleep(0.5)
+    finally:
+        runner.close()
+    assert context["va"] == "rapida"
+    assert "vb" not in context and "vextra" not in context
+    assert elapsed < 0.25
+    assert not marker.exists()
+
+
+@pytest.mark.parametrize("wait, expected", [("cualquiera", ["previo", "rapida"]),
+                                            ("todas", ["previo", "lenta", "lenta_b", "rapida"])])
+def test_only_kept_branches_add_their_queued_results(wait, expected):
+    nodes = FlowSerializer.nodes_from_dict(fork_flow(wait, "lista"))
+
+    def step_factory(node):
+        # Cada nodo Python de las ramas encola un resultado, como lo haría un nodo SMTP con --smtp-queue
+        step = node.compile()
+        if node.node_type != "python":
+            return step
+
+        def queued_step(context):
+            context.setdefault("deferred_results", []).append((node.id, None))
+            return step(context)
+        return queued_step
+
+    plan = ExecutionPlan.compile(nodes, step_factory)
+    try:
+        context = plan.run({"deferred_results": [("previo", None)]})
+        time.sleep(0.4)     # Las ramas descartadas ya no escriben en la lista del flujo
+    finally:
+        plan.close()
+    assert sorted(name for name, _ in context["deferred_results"]) == sorted(expected)
+
+
+def test_close_stops_branch_threads_and_a_new_run_restarts_them():
+    runner = FlowRunner.from_dict(fork_flow("todas", "lista"))
+    runner.run({})
+    pool = runner.plan.pools[0]
+    threads = list(pool._executor._threads)
+    assert threads
+    runner.close()
+    for thread in threads:
+        thread.join(1.0)
+    assert not any(thread.is_alive() for thread in threads)
+    assert pool._executor is None
+
+    # Cerrar el plan no impide volver a ejecutarlo
+    assert clean_context(runner.run({}))["vb"] == 2
+    runner.close()
+    assert pool._executor is None
@@ -0,0 +1,53 @@
+# tests/test_run_memory.py
+import threading
+import time
+
+import pytest
+
+from models.run_memory import BackgroundRunWriter, SegmentRunStore
+
+
+@pytest.mark.parametrize("durability", ["lote", "completa"])
+def test_every_saved_run_is_written_when_closing_under_load(tmp_path, durability):
+    # Cola pequeña: varios hilos esperan lugar (contrapresión) mientras se cierra la memoria
+    writer = BackgroundRunWriter(SegmentRunStore(str(tmp_path)), max_queued=4, batch_size=8, durability=durability)
+    saved = []
+    rejected = []
+    unexpected = []
+
+    def work(worker):
+        for i in range(200):
+            run_id = f"{worker}-{i}"
+            try:
+                writer.save({"i": i}, flow="flujo", run_id=run_id)
+            except RuntimeError:
+                rejected.append(run_id)
+            except Exception as e:
+                unexpected.append(e)
+            else:
+                saved.append(run_id)
+
+    threads = [threading.Thread(target=work, args=(n,), daemon=True) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    writer.close()
+    for thread in threads:
+        # Un save() que quedó detrás del cierre no debe esperar para siempre
+        thread.join(10)
+        assert not thread.is_alive()
+
+    assert unexpected == []
+    assert len(saved) + len(rejected) == 8 * 200
+    written = sorted(record["run_id"] for record in SegmentRunStore(str(tmp_path)).query())
+    assert written == sorted(saved)
+    assert writer.records_written == len(saved)
+
+
+def test_save_after_close_raises(tmp_path):
+    writer = BackgroundRunWriter(SegmentRunStore(str(tmp_path)))
+    writer.save({"x": 1}, flow="flujo", run_id="1")
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.save({"x": 2}, flow="flujo", run_id="2")
+    assert [record["run_id"] for record in SegmentRunStore(str(tmp_path)).query()] == ["1"]
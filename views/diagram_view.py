@@ -70,6 +70,10 @@ class DiagramView:
         btn_python.pack(fill=tk.X, padx=5, pady=5)
         btn_smtp = tk.Button(self.toolbar, text="SMTP", command=lambda: self.controller.handle_add_node("smtp"))
         btn_smtp.pack(fill=tk.X, padx=5, pady=5)
+        btn_paralelo = tk.Button(self.toolbar, text="Paralelo", command=lambda: self.controller.handle_add_node("paralelo"))
+        btn_paralelo.pack(fill=tk.X, padx=5, pady=5)
+        btn_union = tk.Button(self.toolbar, text="Unión", command=lambda: self.controller.handle_add_node("union"))
+        btn_union.pack(fill=tk.X, padx=5, pady=5)
         btn_connect = tk.Button(self.toolbar, text="🔗 Conectar Nodos", command=self.controller.handle_start_connection)
         btn_connect.pack(fill=tk.X, padx=5, pady=5)
         btn_delete_node = tk.Button(self.toolbar, text="🗑️ Eliminar Nodo", command=self.controller.handle_delete_node)
@@ -92,7 +96,9 @@ class DiagramView:
             "multiples": "lightpink",
             "llm": "lightcyan",
             "python": "plum",
-            "smtp": "khaki"
+            "smtp": "khaki",
+            "paralelo": "lightsalmon",
+            "union": "lightsteelblue"
         }
         x, y = node.x, node.y
         display_text = f"{node.title}\n{node.text}" if node.title else node.text